@@ -0,0 +1,194 @@
+"""
+Admission - 按宿主机剩余 CPU / 内存决定是否放行新的 Worker 任务
+
+等级并发上限只管数量，不管宿主机实际还剩多少资源；机器已经满载时再启动容器，
+所有请求一起变慢。这里在任务拿到等级槽位后再检查宿主机：
+
+- CPU：/proc/stat 两次采样之间的忙碌比例（第一次采样用 /proc/loadavg 估算）
+- 内存：/proc/meminfo 的 MemAvailable，减去最近放行、还没来得及分配内存的任务的预留
+
+资源不够时排队等待，超过 max_wait 秒或排队人数超过 max_waiting 时拒绝（HostOverloaded，
+调用方按排队已满处理）。
+"""
+
+import os
+import time
+import asyncio
+import logging
+import itertools
+
+from worker_executor import WorkerQueueFull
+from resource_profiles import parse_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class HostOverloaded(WorkerQueueFull):
+    """宿主机资源不足，任务被拒绝"""
+
+
+class HostAdmission:
+    """
+    宿主机资源准入控制
+
+    - max_cpu: CPU 忙碌比例超过它时不放行（0 表示不检查）
+    - min_free_memory: 放行后至少要剩下的内存（字节）
+    - tier_memory: 每个等级的任务需要预留的内存（字节），通常是该等级容器的内存上限
+    - max_wait: 最多等待多少秒
+    - max_waiting: 最多多少个任务同时等待
+    - warmup: 放行后预留内存保持多少秒（之后容器的实际占用已经体现在 MemAvailable 里）
+    """
+
+    def __init__(self, max_cpu: float = 0.9, min_free_memory: int = 256 * 1024 ** 2,
+                 tier_memory: dict = None, max_wait: float = 30, max_waiting: int = 50,
+                 warmup: float = 10, poll_interval: float = 0.5, sample_interval: float = 1.0,
+                 proc: str = "/proc"):
+        self.max_cpu = max_cpu
+        self.min_free_memory = min_free_memory
+        self.tier_memory = dict(tier_memory or {})
+        self.max_wait = max_wait
+        self.max_waiting = max_waiting
+        self.warmup = warmup
+        self.poll_interval = poll_interval
+        self.sample_interval = sample_interval
+        self.proc = proc
+
+        self._cpu_times = None      # 上次 /proc/stat 采样 (busy, total)
+        self._sample = None         # (cpu, mem_available, mem_total)
+        self._sampled_at = 0.0
+        self._reservations = {}     # ticket -> (到期时间, 字节)
+        self._tickets = itertools.count(1)
+        self._waiting = 0
+
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+        self.enabled = os.path.exists(os.path.join(proc, "meminfo"))
+        if not self.enabled:
+            logger.warning(f"{proc}/meminfo not found, host admission control disabled")
+
+    @classmethod
+    def from_env(cls, tier_memory: dict = None) -> "HostAdmission":
+        """从环境变量读取配置"""
+        admission = cls(
+            max_cpu=float(os.getenv("ADMISSION_MAX_CPU", 0.9)),
+            min_free_memory=parse_bytes(os.getenv("ADMISSION_MIN_FREE_MEMORY", "256m")),
+            tier_memory=tier_memory,
+            max_wait=float(os.getenv("ADMISSION_MAX_WAIT", 30)),
+            max_waiting=int(os.getenv("ADMISSION_MAX_WAITING", 50)),
+            warmup=float(os.getenv("ADMISSION_WARMUP", 10)),
+        )
+        if os.getenv("ADMISSION_CONTROL", "1") != "1":
+            admission.enabled = False
+        return admission
+
+    # ==================== Sampling ====================
+
+    def _read_cpu(self) -> float:
+        with open(os.path.join(self.proc, "stat")) as f:
+            fields = [int(x) for x in f.readline().split()[1:9]]
+        # user nice system idle iowait irq softirq steal
+        total = sum(fields)
+        busy = total - fields[3] - fields[4]
+
+        previous, self._cpu_times = self._cpu_times, (busy, total)
+        if previous is None or total == previous[1]:
+            # 还没有上一次采样：用 1 分钟负载估算
+            with open(os.path.join(self.proc, "loadavg")) as f:
+                load = float(f.read().split()[0])
+            return min(load / (os.cpu_count() or 1), 1.0)
+        return (busy - previous[0]) / (total - previous[1])
+
+    def _read_memory(self) -> tuple:
+        info = {}
+        with open(os.path.join(self.proc, "meminfo")) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ('MemAvailable', 'MemTotal'):
+                    info[key] = int(value.split()[0]) * 1024
+        return info['MemAvailable'], info['MemTotal']
+
+    def sample(self) -> tuple:
+        """(CPU 忙碌比例, 可用内存, 总内存)；sample_interval 内复用上次结果"""
+        now = time.monotonic()
+        if self._sample is None or now - self._sampled_at >= self.sample_interval:
+            self._sample = (self._read_cpu(), *self._read_memory())
+            self._sampled_at = now
+        return self._sample
+
+    def reserved(self) -> int:
+        now = time.monotonic()
+        for ticket in [t for t, (expires, _) in self._reservations.items() if expires <= now]:
+            del self._reservations[ticket]
+        return sum(size for _, size in self._reservations.values())
+
+    def check(self, tier: str) -> str | None:
+        """资源够用返回 None，否则返回原因"""
+        cpu, available, _ = self.sample()
+        if self.max_cpu and cpu > self.max_cpu:
+            return f"cpu {cpu:.0%}"
+        needed = self.tier_memory.get(tier, 0) + self.min_free_memory
+        free = available - self.reserved()
+        if free < needed:
+            return f"memory {free / 1024 ** 2:.0f}MB free, {needed / 1024 ** 2:.0f}MB needed"
+        return None
+
+    # ==================== Admission ====================
+
+    async def admit(self, tier: str):
+        """
+        等到宿主机资源足够后放行，返回预留凭证（交给 release）
+
+        Raises:
+            HostOverloaded: 等待超时或等待的任务太多
+        """
+        if not self.enabled:
+            return None
+
+        reason = self.check(tier)
+        if reason is not None:
+            if self._waiting >= self.max_waiting:
+                self.rejected += 1
+                logger.warning(f"Host overloaded ({reason}), rejecting {tier} job")
+                raise HostOverloaded(tier)
+
+            self.delayed += 1
+            self._waiting += 1
+            try:
+                deadline = time.monotonic() + self.max_wait
+                while reason is not None:
+                    if time.monotonic() >= deadline:
+                        self.rejected += 1
+                        logger.warning(f"Host overloaded ({reason}) for {self.max_wait:.0f}s, rejecting {tier} job")
+                        raise HostOverloaded(tier)
+                    await asyncio.sleep(self.poll_interval)
+                    reason = self.check(tier)
+            finally:
+                self._waiting -= 1
+
+        self.admitted += 1
+        ticket = next(self._tickets)
+        self._reservations[ticket] = (time.monotonic() + self.warmup, self.tier_memory.get(tier, 0))
+        return ticket
+
+    def release(self, ticket):
+        """任务结束，释放还没到期的内存预留"""
+        if ticket is not None:
+            self._reservations.pop(ticket, None)
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {'enabled': False}
+        cpu, available, total = self.sample()
+        return {
+            'enabled': True,
+            'cpu': cpu,
+            'mem_available': available,
+            'mem_total': total,
+            'reserved': self.reserved(),
+            'waiting': self._waiting,
+            'admitted': self.admitted,
+            'delayed': self.delayed,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,127 @@
+"""
+Alert Index - 按币种的价格阈值索引
+
+每个币种两张按阈值排序的表：
+- above: 价格 > 阈值时触发，触发的是表头的一段（阈值 < 价格）
+- below: 价格 < 阈值时触发，触发的是表尾的一段（阈值 > 价格）
+
+一次价格更新用二分找到分界点，只取出被穿越的任务，不再逐个比较所有任务。
+插入 / 删除也是二分定位（列表插入删除是一次内存移动）。
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+
+class _Side:
+    """一个方向的有序阈值表；(阈值, task_id) 保证相同阈值时顺序稳定"""
+
+    def __init__(self):
+        self.keys = []      # [(target, task_id), ...] 升序
+        self.tasks = {}     # task_id -> task
+
+    def add(self, target: float, task: dict):
+        insort(self.keys, (target, task['id']))
+        self.tasks[task['id']] = task
+
+    def remove(self, target: float, task_id):
+        i = bisect_left(self.keys, (target, task_id))
+        if i < len(self.keys) and self.keys[i] == (target, task_id):
+            del self.keys[i]
+        self.tasks.pop(task_id, None)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class AlertIndex:
+    """price_monitor 任务的阈值索引"""
+
+    def __init__(self):
+        self._above = {}        # coin -> _Side
+        self._below = {}        # coin -> _Side
+        self._entries = {}      # task_id -> (coin, side, target)
+
+    @staticmethod
+    def _key(task: dict):
+        config = task['config']
+        coin = str(config.get('coin', '')).upper()
+        target = config.get('target_price')
+        if not coin or target is None:
+            return None
+        return coin, config.get('condition') == 'above', float(target)
+
+    def add(self, task: dict) -> bool:
+        """加入（或更新）一个任务；config 不完整时忽略并返回 False"""
+        self.remove(task['id'])
+        key = self._key(task)
+        if key is None:
+            return False
+
+        coin, above, target = key
+        sides = self._above if above else self._below
+        side = sides.get(coin)
+        if side is None:
+            side = sides[coin] = _Side()
+        side.add(target, task)
+        self._entries[task['id']] = key
+        return True
+
+    def remove(self, task_id) -> bool:
+        key = self._entries.pop(task_id, None)
+        if key is None:
+            return False
+
+        coin, above, target = key
+        sides = self._above if above else self._below
+        side = sides[coin]
+        side.remove(target, task_id)
+        if not side:
+            del sides[coin]
+        return True
+
+    def rebuild(self, tasks):
+        """用一批任务整体替换索引（启动 / 定期和数据库对齐）"""
+        self._above.clear()
+        self._below.clear()
+        self._entries.clear()
+
+        grouped = {}
+        for task in tasks:
+            key = self._key(task)
+            if key is not None:
+                grouped.setdefault((key[0], key[1]), []).append((key[2], task))
+                self._entries[task['id']] = key
+
+        for (coin, above), rows in grouped.items():
+            side = _Side()
+            side.keys = sorted((target, task['id']) for target, task in rows)
+            side.tasks = {task['id']: task for _, task in rows}
+            (self._above if above else self._below)[coin] = side
+
+    def crossed(self, coin: str, price: float) -> list:
+        """价格为 price 时触发的任务"""
+        coin = coin.upper()
+        fired = []
+
+        side = self._above.get(coin)
+        if side is not None:
+            # 阈值 < 价格
+            end = bisect_left(side.keys, (price, float('-inf')))
+            fired.extend(side.tasks[task_id] for _, task_id in side.keys[:end])
+
+        side = self._below.get(coin)
+        if side is not None:
+            # 阈值 > 价格
+            start = bisect_right(side.keys, (price, float('inf')))
+            fired.extend(side.tasks[task_id] for _, task_id in side.keys[start:])
+
+        return fired
+
+    def coins(self) -> set:
+        return set(self._above) | set(self._below)
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
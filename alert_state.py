@@ -0,0 +1,160 @@
+"""
+Alert State - price_monitor 任务的内存状态机
+
+每个任务一个状态：
+
+    armed ──穿越阈值──▶ fired ──发送成功──▶ cooling ──冷却结束──▶ armed（重新待命）
+                                    └─ 一次性任务 ─▶ done（等待批量删除）
+
+冷却时长来自 config 的 cooldown（分钟）：
+- 0：持续监控，两次提醒至少间隔 min_repeat
+- >= 999999：只提醒一次，发送成功后进入 done；发送失败按 min_repeat 冷却后重试
+
+状态只在内存里变化，触发时不写数据库。变化过的冷却结束时间（写回 next_run）和
+done 的任务攒起来，由 take_checkpoint 取出后一次写回；重启时从 next_run 恢复冷却。
+"""
+
+from datetime import datetime, timedelta
+
+ARMED = 'armed'
+FIRED = 'fired'
+COOLING = 'cooling'
+DONE = 'done'
+
+# cooldown 达到这个值表示只提醒一次
+ONE_SHOT_COOLDOWN = 999999
+
+
+class AlertStateMachine:
+    """
+    所有 price_monitor 任务的状态
+
+    - min_repeat: cooldown 为 0 的任务两次提醒的最小间隔（秒），也是一次性任务发送失败后的重试间隔
+    """
+
+    def __init__(self, min_repeat: float = 30):
+        self.min_repeat = timedelta(seconds=min_repeat)
+
+        self._states = {}       # task_id -> [state, 冷却结束时间]；fired 时为本次触发后的冷却结束时间
+        self._next_runs = {}    # task_id -> 待写回的 next_run
+        self._done = set()      # 待删除的一次性任务
+
+        self.rearmed = 0
+
+    def _cooldown_until(self, cooldown, now: datetime):
+        """触发后冷却到什么时候；一次性任务返回 None"""
+        try:
+            cooldown = float(cooldown or 0)
+        except (TypeError, ValueError):
+            # 配置里的坏值（字符串 / 列表等）按默认 60 分钟处理，不影响同币种的其它任务
+            cooldown = 60
+        if cooldown >= ONE_SHOT_COOLDOWN:
+            return None
+        return now + max(timedelta(minutes=cooldown), self.min_repeat)
+
+    # ==================== Tracking ====================
+
+    def track(self, task_id, next_run: datetime | None, now: datetime):
+        """开始跟踪一个任务；next_run 还没到（新任务 / 冷却中）时从 cooling 开始。已跟踪的不变"""
+        if task_id in self._states:
+            return
+        if next_run is not None and next_run > now:
+            self._states[task_id] = [COOLING, next_run]
+        else:
+            self._states[task_id] = [ARMED, None]
+
+    def sync(self, next_runs: dict, now: datetime):
+        """
+        和数据库对齐：next_runs 为 {task_id: next_run}
+
+        已跟踪的任务以内存为准（数据库里的 next_run 可能还没写回），
+        数据库里没有的任务不再跟踪。
+        """
+        for task_id in set(self._states) - set(next_runs):
+            self.drop(task_id)
+        for task_id, next_run in next_runs.items():
+            self.track(task_id, next_run, now)
+
+    def drop(self, task_id):
+        """任务被删除"""
+        self._states.pop(task_id, None)
+        self._next_runs.pop(task_id, None)
+        self._done.discard(task_id)
+
+    # ==================== Transitions ====================
+
+    def state(self, task_id, now: datetime) -> str | None:
+        """当前状态；冷却结束的任务在这里重新待命"""
+        entry = self._states.get(task_id)
+        if entry is None:
+            return None
+        if entry[0] == COOLING and entry[1] <= now:
+            entry[0], entry[1] = ARMED, None
+            self.rearmed += 1
+        return entry[0]
+
+    def cooling_until(self, task_id) -> datetime | None:
+        entry = self._states.get(task_id)
+        return entry[1] if entry is not None and entry[0] == COOLING else None
+
+    def fire(self, task_id, cooldown, now: datetime) -> bool:
+        """阈值被穿越：armed 的任务进入 fired 并返回 True，其它状态返回 False"""
+        if self.state(task_id, now) != ARMED:
+            return False
+        self._states[task_id] = [FIRED, self._cooldown_until(cooldown, now)]
+        return True
+
+    def sent(self, task_id, ok: bool, now: datetime) -> str | None:
+        """提醒发送完：进入 cooling，一次性任务发送成功进入 done；返回新状态"""
+        entry = self._states.get(task_id)
+        if entry is None or entry[0] != FIRED:
+            # 发送期间任务被删除了
+            return None
+
+        until = entry[1]
+        if until is None:
+            if ok:
+                entry[0] = DONE
+                self._done.add(task_id)
+                return DONE
+            until = now + self.min_repeat
+        else:
+            self._next_runs[task_id] = until
+
+        entry[0], entry[1] = COOLING, until
+        return COOLING
+
+    # ==================== Checkpoint ====================
+
+    def pending(self) -> int:
+        return len(self._next_runs) + len(self._done)
+
+    def take_checkpoint(self) -> tuple:
+        """取出待写回的 ({task_id: next_run}, [待删除的 task_id])"""
+        next_runs, self._next_runs = self._next_runs, {}
+        done, self._done = list(self._done), set()
+        return next_runs, done
+
+    def restore_checkpoint(self, next_runs: dict, done: list):
+        """写回失败：放回去下次再写（期间又有新的冷却时以新的为准）"""
+        for task_id, next_run in next_runs.items():
+            if task_id in self._states:
+                self._next_runs.setdefault(task_id, next_run)
+        self._done.update(task_id for task_id in done if task_id in self._states)
+
+    def committed(self, done: list):
+        """一次性任务已从数据库删除"""
+        for task_id in done:
+            self._states.pop(task_id, None)
+
+    def counts(self, now: datetime) -> dict:
+        counts = {ARMED: 0, FIRED: 0, COOLING: 0, DONE: 0}
+        for task_id in list(self._states):
+            counts[self.state(task_id, now)] += 1
+        return counts
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._states
+
+    def __len__(self):
+        return len(self._states)
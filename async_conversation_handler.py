@@ -0,0 +1,120 @@
+"""
+Async Conversation Handler - ConversationHandler 的异步包装
+
+generate_reply 变成协程，不再阻塞事件循环：
+- ConversationHandler 提供 build_messages(text, memory, user_name, user_tier) -> (system, messages)
+  且装了 httpx 时，用共享的 AsyncLLMClient 直接请求（连接池 + 超时 + 重试 + 并发上限）
+- 否则把同步的 generate_reply 放到有界线程池里执行
+
+stream_reply() 逐段产出回复：异步客户端模式下走流式 API；线程池模式下
+handler 提供同步生成器 stream_reply(text, memory, user_name, user_tier) 时逐段转发，
+否则整段产出一次。
+
+其他方法（needs_worker 等）原样转发给原来的 handler。
+"""
+
+import os
+import asyncio
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_client
+from llm_client import AsyncLLMClient, LLMError
+from worker_executor import iterate_in_thread
+
+logger = logging.getLogger(__name__)
+
+# LLM 请求失败时的回复（"oof" 开头的回复不会写入记忆）
+ERROR_REPLY = "oof, 我这边出了点问题，等一下再试试吧 🙏"
+
+
+class AsyncConversationHandler:
+    """
+    异步对话处理器
+
+    - handler: 原来的 ConversationHandler
+    - client: AsyncLLMClient；为 None 或 handler 没有 build_messages 时走线程池
+    - max_threads: 线程池模式下同时执行的 generate_reply 上限
+    """
+
+    def __init__(self, handler, client: AsyncLLMClient = None, max_threads: int = 16):
+        self.handler = handler
+        self.client = client if hasattr(handler, 'build_messages') else None
+        self._executor = None
+        if self.client is None:
+            self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="alice_chat")
+
+    @classmethod
+    def from_env(cls, handler) -> "AsyncConversationHandler":
+        """从环境变量读取配置；有 build_messages 且装了 httpx 时才创建 LLM 客户端"""
+        client = None
+        if hasattr(handler, 'build_messages') and llm_client.available():
+            client = AsyncLLMClient.from_env()
+        instance = cls(handler, client, max_threads=int(os.getenv("LLM_MAX_CONCURRENCY", 16)))
+        logger.info(f"Chat mode: {instance.mode}")
+        return instance
+
+    @property
+    def mode(self) -> str:
+        return "async-client" if self.client is not None else "thread"
+
+    @property
+    def can_stream(self) -> bool:
+        """stream_reply() 能否真正逐段产出（否则只会整段产出一次）"""
+        return self.client is not None or hasattr(self.handler, 'stream_reply')
+
+    def __getattr__(self, name):
+        return getattr(self.handler, name)
+
+    async def generate_reply(self, text: str, memory: list = None, user_name: str = None,
+                             user_tier: str = None) -> str:
+        """生成回复（协程）"""
+        if self.client is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                lambda: self.handler.generate_reply(
+                    text=text, memory=memory, user_name=user_name, user_tier=user_tier
+                ),
+            )
+
+        system, messages = self.handler.build_messages(text, memory, user_name, user_tier)
+        try:
+            return await self.client.complete(system, messages)
+        except LLMError as e:
+            logger.error(f"Chat reply failed: {e}")
+            return ERROR_REPLY
+
+    async def stream_reply(self, text: str, memory: list = None, user_name: str = None,
+                           user_tier: str = None):
+        """逐段产出回复（异步生成器）"""
+        if self.client is not None:
+            system, messages = self.handler.build_messages(text, memory, user_name, user_tier)
+            produced = False
+            try:
+                async for chunk in self.client.stream(system, messages):
+                    produced = True
+                    yield chunk
+            except LLMError as e:
+                logger.error(f"Chat stream failed: {e}")
+                # 已经展示了一部分时标记为被截断
+                yield " …" if produced else ERROR_REPLY
+            return
+
+        if not hasattr(self.handler, 'stream_reply'):
+            yield await self.generate_reply(text, memory, user_name, user_tier)
+            return
+
+        chunks = iterate_in_thread(
+            self._executor, self.handler.stream_reply, text, memory, user_name, user_tier
+        )
+        async with contextlib.aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,206 @@
+"""
+Async Database - get_db() 数据库接口的 asyncio 版本
+
+每个数据库方法都是协程：调用在专用线程池中执行，不阻塞事件循环。
+连接池里的每个句柄同一时间只被一个调用使用，factory 必须每次返回新连接；
+拿到共用句柄（get_db() 单例）时退回在事件循环里直接调用。
+
+DB_MODE=sync 时退回到在事件循环里直接调用（旧行为，便于排查问题）。
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+# main.py / 各模块用到的数据库方法
+DB_METHODS = (
+    'get_user',
+    'create_user',
+    'get_or_create_user',
+    'get_user_tier',
+    'update_user_tier',
+    'get_user_profile',
+    'get_user_preference',
+    'set_user_preference',
+    'get_memories_for_context',
+    'get_memories',
+    'get_memory_count',
+    'add_memory',
+    'create_task',
+    'get_task',
+    'get_user_tasks',
+    'get_active_tasks',
+    'update_task_next_run',
+    'delete_task',
+    'get_stats',
+)
+
+
+def _async_method(name: str):
+    async def method(self, *args, **kwargs):
+        return await self.run(lambda handle: getattr(handle, name)(*args, **kwargs))
+
+    method.__name__ = name
+    method.__doc__ = f"await {name}(...)"
+    return method
+
+
+class AsyncDatabase:
+    """
+    带连接池的异步数据库
+
+    - factory: 创建数据库句柄的函数，每次调用应返回一个新连接
+    - pool_size: 句柄数量，也是同时执行的查询数上限
+    - inline: True 时直接在事件循环里调用（DB_MODE=sync）
+
+    get_db() 返回的是进程内共用的单例（调度器、MoltManager 也在用），不能交给线程池：
+    factory 为 get_db 或返回了同一个句柄时退回 inline，所有调用留在事件循环线程。
+    """
+
+    def __init__(self, factory=get_db, pool_size: int = 4, inline: bool = False):
+        self.pool_size = max(1, pool_size)
+        self.inline = inline
+
+        if not inline and factory is get_db:
+            logger.warning("Database factory is the shared get_db() handle, running queries inline")
+            self.inline = True
+        self._handles = [factory() for _ in range(1 if self.inline else self.pool_size)]
+        if len({id(handle) for handle in self._handles}) < len(self._handles):
+            # 多个线程同时用一个连接不安全，而且同一个句柄在别处（事件循环线程）也在用
+            logger.warning("Database factory returned a shared handle, running queries inline")
+            self._handles = self._handles[:1]
+            self.inline = True
+        if self.inline:
+            self.pool_size = 1
+        self._idle = None
+        self._executor = None if self.inline else ThreadPoolExecutor(
+            max_workers=self.pool_size, thread_name_prefix="alice_db"
+        )
+
+    @classmethod
+    def from_env(cls, factory=get_db) -> "AsyncDatabase":
+        """从环境变量读取配置"""
+        return cls(
+            factory,
+            pool_size=int(os.getenv("DB_POOL_SIZE", 4)),
+            inline=os.getenv("DB_MODE", "async") == "sync",
+        )
+
+    def supports(self, name: str) -> bool:
+        """底层数据库是否实现了某个方法"""
+        return hasattr(self._handles[0], name)
+
+    def _pool(self) -> asyncio.Queue:
+        # 懒创建，保证绑定到运行中的事件循环
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for handle in self._handles:
+                self._idle.put_nowait(handle)
+        return self._idle
+
+    async def run(self, func, *args):
+        """
+        用一个连接执行 func(handle, *args)
+
+        同一个 func 里的多次调用都使用同一个句柄、在同一个线程里完成，
+        需要多条语句组合的操作（批量写入、批量删除）都走这里。
+        """
+        if self.inline:
+            return func(self._handles[0], *args)
+
+        pool = self._pool()
+        handle = await pool.get()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(handle, *args))
+        finally:
+            pool.put_nowait(handle)
+
+    async def add_memories(self, rows: list):
+        """批量写入记忆 [(user_id, role, content), ...]"""
+        def write(handle):
+            # 数据库支持批量写入时一次插入，否则逐条写
+            if hasattr(handle, 'add_memories'):
+                handle.add_memories(rows)
+            else:
+                for user_id, role, content in rows:
+                    handle.add_memory(user_id, role, content)
+
+        await self.run(write)
+
+    async def delete_tasks(self, user_id: int, predicate=None) -> list:
+        """
+        批量删除用户的任务，返回被删除的任务行
+
+        predicate(index, task) 决定是否删除，index 为 get_user_tasks 中从 1 开始的序号；
+        不传时删除全部。查询和删除在同一个连接上完成，
+        底层数据库提供 transaction() 时整体在一个事务里执行。
+        """
+        def delete(handle):
+            # 数据库提供事务时整体提交 / 回滚
+            if hasattr(handle, 'transaction'):
+                with handle.transaction():
+                    return _delete(handle)
+            return _delete(handle)
+
+        def _delete(handle):
+            tasks = handle.get_user_tasks(user_id)
+            deleted = [
+                task for index, task in enumerate(tasks, 1)
+                if predicate is None or predicate(index, task)
+            ]
+            if not deleted:
+                return deleted
+
+            # 数据库支持按 ID 批量删除时一条语句完成
+            if hasattr(handle, 'delete_tasks_by_ids'):
+                handle.delete_tasks_by_ids([task['id'] for task in deleted])
+            else:
+                for task in deleted:
+                    handle.delete_task(task['id'])
+            return deleted
+
+        return await self.run(delete)
+
+    async def checkpoint_tasks(self, next_runs: dict, deleted: list):
+        """
+        批量写回任务状态：更新 next_run（{task_id: next_run}），删除 deleted 里的任务
+
+        在同一个连接上完成，底层数据库提供 transaction() 时整体在一个事务里执行；
+        数据库不支持 update_task_next_run 时只删除。
+        """
+        def write(handle):
+            if hasattr(handle, 'transaction'):
+                with handle.transaction():
+                    return _write(handle)
+            return _write(handle)
+
+        def _write(handle):
+            if hasattr(handle, 'update_task_next_run'):
+                for task_id, next_run in next_runs.items():
+                    handle.update_task_next_run(task_id, next_run)
+
+            if not deleted:
+                return
+            # 数据库支持按 ID 批量删除时一条语句完成
+            if hasattr(handle, 'delete_tasks_by_ids'):
+                handle.delete_tasks_by_ids(list(deleted))
+            else:
+                for task_id in deleted:
+                    handle.delete_task(task_id)
+
+        await self.run(write)
+
+    def close(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+for _name in DB_METHODS:
+    setattr(AsyncDatabase, _name, _async_method(_name))
@@ -0,0 +1,443 @@
+"""
+Async Docker - 直接走 Docker Engine HTTP API 的 asyncio 客户端
+
+docker-py 是阻塞的，每个调用都要占一个线程。这里只实现 Worker 冷启动和
+Gold 休眠用到的 get / remove / create / start / run / wait / kill / logs / attach stdin、
+pause / unpause / stop / checkpoint / update，
+请求通过 Unix socket（或 tcp://）发送，HTTP/1.1 keep-alive 连接复用。
+
+DOCKER_HOST 不带 TLS；ssh:// 或设置了 DOCKER_TLS_VERIFY / DOCKER_CERT_PATH 时
+from_env() 返回 None，调用方退回 docker-py。
+"""
+
+import os
+import json
+import struct
+import asyncio
+import logging
+from urllib.parse import urlencode, quote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "unix:///var/run/docker.sock"
+DEFAULT_API_VERSION = "1.41"
+
+# 支持的 DOCKER_HOST 协议
+SUPPORTED_SCHEMES = ('unix', 'tcp')
+
+# logs / attach 多路复用帧头：stream(1) + 3 字节填充 + 长度(4 字节大端)
+_FRAME_HEADER = struct.Struct(">BxxxI")
+
+
+class DockerAPIError(Exception):
+    """Docker API 返回了错误状态码"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class NotFound(DockerAPIError):
+    pass
+
+
+class ImageNotFound(NotFound):
+    pass
+
+
+class _Response:
+    """一次 HTTP 响应的状态行和头部；body 由调用方按需读取"""
+
+    def __init__(self, status: int, headers: dict):
+        self.status = status
+        self.headers = headers
+
+    @property
+    def chunked(self) -> bool:
+        return self.headers.get('transfer-encoding', '').lower() == 'chunked'
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    @property
+    def usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncDockerClient:
+    """
+    带连接池的异步 Docker 客户端
+
+    - host: DOCKER_HOST（unix:// 或 tcp://）
+    - api_version: Engine API 版本
+    - max_connections: 同时打开的连接数上限（包括跟随日志的长连接）；每个运行中的冷启动
+      Worker 都占着一条日志长连接，至少要比 Worker 并发上限之和多出一些余量
+    - timeout: 普通请求的超时（秒）；wait / logs 不受限制
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, api_version: str = DEFAULT_API_VERSION,
+                 max_connections: int = 16, timeout: float = 30):
+        scheme = urlsplit(host).scheme
+        if scheme not in SUPPORTED_SCHEMES:
+            raise ValueError(f"Unsupported DOCKER_HOST {host!r}")
+        self.host = host
+        self.api_version = api_version
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._idle = []
+        self._slots = None
+        self._opened = 0
+        self._requests = 0
+
+    @classmethod
+    def from_env(cls, min_connections: int = 0) -> "AsyncDockerClient | None":
+        """
+        从环境变量读取配置；没设置 DOCKER_MAX_CONNECTIONS 时至少 min_connections
+
+        DOCKER_HOST 是 ssh:// 等不支持的协议，或者需要 TLS（DOCKER_TLS_VERIFY / DOCKER_CERT_PATH）时
+        返回 None，由 docker-py 处理。
+        """
+        host = os.getenv("DOCKER_HOST") or DEFAULT_HOST
+        if urlsplit(host).scheme not in SUPPORTED_SCHEMES:
+            logger.warning(f"DOCKER_HOST {host!r} is not supported by the async client, using docker-py")
+            return None
+        if os.getenv("DOCKER_TLS_VERIFY") or os.getenv("DOCKER_CERT_PATH"):
+            logger.warning("Docker TLS is not supported by the async client, using docker-py")
+            return None
+
+        max_connections = os.getenv("DOCKER_MAX_CONNECTIONS")
+        return cls(
+            host=host,
+            api_version=os.getenv("DOCKER_API_VERSION", DEFAULT_API_VERSION),
+            max_connections=int(max_connections) if max_connections else max(16, min_connections),
+        )
+
+    # ==================== Connections ====================
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # 懒创建，保证绑定到运行中的事件循环
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        return self._slots
+
+    async def _open(self) -> _Connection:
+        url = urlsplit(self.host)
+        if url.scheme == 'unix':
+            reader, writer = await asyncio.open_unix_connection(url.path)
+        else:
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 2375)
+        self._opened += 1
+        return _Connection(reader, writer)
+
+    async def _acquire(self, fresh: bool = False, permit: bool = True) -> _Connection:
+        """取一条连接；permit=False 时不占连接数（调用方已经持有一个，见 start_with_stdin）"""
+        if permit:
+            await self._semaphore().acquire()
+        try:
+            while self._idle and not fresh:
+                conn = self._idle.pop()
+                if conn.usable:
+                    conn.reused = True
+                    return conn
+                conn.close()
+            return await self._open()
+        except BaseException:
+            if permit:
+                self._semaphore().release()
+            raise
+
+    def _release(self, conn: _Connection, reusable: bool, permit: bool = True):
+        if reusable and conn.usable:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        if permit:
+            self._semaphore().release()
+
+    # ==================== HTTP ====================
+
+    def _path(self, path: str, params: dict = None) -> str:
+        path = f"/v{self.api_version}{path}"
+        if params:
+            path += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        return path
+
+    async def _send(self, conn: _Connection, method: str, path: str, body: bytes = None,
+                    headers: dict = None) -> _Response:
+        lines = [f"{method} {path} HTTP/1.1", "Host: docker"]
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body or b'')}")
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await conn.writer.drain()
+
+        status_line = await conn.reader.readuntil(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+        response_headers = {}
+        while True:
+            line = await conn.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+        return _Response(status, response_headers)
+
+    async def _read_body(self, conn: _Connection, response: _Response):
+        """逐段产出响应 body；读完后连接可以复用（除非服务端要求关闭）"""
+        if response.status in (101, 204, 304):
+            return
+        if response.chunked:
+            while True:
+                size_line = await conn.reader.readuntil(b"\r\n")
+                size = int(size_line.split(b";", 1)[0], 16)
+                if size == 0:
+                    await conn.reader.readuntil(b"\r\n")
+                    return
+                data = await conn.reader.readexactly(size)
+                await conn.reader.readexactly(2)
+                yield data
+        elif 'content-length' in response.headers:
+            length = int(response.headers['content-length'])
+            if length:
+                yield await conn.reader.readexactly(length)
+        else:
+            # 没有长度信息：读到连接关闭
+            while True:
+                data = await conn.reader.read(65536)
+                if not data:
+                    return
+                yield data
+
+    def _raise_for_status(self, response: _Response, body: bytes, path: str):
+        if response.status < 400:
+            return
+        try:
+            message = json.loads(body).get('message', '')
+        except ValueError:
+            message = body.decode("utf-8", errors="replace")
+        if response.status == 404:
+            if "image" in message.lower() and "/containers/create" in path:
+                raise ImageNotFound(response.status, message)
+            raise NotFound(response.status, message)
+        raise DockerAPIError(response.status, message)
+
+    async def _request(self, method: str, path: str, params: dict = None, payload=None,
+                       timeout: float = -1, permit: bool = True):
+        """发送请求并读完响应，返回解析后的 JSON（无 body 时为 None）；permit 见 _acquire"""
+        path = self._path(path, params)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        timeout = self.timeout if timeout == -1 else timeout
+        self._requests += 1
+
+        async def attempt(fresh: bool):
+            conn = await self._acquire(fresh, permit)
+            reusable = False
+            try:
+                response = await self._send(conn, method, path, body)
+                data = b"".join([chunk async for chunk in self._read_body(conn, response)])
+                reusable = response.keep_alive
+                return response, data
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                # 复用的连接可能已被 daemon 关掉，换一条新连接重试一次
+                if conn.reused and not fresh:
+                    logger.debug(f"Docker connection dropped ({e}), retrying")
+                    return None
+                raise
+            finally:
+                self._release(conn, reusable, permit)
+
+        async def send():
+            result = await attempt(False)
+            if result is None:
+                result = await attempt(True)
+            return result
+
+        response, data = await asyncio.wait_for(send(), timeout) if timeout else await send()
+        self._raise_for_status(response, data, path)
+        if data and response.headers.get('content-type', '').startswith('application/json'):
+            return json.loads(data)
+        return None
+
+    # ==================== Containers ====================
+
+    async def get(self, name: str) -> dict:
+        """容器详情（inspect）；不存在时抛 NotFound"""
+        return await self._request("GET", f"/containers/{quote(name)}/json")
+
+    async def remove(self, name: str, force: bool = False):
+        await self._request("DELETE", f"/containers/{quote(name)}", {'force': int(force)})
+
+    async def create(self, image: str, command: list = None, name: str = None,
+                     environment: dict = None, entrypoint=None, volumes: dict = None,
+                     labels: dict = None, stdin_open: bool = False, stdin_once: bool = False,
+                     host_config: dict = None) -> str:
+        """
+        创建容器，返回容器 ID
+
+        参数和 docker-py 的 containers.create 对应；entrypoint="" 清空镜像的 ENTRYPOINT，
+        volumes 为 {host_path: {'bind': path, 'mode': 'ro'}}。
+        """
+        config = {
+            'Image': image,
+            'Cmd': command,
+            'Env': [f"{key}={value}" for key, value in (environment or {}).items()],
+            'Labels': labels or {},
+            'OpenStdin': stdin_open,
+            'StdinOnce': stdin_once,
+            'AttachStdin': stdin_open,
+            'HostConfig': dict(host_config or {}),
+        }
+        if entrypoint is not None:
+            config['Entrypoint'] = [""] if entrypoint == "" else entrypoint
+        if volumes:
+            config['HostConfig']['Binds'] = [
+                f"{host}:{spec['bind']}:{spec.get('mode', 'rw')}" for host, spec in volumes.items()
+            ]
+
+        result = await self._request("POST", "/containers/create", {'name': name}, config)
+        return result['Id']
+
+    async def start(self, container_id: str, checkpoint: str = None):
+        """启动容器；指定 checkpoint 时从该检查点恢复"""
+        await self._request(
+            "POST", f"/containers/{quote(container_id)}/start", {'checkpoint': checkpoint}
+        )
+
+    async def run(self, image: str, command: list = None, **kwargs) -> str:
+        """创建并启动容器（相当于 containers.run(detach=True)），返回容器 ID"""
+        container_id = await self.create(image, command, **kwargs)
+        await self.start(container_id)
+        return container_id
+
+    async def kill(self, container_id: str):
+        await self._request("POST", f"/containers/{quote(container_id)}/kill")
+
+    async def update(self, container_id: str, resources: dict):
+        """修改运行中容器的资源上限（HostConfig 格式：Memory / NanoCpus / PidsLimit ...）"""
+        await self._request("POST", f"/containers/{quote(container_id)}/update", payload=resources)
+
+    async def pause(self, container_id: str):
+        await self._request("POST", f"/containers/{quote(container_id)}/pause")
+
+    async def unpause(self, container_id: str):
+        await self._request("POST", f"/containers/{quote(container_id)}/unpause")
+
+    async def stop(self, container_id: str, timeout: int = 10):
+        await self._request(
+            "POST", f"/containers/{quote(container_id)}/stop", {'t': timeout},
+            timeout=self.timeout + timeout,
+        )
+
+    async def checkpoint(self, container_id: str, name: str, exit: bool = True):
+        """创建检查点（CRIU，需要 daemon 开启 experimental）；exit=True 时随后停止容器"""
+        await self._request(
+            "POST", f"/containers/{quote(container_id)}/checkpoints",
+            payload={'CheckpointID': name, 'Exit': exit},
+            timeout=None,
+        )
+
+    async def delete_checkpoint(self, container_id: str, name: str):
+        await self._request(
+            "DELETE", f"/containers/{quote(container_id)}/checkpoints/{quote(name)}"
+        )
+
+    async def wait(self, container_id: str) -> int:
+        """等待容器退出，返回退出码"""
+        result = await self._request(
+            "POST", f"/containers/{quote(container_id)}/wait", timeout=None
+        )
+        return (result or {}).get('StatusCode', -1)
+
+    async def logs(self, container_id: str, follow: bool = True):
+        """逐段产出容器的 stdout + stderr（非 tty 容器）"""
+        path = self._path(
+            f"/containers/{quote(container_id)}/logs",
+            {'stdout': 1, 'stderr': 1, 'follow': int(follow)},
+        )
+        self._requests += 1
+        conn = await self._acquire()
+        reusable = False
+        try:
+            response = await self._send(conn, "GET", path)
+            if response.status >= 400:
+                data = b"".join([chunk async for chunk in self._read_body(conn, response)])
+                self._raise_for_status(response, data, path)
+
+            # 解多路复用帧；一个帧可能跨多个 HTTP chunk
+            buffer = b""
+            async for chunk in self._read_body(conn, response):
+                buffer += chunk
+                while len(buffer) >= _FRAME_HEADER.size:
+                    _, size = _FRAME_HEADER.unpack_from(buffer)
+                    end = _FRAME_HEADER.size + size
+                    if len(buffer) < end:
+                        break
+                    data, buffer = buffer[_FRAME_HEADER.size:end], buffer[end:]
+                    if data:
+                        yield data
+            reusable = response.keep_alive
+        finally:
+            # 中途放弃迭代的连接里还有未读数据，不能复用
+            self._release(conn, reusable)
+
+    async def start_with_stdin(self, container_id: str, payload: bytes):
+        """
+        attach 容器的 stdin，启动容器并写入 payload
+
+        容器需要以 stdin_open=True, stdin_once=True 创建；attach 连接被 hijack，
+        写完后关闭，worker 读到 EOF。
+        """
+        path = self._path(
+            f"/containers/{quote(container_id)}/attach", {'stream': 1, 'stdin': 1}
+        )
+        conn = await self._acquire(fresh=True)
+        try:
+            response = await self._send(
+                conn, "POST", path, headers={'Connection': 'Upgrade', 'Upgrade': 'tcp'}
+            )
+            if response.status >= 400:
+                data = b"".join([chunk async for chunk in self._read_body(conn, response)])
+                self._raise_for_status(response, data, path)
+
+            # attach 连接已经占了一个连接数，start 不再排队，否则连接数用满时会互相等待
+            await self._request("POST", f"/containers/{quote(container_id)}/start", permit=False)
+            conn.writer.write(payload)
+            await conn.writer.drain()
+            if conn.writer.can_write_eof():
+                conn.writer.write_eof()
+        finally:
+            self._release(conn, reusable=False)
+
+    # ==================== Lifecycle ====================
+
+    def stats(self) -> dict:
+        return {
+            'idle': len(self._idle),
+            'opened': self._opened,
+            'requests': self._requests,
+        }
+
+    async def close(self):
+        """关闭所有空闲连接"""
+        while self._idle:
+            conn = self._idle.pop()
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except Exception:
+                pass
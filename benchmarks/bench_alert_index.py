@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 价格更新时找出触发的任务，逐个比较 vs AlertIndex 二分
+
+--alerts 个 price_monitor 任务分布在几个币种上，价格随机游走；
+每次价格更新旧实现对该币种的所有任务调用 alert_triggered，索引只取被穿越的一段。
+另外测量索引的重建、插入和删除速度。
+
+用法：
+    python benchmarks/bench_alert_index.py [--alerts 100000] [--updates 2000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from alert_index import AlertIndex  # noqa: E402
+from price_alerts import alert_triggered, task_coin  # noqa: E402
+
+PRICES = {'BTC': 97000, 'ETH': 3400, 'SOL': 180, 'BNB': 650, 'DOGE': 0.35}
+
+
+def make_tasks(count: int, rng: random.Random) -> list:
+    coins = list(PRICES)
+    tasks = []
+    for i in range(count):
+        coin = rng.choice(coins)
+        above = rng.random() < 0.5
+        # 阈值大多离当前价格 2% ~ 30%，触发的是少数
+        offset = rng.uniform(0.02, 0.3)
+        target = PRICES[coin] * (1 + offset if above else 1 - offset)
+        tasks.append({
+            'id': i + 1, 'user_id': i + 1, 'task_type': 'price_monitor',
+            'config': {'coin': coin, 'target_price': round(target, 2),
+                       'condition': 'above' if above else 'below', 'cooldown': 60},
+        })
+    return tasks
+
+
+def make_updates(count: int, rng: random.Random) -> list:
+    prices = dict(PRICES)
+    updates = []
+    for _ in range(count):
+        coin = rng.choice(list(prices))
+        prices[coin] *= 1 + rng.gauss(0, 0.003)
+        updates.append((coin, prices[coin]))
+    return updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--alerts", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    tasks = make_tasks(args.alerts, rng)
+    updates = make_updates(args.updates, rng)
+
+    by_coin = {}
+    for task in tasks:
+        by_coin.setdefault(task_coin(task), []).append(task)
+
+    index = AlertIndex()
+    start = time.perf_counter()
+    index.rebuild(tasks)
+    rebuild = time.perf_counter() - start
+
+    # 结果必须一致
+    for coin, price in updates[:50]:
+        expected = {task['id'] for task in by_coin[coin] if alert_triggered(task['config'], price)}
+        assert {task['id'] for task in index.crossed(coin, price)} == expected, (coin, price)
+
+    start = time.perf_counter()
+    scanned = 0
+    for coin, price in updates:
+        scanned += sum(1 for task in by_coin[coin] if alert_triggered(task['config'], price))
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    crossed = 0
+    for coin, price in updates:
+        crossed += len(index.crossed(coin, price))
+    indexed = time.perf_counter() - start
+    assert crossed == scanned
+
+    # 删除再插入 1% 的任务（和 [TASK_DELETE] / [TASK_CREATE] 同步的开销）
+    churn = tasks[:max(1, args.alerts // 100)]
+    start = time.perf_counter()
+    for task in churn:
+        index.remove(task['id'])
+    for task in churn:
+        index.add(task)
+    churn_time = time.perf_counter() - start
+
+    print(f"alerts: {args.alerts}, price updates: {args.updates}, fired per update: {crossed / len(updates):.1f}")
+    print(f"  scan    {scan / len(updates) * 1e6:>10.1f} us/update")
+    print(f"  index   {indexed / len(updates) * 1e6:>10.1f} us/update   ({scan / indexed:.0f}x)")
+    print(f"  rebuild {rebuild * 1000:>10.1f} ms")
+    print(f"  add+del {churn_time / len(churn) * 1e6:>10.1f} us/task")
+
+
+if __name__ == '__main__':
+    main()
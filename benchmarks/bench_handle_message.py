@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 用合成聊天流量端到端压测 main.handle_message
+
+Telegram、Docker、数据库和 LLM 全部换成进程内假实现（benchmarks/fakes.py），
+按可配置的延迟 sleep。一批混合等级的用户以有限并发发送闲聊 / Worker 任务 /
+快捷意图三类消息。
+
+输出吞吐（msg/s）、各路径的 p50/p95/p99 延迟和首条消息时间（TTFB），
+以及压测期间的事件循环延迟。
+
+用法：
+    python benchmarks/bench_handle_message.py [--messages 2000] [--concurrency 200]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import fakes  # noqa: E402
+
+MESSAGES = {
+    'chat': [
+        "hi alice, how are you today?",
+        "你今天心情怎么样",
+        "tell me a story about your cat",
+        "good morning!",
+        "我有点累，陪我聊聊天",
+    ],
+    'worker': [
+        "BTC price now?",
+        "今天 BTC 怎么样",
+        "帮我监控 BTC 跌破 90000 告诉我",
+        "search the latest ETH news",
+        "ETH 价格多少",
+    ],
+    'intent': [
+        "帮助",
+        "我的任务",
+        "status",
+        "我是啥等级",
+    ],
+}
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        key, _, value = part.partition('=')
+        mix[key.strip()] = float(value)
+    return mix
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def fmt_ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f} ms"
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """采样事件循环从短 sleep 中醒来的延迟"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def run(args, env):
+    import main
+
+    if main.adocker is not None:
+        main.adocker = fakes.FakeAsyncDocker(env.latency)
+
+    rng = random.Random(args.seed)
+    tier_mix = parse_mix(args.tiers)
+    path_mix = parse_mix(args.mix)
+
+    # 用户群体
+    users = list(range(1, args.users + 1))
+    for user_id in users:
+        tier = rng.choices(list(tier_mix), weights=list(tier_mix.values()))[0]
+        env.db.create_user(user_id, f"user{user_id}", tier)
+    env.db.queries = 0
+
+    # 流量
+    traffic = []
+    for _ in range(args.messages):
+        path = rng.choices(list(path_mix), weights=list(path_mix.values()))[0]
+        traffic.append((rng.choice(users), path, rng.choice(MESSAGES[path])))
+
+    chat = fakes.FakeChat()
+    latencies = {path: [] for path in path_mix}
+    first_bytes = {path: [] for path in path_mix}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    context = fakes.FakeContext()
+
+    async def send(user_id: int, path: str, text: str):
+        async with semaphore:
+            update = fakes.FakeUpdate(user_id, text, chat)
+            start = time.perf_counter()
+            await main.handle_message(update, context)
+            latencies[path].append(time.perf_counter() - start)
+            if update.message.first_reply_at is not None:
+                first_bytes[path].append(update.message.first_reply_at - start)
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    flush_task = asyncio.create_task(main.memory_buffer.run())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(*item) for item in traffic))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    await main.memory_buffer.close()
+    flush_task.cancel()
+
+    # ==================== Report ====================
+
+    total = sum(len(values) for values in latencies.values())
+    everything = [value for values in latencies.values() for value in values]
+    all_first = [value for values in first_bytes.values() for value in values]
+
+    print(f"messages:        {total} ({args.users} users, concurrency {args.concurrency})")
+    print(f"elapsed:         {elapsed:.2f} s")
+    print(f"throughput:      {total / elapsed:.1f} msg/s")
+    print(f"db queries/msg:  {env.db.queries / max(1, total):.2f}")
+    print(f"telegram calls:  {chat.sent} sends, {chat.edits} edits")
+    print()
+    print(f"{'path':<8} {'count':>6} {'p50':>11} {'p95':>11} {'p99':>11} {'ttfb p50':>11} {'ttfb p95':>11}")
+    rows = list(latencies.items()) + [('all', everything)]
+    firsts = list(first_bytes.values()) + [all_first]
+    for (path, values), first in zip(rows, firsts):
+        print(
+            f"{path:<8} {len(values):>6} {fmt_ms(percentile(values, 50))}"
+            f" {fmt_ms(percentile(values, 95))} {fmt_ms(percentile(values, 99))}"
+            f" {fmt_ms(percentile(first, 50))} {fmt_ms(percentile(first, 95))}"
+        )
+    print()
+    if lag_samples:
+        print(
+            f"event loop lag: mean {fmt_ms(statistics.mean(lag_samples))}"
+            f"  p99 {fmt_ms(percentile(lag_samples, 99))}"
+            f"  max {fmt_ms(max(lag_samples))}"
+        )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Replay synthetic traffic through handle_message")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--tiers", default="bronze=0.5,silver=0.35,gold=0.15")
+    parser.add_argument("--mix", default="chat=0.6,worker=0.3,intent=0.1")
+    parser.add_argument("--worker-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--db-latency", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    env = fakes.install(fakes.Latency(
+        worker=args.worker_latency, llm=args.llm_latency, db=args.db_latency
+    ))
+
+    # 基准测试不需要真实的密钥和日志输出
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+    # 准入控制看的是跑基准的这台机器，和被测路径无关
+    os.environ.setdefault("ADMISSION_CONTROL", "0")
+    logging.disable(logging.CRITICAL)
+
+    asyncio.run(run(args, env))
+
+
+if __name__ == '__main__':
+    main_cli()
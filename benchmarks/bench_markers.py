@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 单次扫描 parse_markers vs 旧的三函数链
+(parse_user_info -> parse_task_delete -> parse_task_from_response)
+
+旧实现每个函数都是 re.search + re.sub（未预编译），这里只保留扫描部分，
+去掉数据库操作，对比纯解析开销。
+
+用法：
+    python benchmarks/bench_markers.py [--size 4000] [--repeat 2000]
+"""
+
+import os
+import re
+import sys
+import json
+import timeit
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from markers import parse_markers  # noqa: E402
+
+
+# ==================== 旧实现（仅扫描部分） ====================
+
+def legacy_user_info(response: str) -> str:
+    pattern = r'\[USER_INFO\]\s*(\{.*?\})\s*\[/USER_INFO\]'
+    match = re.search(pattern, response, re.DOTALL)
+    if not match:
+        return response
+    try:
+        json.loads(match.group(1))
+    except json.JSONDecodeError:
+        pass
+    return re.sub(pattern, '', response, flags=re.DOTALL).strip()
+
+
+def legacy_task_delete(response: str) -> str:
+    pattern = r'\[TASK_DELETE\]\s*(\{.*?\})\s*\[/TASK_DELETE\]'
+    match = re.search(pattern, response, re.DOTALL)
+    if not match:
+        return response
+    try:
+        json.loads(match.group(1))
+    except json.JSONDecodeError:
+        pass
+    return re.sub(pattern, '', response, flags=re.DOTALL).strip()
+
+
+def legacy_task_create(response: str) -> str:
+    pattern = r'\[TASK_CREATE\]\s*(\{.*?\})\s*\[/TASK_CREATE\]'
+    match = re.search(pattern, response, re.DOTALL)
+    if not match:
+        return response
+    try:
+        json.loads(match.group(1))
+    except json.JSONDecodeError:
+        pass
+    return re.sub(pattern, '', response, flags=re.DOTALL).strip()
+
+
+def legacy_chain(response: str) -> str:
+    cleaned = legacy_user_info(response)
+    cleaned = legacy_task_delete(cleaned)
+    return legacy_task_create(cleaned)
+
+
+# ==================== 测试数据 ====================
+
+FILLER = [
+    "BTC 现在的价格在 $97,000 附近震荡，",
+    "The 4h chart shows a higher low forming above the 200 EMA. ",
+    "成交量比昨天少了大约 20%，",
+    "funding rates are neutral [not overheated] right now. ",
+    "我会帮你盯着的～ ",
+]
+
+MARKERS = [
+    '[USER_INFO]{"nickname": "小王", "timezone": "Asia/Shanghai"}[/USER_INFO]',
+    '[TASK_DELETE]{"coin": "ETH", "task_type": "price_monitor"}[/TASK_DELETE]',
+    '[TASK_CREATE]{"type": "price_monitor", "config": {"coin": "BTC", '
+    '"target_price": 90000, "condition": "below", "cooldown": 60}}[/TASK_CREATE]',
+]
+
+
+def make_response(size: int, with_markers: bool, rng: random.Random) -> str:
+    parts = []
+    length = 0
+    while length < size:
+        piece = rng.choice(FILLER)
+        parts.append(piece)
+        length += len(piece)
+
+    if with_markers:
+        for marker in MARKERS:
+            parts.insert(rng.randrange(len(parts) + 1), marker)
+
+    return "".join(parts)
+
+
+def bench(name: str, func, responses: list, repeat: int) -> float:
+    def run():
+        for response in responses:
+            func(response)
+
+    best = min(timeit.repeat(run, number=repeat, repeat=5))
+    per_call = best / (repeat * len(responses)) * 1e6
+    print(f"  {name:<28} {per_call:8.2f} µs/response")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=4000, help="response length in chars")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+
+    for label, with_markers in (("with markers", True), ("no markers", False)):
+        responses = [make_response(args.size, with_markers, rng) for _ in range(10)]
+
+        # 确认两种实现的清理结果一致
+        for response in responses:
+            assert parse_markers(response)[0] == legacy_chain(response), "cleaned text mismatch"
+
+        avg_len = sum(map(len, responses)) // len(responses)
+        print(f"{label} (~{avg_len} chars):")
+        legacy = bench("legacy three-function chain", legacy_chain, responses, args.repeat)
+        single = bench("parse_markers (single pass)", parse_markers, responses, args.repeat)
+        print(f"  speedup: {legacy / single:.2f}x\n")
+
+
+if __name__ == '__main__':
+    main()
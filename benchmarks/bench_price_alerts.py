@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 一次价格检查周期，每个任务各查一次价格 vs PriceFeed 按币种共享
+
+旧实现按任务逐个检查，每个任务请求一次价格（--source-latency 模拟接口延迟）；
+PriceAlertService.tick() 按币种去重后一次批量请求，再分发给所有任务。
+
+用法：
+    python benchmarks/bench_price_alerts.py [--tasks 1000,10000] [--coins 5] [--source-latency 0.002]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from price_feed import PriceFeed, StubPriceSource  # noqa: E402
+from price_alerts import PriceAlertService, alert_triggered, task_coin  # noqa: E402
+
+COINS = ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE', 'ADA', 'TON']
+PRICES = {'BTC': 97000, 'ETH': 3400, 'SOL': 180, 'BNB': 650, 'XRP': 2.4, 'DOGE': 0.35, 'ADA': 1.0, 'TON': 5.5}
+
+
+class BenchDatabase:
+    """AsyncDatabase 里 PriceAlertService 用到的部分"""
+
+    def __init__(self, tasks: list):
+        self.tasks = {task['id']: task for task in tasks}
+
+    def supports(self, name: str) -> bool:
+        return name in ('get_active_tasks', 'update_task_next_run')
+
+    async def get_active_tasks(self):
+        return list(self.tasks.values())
+
+    async def update_task_next_run(self, task_id, next_run):
+        self.tasks[task_id]['next_run'] = next_run
+
+    async def delete_task(self, task_id):
+        self.tasks.pop(task_id, None)
+
+    async def checkpoint_tasks(self, next_runs, deleted):
+        for task_id, next_run in next_runs.items():
+            self.tasks[task_id]['next_run'] = next_run
+        for task_id in deleted:
+            self.tasks.pop(task_id, None)
+
+
+class BenchBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text):
+        self.sent += 1
+
+
+def make_tasks(count: int, coins: list, rng: random.Random) -> list:
+    due = datetime.now() - timedelta(minutes=1)
+    tasks = []
+    for i in range(count):
+        coin = rng.choice(coins)
+        factor = rng.choice([0.9, 0.95, 1.05, 1.1])
+        below = factor < 1
+        # 大约 1% 的任务会触发
+        if rng.random() < 0.01:
+            below = not below
+        tasks.append({
+            'id': i + 1, 'user_id': i + 1, 'task_type': 'price_monitor', 'next_run': due,
+            'config': {
+                'coin': coin, 'target_price': PRICES[coin] * factor,
+                'condition': 'below' if below else 'above', 'cooldown': 60,
+            },
+        })
+    return tasks
+
+
+async def legacy_tick(tasks: list, source: StubPriceSource) -> int:
+    fired = 0
+    for task in tasks:
+        prices = await source.fetch([task_coin(task)])
+        price = prices.get(task_coin(task))
+        if price is not None and alert_triggered(task['config'], price):
+            fired += 1
+    return fired
+
+
+async def run(args):
+    rng = random.Random(1)
+    coins = COINS[:args.coins]
+
+    print(f"{'tasks':>7} {'legacy req':>11} {'legacy':>10} {'shared req':>11} {'shared':>10} {'fired':>6}")
+    for count in (int(x) for x in args.tasks.split(',')):
+        tasks = make_tasks(count, coins, rng)
+
+        source = StubPriceSource(PRICES, latency=args.source_latency)
+        start = time.perf_counter()
+        legacy_fired = await legacy_tick(tasks, source)
+        legacy = time.perf_counter() - start
+        legacy_requests = source.requests
+
+        source = StubPriceSource(PRICES, latency=args.source_latency)
+        service = PriceAlertService(BenchDatabase(tasks), PriceFeed(source), BenchBot())
+        start = time.perf_counter()
+        fired = await service.tick()
+        shared = time.perf_counter() - start
+
+        assert fired == legacy_fired, (fired, legacy_fired)
+        print(
+            f"{count:>7} {legacy_requests:>11} {legacy * 1000:>7.0f} ms"
+            f" {source.requests:>11} {shared * 1000:>7.0f} ms {fired:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", default="1000,10000", help="comma separated task counts")
+    parser.add_argument("--coins", type=int, default=5)
+    parser.add_argument("--source-latency", type=float, default=0.002, help="seconds per price request")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
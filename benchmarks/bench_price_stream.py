@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 插针发生到发出提醒的延迟，按周期检查 vs 推送行情
+
+回放一段 BTC 行情（每秒 --tick-rate 笔），其中随机位置有一次持续 --wick 秒的插针，
+跌破 --alerts 个 price_monitor 任务的阈值后又回到原价。
+按周期检查每 --poll-interval 秒查一次价格（按同样的时间比例缩放，比如 60s 周期 /
+10s 插针 ≈ 2s 周期 / 0.33s 插针），推送行情由 PriceIngest 逐笔交给 on_price。
+
+用法：
+    python benchmarks/bench_price_stream.py [--trials 5] [--poll-interval 2] [--wick 0.5]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from price_feed import PriceFeed, StubPriceSource  # noqa: E402
+from price_alerts import PriceAlertService  # noqa: E402
+from price_stream import PriceIngest, ReplayPriceStream  # noqa: E402
+
+PRICE = 97000.0
+
+
+class BenchDatabase:
+    """AsyncDatabase 里 PriceAlertService 用到的部分"""
+
+    def __init__(self, tasks: list):
+        self.tasks = {task['id']: task for task in tasks}
+
+    def supports(self, name: str) -> bool:
+        return name in ('get_active_tasks', 'update_task_next_run')
+
+    async def get_active_tasks(self):
+        return list(self.tasks.values())
+
+    async def update_task_next_run(self, task_id, next_run):
+        self.tasks[task_id]['next_run'] = next_run
+
+    async def delete_task(self, task_id):
+        self.tasks.pop(task_id, None)
+
+    async def checkpoint_tasks(self, next_runs, deleted):
+        for task_id, next_run in next_runs.items():
+            self.tasks[task_id]['next_run'] = next_run
+        for task_id in deleted:
+            self.tasks.pop(task_id, None)
+
+
+class BenchBot:
+    def __init__(self):
+        self.first = None
+
+    async def send_message(self, chat_id, text):
+        if self.first is None:
+            self.first = time.monotonic()
+
+
+def make_tasks(count: int) -> list:
+    due = datetime.now() - timedelta(minutes=1)
+    return [
+        {'id': i + 1, 'user_id': i + 1, 'task_type': 'price_monitor', 'next_run': due,
+         'config': {'coin': 'BTC', 'target_price': PRICE * (0.98 - i * 0.0001),
+                    'condition': 'below', 'cooldown': 60}}
+        for i in range(count)
+    ]
+
+
+def make_replay(duration: float, rate: float, wick_at: float, wick: float, rng: random.Random) -> list:
+    ticks = []
+    for i in range(int(duration * rate)):
+        offset = i / rate
+        price = PRICE * (1 + rng.gauss(0, 0.0005))
+        if wick_at <= offset < wick_at + wick:
+            price *= 0.96
+        ticks.append((offset, 'BTC', price))
+    return ticks
+
+
+async def trial(args, rng: random.Random) -> tuple:
+    """返回 (按周期检查的延迟, 推送的延迟)，没发现插针为 None"""
+    duration = args.poll_interval * 2 + args.wick
+    wick_at = rng.uniform(args.poll_interval * 0.5, args.poll_interval * 1.5)
+    replay = make_replay(duration, args.tick_rate, wick_at, args.wick, rng)
+
+    # 按周期检查：后台把回放的价格写进行情源，PriceAlertService 每个周期查一次（不缓存）
+    source = StubPriceSource({'BTC': PRICE})
+    poll_bot = BenchBot()
+    poll = PriceAlertService(BenchDatabase(make_tasks(args.alerts)), PriceFeed(source, ttl=0),
+                             poll_bot, interval=args.poll_interval)
+    await poll.load()
+
+    async def feed_source():
+        async for symbol, price in ReplayPriceStream(replay).ticks():
+            source.set(symbol, price)
+
+    # 推送行情
+    push_bot = BenchBot()
+    feed = PriceFeed(StubPriceSource({}))
+    push = PriceAlertService(BenchDatabase(make_tasks(args.alerts)), feed, push_bot)
+    await push.load()
+    ingest = PriceIngest(ReplayPriceStream(replay), feed, push)
+
+    start = time.monotonic()
+    poll_loop = asyncio.ensure_future(poll.run())
+    await asyncio.gather(feed_source(), ingest.run())
+    await poll.close()
+    await poll_loop
+    await asyncio.sleep(0.05)
+
+    wick_start = start + wick_at
+    return tuple(
+        bot.first - wick_start if bot.first is not None else None
+        for bot in (poll_bot, push_bot)
+    )
+
+
+def report(name: str, latencies: list):
+    found = [latency for latency in latencies if latency is not None]
+    mean = f"{statistics.mean(found) * 1000:>8.0f} ms" if found else f"{'-':>11}"
+    worst = f"{max(found) * 1000:>8.0f} ms" if found else f"{'-':>11}"
+    print(f"{name:<6} {len(found):>4}/{len(latencies):<4} {mean} {worst}")
+
+
+async def run(args):
+    rng = random.Random(1)
+    poll, push = [], []
+    for _ in range(args.trials):
+        poll_latency, push_latency = await trial(args, rng)
+        poll.append(poll_latency)
+        push.append(push_latency)
+
+    print(f"alerts: {args.alerts}, wick: {args.wick}s, poll interval: {args.poll_interval}s")
+    print(f"{'mode':<6} {'found':>9} {'mean':>11} {'max':>11}")
+    report("poll", poll)
+    report("push", push)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--alerts", type=int, default=1000)
+    parser.add_argument("--tick-rate", type=float, default=20, help="ticks per second")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--wick", type=float, default=0.5, help="seconds below the thresholds")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: IntentRouter.classify vs 旧的逐个关键词扫描
+(detect_intent + browser_keywords + needs_worker 风格的关键词表)
+
+旧实现对每个关键词做一次 `kw in lower`，三张表各扫一遍；
+新实现一个编译好的正则扫描一次。--extra 额外生成关键词，看关键词表变大后的表现。
+
+用法：
+    python benchmarks/bench_router.py [--messages 20000] [--extra 0]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from intent_router import DEFAULT_KEYWORDS, IntentRouter, _Compiled  # noqa: E402
+
+WORKER_KEYWORDS = [
+    '监控', '提醒', '价格', '行情', '多少钱', '涨', '跌', 'price', 'monitor', 'alert',
+    'btc', 'eth', 'sol', '分析', '新闻', 'news', '搜索', '汇率', '天气', '定时',
+]
+
+MESSAGES = [
+    "帮助", "我的任务", "我是啥等级", "hi alice, how are you today?", "你今天心情怎么样",
+    "BTC price now?", "今天 BTC 怎么样", "帮我监控 BTC 跌破 90000 告诉我",
+    "search the latest ETH news", "帮我搜一下今天的新闻", "我有点累，陪我聊聊天",
+    "tell me a story about your cat, a long one with lots of details please",
+]
+
+
+# ==================== 旧实现 ====================
+
+def legacy_classify(text: str, config: dict) -> tuple:
+    lower = text.lower()
+    intent = None
+    for command, keywords in config['intent'].items():
+        if any(kw in lower for kw in keywords):
+            intent = command
+            break
+    browser = any(kw in lower for kw in config['browser'])
+    worker = any(kw in lower for kw in config['worker'])
+    return intent, browser, worker
+
+
+def make_config(extra: int, rng: random.Random) -> dict:
+    config = {
+        'intent': {k: list(v) for k, v in DEFAULT_KEYWORDS['intent'].items()},
+        'browser': list(DEFAULT_KEYWORDS['browser']),
+        'worker': list(WORKER_KEYWORDS),
+    }
+    alphabet = "abcdefghijklmnopqrstuvwxyz价格监控任务提醒浏览行情分析"
+    for i in range(extra):
+        word = "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 7)))
+        config['worker' if i % 2 else 'browser'].append(word)
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--extra", default="0,100,1000", help="comma separated extra keyword counts")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    messages = [rng.choice(MESSAGES) for _ in range(args.messages)]
+
+    print(f"{'keywords':>8} {'legacy':>14} {'router':>14} {'speedup':>8}")
+    for extra in (int(x) for x in args.extra.split(',')):
+        config = make_config(extra, rng)
+        router = IntentRouter()
+        router._compiled = _Compiled(config)
+
+        # 结果必须一致
+        for text in MESSAGES:
+            assert tuple(router.classify(text)) == legacy_classify(text, config), text
+
+        start = time.perf_counter()
+        for text in messages:
+            legacy_classify(text, config)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in messages:
+            router.classify(text)
+        routed = time.perf_counter() - start
+
+        total = len(router._compiled.categories)
+        print(
+            f"{total:>8} {len(messages) / legacy:>10.0f}/s {len(messages) / routed:>10.0f}/s"
+            f" {legacy / routed:>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
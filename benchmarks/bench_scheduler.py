@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 任务到期到开始执行的延迟，固定间隔轮询 vs HeapScheduler
+
+--tasks 个任务的 next_run 随机分布在 --window 秒内，处理函数只记录开始时间。
+轮询按旧调度器的方式模拟：每 --poll-interval 秒扫一遍所有任务，执行已到期的
+（按同样的时间比例缩放，比如 60s 间隔 / 1 小时窗口 ≈ 0.1s 间隔 / 6s 窗口）。
+
+用法：
+    python benchmarks/bench_scheduler.py [--tasks 2000] [--window 6] [--poll-interval 0.1]
+"""
+
+import os
+import sys
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from heap_scheduler import HeapScheduler  # noqa: E402
+
+
+class BenchDatabase:
+    def __init__(self, tasks: list):
+        self.tasks = {task['id']: task for task in tasks}
+
+    def supports(self, name: str) -> bool:
+        return name == 'get_active_tasks'
+
+    async def get_active_tasks(self):
+        return list(self.tasks.values())
+
+    async def delete_task(self, task_id):
+        self.tasks.pop(task_id, None)
+
+
+def make_tasks(count: int, window: float, rng: random.Random) -> list:
+    start = datetime.now() + timedelta(seconds=0.2)
+    return [
+        {'id': i + 1, 'user_id': i + 1, 'task_type': 'scheduled_report', 'config': {},
+         'next_run': start + timedelta(seconds=rng.uniform(0, window))}
+        for i in range(count)
+    ]
+
+
+def report(name: str, lateness: list, scanned: int):
+    lateness = sorted(lateness)
+    p99 = lateness[int(len(lateness) * 0.99) - 1]
+    print(
+        f"{name:<8} {statistics.mean(lateness) * 1000:>8.1f} ms {p99 * 1000:>8.1f} ms"
+        f" {max(lateness) * 1000:>8.1f} ms {scanned:>10}"
+    )
+
+
+async def run_poll(tasks: list, interval: float) -> tuple:
+    pending = list(tasks)
+    lateness = []
+    scanned = 0
+    while pending:
+        now = datetime.now()
+        scanned += len(pending)
+        due = [task for task in pending if task['next_run'] <= now]
+        pending = [task for task in pending if task['next_run'] > now]
+        lateness.extend((now - task['next_run']).total_seconds() for task in due)
+        await asyncio.sleep(interval)
+    return lateness, scanned
+
+
+async def run_heap(tasks: list) -> tuple:
+    lateness = []
+    done = asyncio.Event()
+
+    async def handler(bot, task):
+        lateness.append((datetime.now() - task['next_run']).total_seconds())
+        if len(lateness) == len(tasks):
+            done.set()
+        return None
+
+    scheduler = HeapScheduler(BenchDatabase(tasks), max_concurrency=64, mode="heap")
+    scheduler.register('scheduled_report', handler)
+    loop = asyncio.ensure_future(scheduler.run())
+    await done.wait()
+    scheduler.close()
+    await loop
+    return lateness, len(tasks)
+
+
+async def run(args):
+    rng = random.Random(1)
+    print(f"{'mode':<8} {'mean':>11} {'p99':>11} {'max':>11} {'scanned':>10}")
+
+    tasks = make_tasks(args.tasks, args.window, rng)
+    report("poll", *await run_poll(tasks, args.poll_interval))
+
+    tasks = make_tasks(args.tasks, args.window, rng)
+    report("heap", *await run_heap(tasks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--window", type=float, default=6.0, help="seconds over which tasks fall due")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
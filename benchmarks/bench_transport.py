@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker payload 大小与编解码开销，argv (--memory JSON) vs worker_transport 帧
+
+argv 路径按旧实现计算：记忆 json.dumps（默认转义非 ASCII）后作为一个参数，
+创建容器时整条 Cmd 又被 Docker API 的请求体 JSON 编码一遍。
+帧格式为紧凑 JSON（以及装了 msgpack 时的 msgpack）。
+
+用法：
+    python benchmarks/bench_transport.py [--rows 20] [--repeat 2000]
+"""
+
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from worker_transport import encode_payload, decode_payload, msgpack  # noqa: E402
+
+# Linux 单个 argv 元素的上限（MAX_ARG_STRLEN = 32 * PAGE_SIZE）
+MAX_ARG_STRLEN = 131072
+
+PHRASES = [
+    "BTC 现在大约 $97,000，4 小时级别在盘整，",
+    "帮我看看 ETH 的走势，",
+    "Sure! Here's a quick summary of today's market. ",
+    "支撑位在 92000 附近，跌破的话可能回踩 88000。",
+    "I'll keep an eye on it and let you know. ",
+    "记得设置止损哦～",
+]
+
+
+def make_memory(rows: int, row_chars: int, rng: random.Random) -> list:
+    memory = []
+    for i in range(rows):
+        content = ""
+        while len(content) < row_chars:
+            content += rng.choice(PHRASES)
+        memory.append({'role': 'user' if i % 2 == 0 else 'assistant', 'content': content[:row_chars]})
+    return memory
+
+
+def argv_payload(prompt: str, memory: list) -> tuple:
+    """旧实现：返回 (--memory 参数字节数, Docker API Cmd 字节数)"""
+    arg = json.dumps(memory)
+    cmd = ["python", "worker.py", "--prompt", prompt, "--memory", arg]
+    return len(arg.encode("utf-8")), len(json.dumps({"Cmd": cmd}).encode("utf-8"))
+
+
+def fmt_size(n: int) -> str:
+    return f"{n / 1024:8.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20, help="memory rows per request")
+    parser.add_argument("--row-chars", default="100,500,2000,8000",
+                        help="comma separated chars per memory row")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    prompt = "帮我监控 BTC 跌破 90000 告诉我"
+    formats = [('json', False)] + ([('msgpack', True)] if msgpack is not None else [])
+
+    print(f"{args.rows} memory rows; msgpack {'available' if msgpack else 'not installed'}")
+    print()
+    header = f"{'row chars':>9} {'argv arg':>11} {'docker Cmd':>11}"
+    for name, _ in formats:
+        header += f" {'frame ' + name:>14}"
+    print(header + "   argv limit")
+
+    timings = []
+    for row_chars in (int(x) for x in args.row_chars.split(',')):
+        memory = make_memory(args.rows, row_chars, rng)
+        arg_size, cmd_size = argv_payload(prompt, memory)
+
+        line = f"{row_chars:>9} {fmt_size(arg_size)} {fmt_size(cmd_size)}"
+        for _, use_msgpack in formats:
+            line += f" {fmt_size(len(encode_payload(prompt, memory, use_msgpack))):>14}"
+        line += "   OVER" if arg_size > MAX_ARG_STRLEN else "   ok"
+        print(line)
+
+        # 编码 + 解码（worker 侧解析）耗时
+        def legacy():
+            json.loads(json.dumps(memory))
+
+        legacy_time = timeit.timeit(legacy, number=args.repeat) / args.repeat
+        row = [row_chars, legacy_time]
+        for _, use_msgpack in formats:
+            def framed(use_msgpack=use_msgpack):
+                decode_payload(encode_payload(prompt, memory, use_msgpack))
+            row.append(timeit.timeit(framed, number=args.repeat) / args.repeat)
+        timings.append(row)
+
+    print()
+    header = f"{'row chars':>9} {'argv json':>11}"
+    for name, _ in formats:
+        header += f" {'frame ' + name:>14}"
+    print(header + "   (encode + decode per request)")
+    for row_chars, legacy_time, *framed_times in timings:
+        line = f"{row_chars:>9} {legacy_time * 1e6:8.1f} us"
+        for value in framed_times:
+            line += f" {value * 1e6:11.1f} us"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+"""
+Benchmark 用的进程内假实现：不需要 Telegram、Docker、数据库和 LLM 就能跑 main.py
+
+install() 把假的 telegram、telegram.ext、docker、dotenv、database、scheduler、
+molt_manager、conversation_handler 模块注册进 sys.modules，之后即可 import main。
+每个假实现都按配置的延迟 sleep，阻塞 / 非阻塞行为和生产环境一致。
+"""
+
+import sys
+import time
+import types
+import asyncio
+import random
+import itertools
+import threading
+from datetime import datetime
+
+
+class Latency:
+    """各假实现共用的延迟配置（秒）"""
+
+    def __init__(self, worker: float = 0.2, llm: float = 0.05, db: float = 0.001,
+                 docker_api: float = 0.005, chunks: int = 8):
+        self.worker = worker
+        self.llm = llm
+        self.db = db
+        self.docker_api = docker_api
+        self.chunks = chunks
+
+
+# ==================== Telegram ====================
+
+class FakeSentMessage:
+    def __init__(self, chat, text: str):
+        self.chat = chat
+        self.text = text
+
+    async def edit_text(self, text: str):
+        self.chat.edits += 1
+        self.text = text
+        return self
+
+
+class FakeChat:
+    def __init__(self):
+        self.sent = 0
+        self.edits = 0
+
+
+class FakeMessage:
+    def __init__(self, chat: FakeChat, text: str):
+        self.chat = chat
+        self.text = text
+        self.replies = []
+        self.first_reply_at = None
+
+    async def reply_text(self, text: str, **kwargs):
+        self.chat.sent += 1
+        self.replies.append(text)
+        if self.first_reply_at is None:
+            self.first_reply_at = time.perf_counter()
+        return FakeSentMessage(self.chat, text)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, username: str):
+        self.id = user_id
+        self.username = username
+        self.first_name = username
+
+
+class FakeUpdate:
+    def __init__(self, user_id: int, text: str, chat: FakeChat):
+        self.effective_user = FakeUser(user_id, f"user{user_id}")
+        self.effective_chat = types.SimpleNamespace(id=user_id)
+        self.message = FakeMessage(chat, text)
+
+
+class FakeContext:
+    def __init__(self, args: list = None):
+        self.args = args or []
+
+
+def _telegram_modules():
+    telegram = types.ModuleType("telegram")
+    telegram.Update = FakeUpdate
+
+    ext = types.ModuleType("telegram.ext")
+
+    class _Placeholder:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    ext.ApplicationBuilder = _Placeholder
+    ext.CommandHandler = _Placeholder
+    ext.MessageHandler = _Placeholder
+    ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    ext.filters = types.SimpleNamespace(TEXT=0, COMMAND=0)
+    telegram.ext = ext
+    return {"telegram": telegram, "telegram.ext": ext}
+
+
+# ==================== Worker output ====================
+
+WORKER_REPLIES = [
+    "BTC 现在大约 $97,000，4 小时级别在盘整。",
+    "Sure! Here's a quick summary of today's market: BTC is flat, ETH is up 2%.",
+    "已帮你设置好了 [TASK_CREATE]{\"type\": \"price_monitor\", \"config\": "
+    "{\"coin\": \"BTC\", \"target_price\": 90000, \"condition\": \"below\", \"cooldown\": 60}}"
+    "[/TASK_CREATE]",
+    "好的，记住你了 [USER_INFO]{\"nickname\": \"小王\"}[/USER_INFO] 有什么想问的？",
+    "Done [TASK_DELETE]{\"coin\": \"BTC\"}[/TASK_DELETE]",
+]
+
+
+def worker_reply(prompt: str) -> str:
+    return random.choice(WORKER_REPLIES) + f"\n\n(re: {prompt[:30]})"
+
+
+# ==================== Docker ====================
+
+class FakeDockerError(Exception):
+    pass
+
+
+class FakeNotFound(FakeDockerError):
+    pass
+
+
+class FakeImageNotFound(FakeDockerError):
+    pass
+
+
+class FakeSocket:
+    """attach_socket() 返回的 socket，记录写入的 stdin"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def sendall(self, data: bytes):
+        self.data.extend(data)
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeContainer:
+    def __init__(self, latency: Latency, name: str, command: list):
+        self.latency = latency
+        self.name = name
+        self.id = name
+        self.command = command
+        self.status = "running"
+        self.stdin = FakeSocket()
+
+    def _prompt(self) -> str:
+        if self.command and "--prompt" in self.command:
+            return self.command[self.command.index("--prompt") + 1]
+        if self.stdin.data:
+            from worker_transport import decode_payload
+            return decode_payload(bytes(self.stdin.data))[0]
+        return ""
+
+    def attach_socket(self, params: dict = None):
+        return self.stdin
+
+    def start(self):
+        time.sleep(self.latency.docker_api)
+
+    def logs(self, stream: bool = False, follow: bool = False):
+        data = worker_reply(self._prompt()).encode("utf-8")
+        if not stream:
+            time.sleep(self.latency.worker)
+            return data
+
+        def chunks():
+            n = max(1, self.latency.chunks)
+            step = max(1, len(data) // n + 1)
+            for i in range(0, len(data), step):
+                time.sleep(self.latency.worker / n)
+                yield data[i:i + step]
+        return chunks()
+
+    def wait(self, timeout: int = None):
+        time.sleep(self.latency.worker)
+        return {"StatusCode": 0}
+
+    def kill(self):
+        pass
+
+    def remove(self, force: bool = False):
+        time.sleep(self.latency.docker_api)
+
+    def update(self, **kwargs):
+        pass
+
+
+class FakeContainers:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def get(self, name: str):
+        time.sleep(self.latency.docker_api)
+        raise FakeNotFound(name)
+
+    def list(self, all: bool = False, filters: dict = None):
+        return []
+
+    def create(self, image: str, command: list = None, **kwargs):
+        time.sleep(self.latency.docker_api)
+        return FakeContainer(self.latency, kwargs.get("name", "c"), command)
+
+    def run(self, image: str, command: list = None, **kwargs):
+        time.sleep(self.latency.docker_api)
+        return FakeContainer(self.latency, kwargs.get("name", "c"), command)
+
+
+class FakeDockerClient:
+    def __init__(self, latency: Latency):
+        self.containers = FakeContainers(latency)
+        self.api = types.SimpleNamespace()
+
+
+class FakeAsyncDocker:
+    """async_docker.AsyncDockerClient 的替身，不 sleep 线程"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.containers = {}
+        self.requests = 0
+
+    async def _api(self):
+        self.requests += 1
+        await asyncio.sleep(self.latency.docker_api)
+
+    async def remove(self, name: str, force: bool = False):
+        await self._api()
+        if self.containers.pop(name, None) is None:
+            import async_docker
+            raise async_docker.NotFound(404, f"No such container: {name}")
+
+    async def create(self, image: str, command: list = None, name: str = None, **kwargs) -> str:
+        await self._api()
+        self.containers[name] = FakeContainer(self.latency, name, command)
+        return name
+
+    async def start(self, container_id: str):
+        await self._api()
+
+    async def run(self, image: str, command: list = None, **kwargs) -> str:
+        container_id = await self.create(image, command, **kwargs)
+        await self.start(container_id)
+        return container_id
+
+    async def start_with_stdin(self, container_id: str, payload: bytes):
+        self.containers[container_id].stdin.sendall(payload)
+        await self.start(container_id)
+
+    async def kill(self, container_id: str):
+        await self._api()
+
+    async def logs(self, container_id: str, follow: bool = True):
+        container = self.containers[container_id]
+        data = worker_reply(container._prompt()).encode("utf-8")
+        n = max(1, self.latency.chunks)
+        step = max(1, len(data) // n + 1)
+        for i in range(0, len(data), step):
+            await asyncio.sleep(self.latency.worker / n)
+            yield data[i:i + step]
+
+    async def close(self):
+        pass
+
+
+def _docker_modules(latency: Latency):
+    docker = types.ModuleType("docker")
+    docker.errors = types.SimpleNamespace(
+        NotFound=FakeNotFound,
+        ImageNotFound=FakeImageNotFound,
+        APIError=FakeDockerError,
+        DockerException=FakeDockerError,
+    )
+    docker.from_env = lambda: FakeDockerClient(latency)
+
+    utils = types.ModuleType("docker.utils")
+    socket_mod = types.ModuleType("docker.utils.socket")
+    socket_mod.frames_iter = lambda sock, tty: iter(())
+    socket_mod.consume_socket_output = lambda frames, demux=False: b"".join(frames)
+    utils.socket = socket_mod
+    docker.utils = utils
+
+    return {"docker": docker, "docker.utils": utils, "docker.utils.socket": socket_mod}
+
+
+# ==================== Database ====================
+
+class FakeDatabase:
+    """get_db() 接口的内存实现"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.users = {}
+        self.preferences = {}
+        self.memories = {}
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def _query(self):
+        with self._lock:
+            self.queries += 1
+        if self.latency.db:
+            time.sleep(self.latency.db)
+
+    def get_user(self, user_id):
+        self._query()
+        return self.users.get(user_id)
+
+    def create_user(self, user_id, username, tier='bronze'):
+        self._query()
+        self.users[user_id] = {
+            'user_id': user_id, 'username': username, 'tier': tier,
+            'created_at': datetime.now(),
+        }
+
+    def get_or_create_user(self, user_id, username):
+        if user_id not in self.users:
+            self.create_user(user_id, username)
+        return self.users[user_id]
+
+    def get_user_tier(self, user_id):
+        self._query()
+        return self.users[user_id]['tier']
+
+    def update_user_tier(self, user_id, tier):
+        self._query()
+        self.users[user_id]['tier'] = tier
+
+    def get_user_preference(self, user_id, key):
+        self._query()
+        return self.preferences.get((user_id, key))
+
+    def set_user_preference(self, user_id, key, value):
+        self._query()
+        self.preferences[(user_id, key)] = value
+
+    def get_memories_for_context(self, user_id, limit=20):
+        self._query()
+        return list(self.memories.get(user_id, ()))[-limit:]
+
+    def get_memories(self, user_id, limit=10):
+        return self.get_memories_for_context(user_id, limit)
+
+    def get_memory_count(self, user_id):
+        self._query()
+        return len(self.memories.get(user_id, ()))
+
+    def add_memory(self, user_id, role, content):
+        self._query()
+        self.memories.setdefault(user_id, []).append({'role': role, 'content': content})
+
+    def add_memories(self, rows):
+        self._query()
+        for user_id, role, content in rows:
+            self.memories.setdefault(user_id, []).append({'role': role, 'content': content})
+
+    def create_task(self, user_id, task_type, config, next_run):
+        self._query()
+        task_id = next(self._ids)
+        self.tasks[task_id] = {
+            'id': task_id, 'user_id': user_id, 'task_type': task_type,
+            'config': config, 'next_run': next_run,
+        }
+        return task_id
+
+    def get_task(self, task_id):
+        self._query()
+        return self.tasks.get(task_id)
+
+    def get_user_tasks(self, user_id):
+        self._query()
+        return [task for task in self.tasks.values() if task['user_id'] == user_id]
+
+    def get_active_tasks(self):
+        self._query()
+        return list(self.tasks.values())
+
+    def delete_task(self, task_id):
+        self._query()
+        self.tasks.pop(task_id, None)
+
+    def get_stats(self):
+        return {'users': len(self.users)}
+
+
+# ==================== Other project modules ====================
+
+class FakeScheduler:
+    def start(self, loop):
+        pass
+
+
+class FakeMoltManager:
+    def __init__(self, db, docker_client, latency: Latency = None):
+        self.latency = latency
+
+    def send_message(self, user_id, prompt, memory=None):
+        time.sleep(self.latency.worker)
+        return worker_reply(prompt)
+
+    def list_active_workers(self):
+        return []
+
+
+WORKER_WORDS = ('btc', 'eth', '价格', '监控', 'price', 'search', '搜索', '新闻')
+
+
+class FakeConversationHandler:
+    """同步的 LLM 替身，和真实的 generate_reply 一样会阻塞"""
+
+    latency = None
+
+    def needs_worker(self, text: str) -> bool:
+        lower = text.lower()
+        return any(word in lower for word in WORKER_WORDS)
+
+    def generate_reply(self, text, memory=None, user_name=None, user_tier=None):
+        time.sleep(self.latency.llm)
+        return f"hey {user_name or 'there'}! {text[:40]} ☀️"
+
+    def stream_reply(self, text, memory=None, user_name=None, user_tier=None):
+        reply = f"hey {user_name or 'there'}! {text[:40]} ☀️"
+        n = max(1, self.latency.chunks)
+        step = max(1, len(reply) // n + 1)
+        for i in range(0, len(reply), step):
+            time.sleep(self.latency.llm / n)
+            yield reply[i:i + step]
+
+
+def install(latency: Latency) -> types.SimpleNamespace:
+    """注册所有假模块；必须在 import main 之前调用"""
+    modules = {}
+    modules.update(_telegram_modules())
+    modules.update(_docker_modules(latency))
+
+    dotenv = types.ModuleType("dotenv")
+    dotenv.load_dotenv = lambda *args, **kwargs: None
+    modules["dotenv"] = dotenv
+
+    shared_db = FakeDatabase(latency)
+    database = types.ModuleType("database")
+    database.get_db = lambda: shared_db
+    modules["database"] = database
+
+    scheduler = types.ModuleType("scheduler")
+    scheduler.init_scheduler = lambda db, bot, check_interval=60: FakeScheduler()
+    modules["scheduler"] = scheduler
+
+    molt_manager = types.ModuleType("molt_manager")
+    molt_manager.MoltManager = lambda db, docker_client: FakeMoltManager(db, docker_client, latency)
+    modules["molt_manager"] = molt_manager
+
+    FakeConversationHandler.latency = latency
+    conversation_handler = types.ModuleType("conversation_handler")
+    conversation_handler.ConversationHandler = FakeConversationHandler
+    modules["conversation_handler"] = conversation_handler
+
+    sys.modules.update(modules)
+    return types.SimpleNamespace(db=shared_db, latency=latency)
@@ -0,0 +1,130 @@
+"""
+Context Cache - 按用户缓存最近 N 条对话记忆（LRU）
+
+活跃用户每条消息都要读一次上下文，缓存命中时省掉一次数据库查询。
+新记忆通过 append() 增量更新，容量按用户数和内容字节数双重限制。
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+
+# 每条记忆除内容外的估算开销（字节）
+ROW_OVERHEAD = 100
+
+
+def _row_size(row: dict) -> int:
+    return len(row.get('content') or '') + ROW_OVERHEAD
+
+
+class ContextCache:
+    """
+    用户上下文窗口的 LRU 缓存
+
+    - window: 每个用户缓存的记忆条数（与 get_memories_for_context 的 limit 一致）
+    - max_users: 最多缓存多少个用户
+    - max_bytes: 缓存内容的估算总字节数上限
+    """
+
+    def __init__(self, window: int = 20, max_users: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.window = window
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()   # user_id -> deque(rows)
+        self._sizes = {}                # user_id -> 估算字节数
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, window: int = 20) -> "ContextCache":
+        """从环境变量读取配置"""
+        return cls(
+            window=window,
+            max_users=int(os.getenv("CONTEXT_CACHE_MAX_USERS", 10000)),
+            max_bytes=int(os.getenv("CONTEXT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+
+    def get(self, user_id: int, limit: int) -> list | None:
+        """命中时返回最近 limit 条记忆，未命中返回 None"""
+        with self._lock:
+            rows = self._entries.get(user_id) if limit <= self.window else None
+            if rows is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return list(rows)[-limit:]
+
+    def put(self, user_id: int, rows: list, limit: int):
+        """缓存从数据库加载的窗口（limit 小于窗口大小时窗口不完整，不缓存）"""
+        if limit < self.window:
+            return
+
+        window = deque(rows[-self.window:], maxlen=self.window)
+        size = sum(_row_size(row) for row in window)
+
+        with self._lock:
+            self._remove(user_id)
+            self._entries[user_id] = window
+            self._sizes[user_id] = size
+            self._bytes += size
+            self._evict()
+
+    def append(self, user_id: int, role: str, content: str):
+        """追加一条新记忆（只更新已缓存的用户）"""
+        row = {'role': role, 'content': content}
+
+        with self._lock:
+            rows = self._entries.get(user_id)
+            if rows is None:
+                return
+
+            if len(rows) == rows.maxlen:
+                dropped = _row_size(rows[0])
+                self._sizes[user_id] -= dropped
+                self._bytes -= dropped
+
+            rows.append(row)
+            size = _row_size(row)
+            self._sizes[user_id] += size
+            self._bytes += size
+
+            self._entries.move_to_end(user_id)
+            self._evict()
+
+    def invalidate(self, user_id: int):
+        """丢弃某个用户的缓存"""
+        with self._lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id: int):
+        if self._entries.pop(user_id, None) is not None:
+            self._bytes -= self._sizes.pop(user_id)
+
+    def _evict(self):
+        # 淘汰最久未使用的用户，至少保留最近一个
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_users or self._bytes > self.max_bytes
+        ):
+            user_id, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(user_id)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """命中率等统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'users': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,282 @@
+"""
+Gold Hibernation - 空闲 Gold 容器的休眠与快速恢复
+
+MoltManager 给每个 Gold 用户一个常驻容器，用户不说话时容器也一直占着内存。
+这里记录每个用户最后一次请求的时间，空闲超过 GOLD_IDLE_MINUTES 的容器进入休眠，
+下一次请求前（run_gold_worker）再唤醒：
+
+- pause: docker pause，冻结进程，恢复最快（毫秒级）；只释放 CPU，内存仍然占用
+- checkpoint: CRIU 检查点后停止容器，内存全部释放，恢复时从检查点还原进程状态
+  （需要 daemon 开启 experimental 并安装 CRIU，只能走异步 Docker 客户端）
+- stop: 直接停止容器，内存全部释放，恢复时重新启动（进程内状态丢失）
+- off: 关闭（默认）
+
+有请求在进行的容器不会休眠。容器按 MOLT_CONTAINER_NAME 模板找到，必须和 MoltManager
+的命名一致；休眠中的容器只有经过 run_gold_worker 才会被唤醒，绕过它（MoltManager
+内部、外部调度）访问 paused 容器会卡住，确认这两点后再开启。
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+MODES = ('pause', 'checkpoint', 'stop', 'off')
+
+# 检查点名称（每个容器只保留一个）
+CHECKPOINT_NAME = "alice-idle"
+
+
+class GoldHibernator:
+    """
+    Gold 容器的空闲策略
+
+    - docker_client: docker-py 客户端（没有异步客户端时在线程里调用）
+    - adocker: AsyncDockerClient；为 None 时走 docker_client
+    - name_template: 容器名模板（含 {user_id}），与 MoltManager 创建容器时一致
+    - idle_timeout: 空闲多少秒后休眠
+    - mode: pause / checkpoint / stop / off
+    - check_interval: 检查空闲容器的间隔（秒）
+    """
+
+    def __init__(self, docker_client, adocker=None, name_template: str = "alice_molt_{user_id}",
+                 idle_timeout: float = 900, mode: str = "off", check_interval: float = 60):
+        if mode not in MODES:
+            raise ValueError(f"Unknown hibernate mode {mode!r}, expected one of {MODES}")
+        if mode == 'checkpoint' and adocker is None:
+            # docker-py 没有检查点 API；退回到不丢状态的 pause
+            logger.warning("Gold checkpoint hibernation needs DOCKER_MODE=async, using pause")
+            mode = 'pause'
+
+        self.docker_client = docker_client
+        self.adocker = adocker
+        self.name_template = name_template
+        self.idle_timeout = idle_timeout
+        self.mode = mode
+        self.check_interval = check_interval
+
+        self._last_active = {}      # user_id -> 最后一次请求的时间（monotonic）
+        self._inflight = {}         # user_id -> 进行中的请求数
+        self._hibernated = {}       # user_id -> 休眠方式
+        self._locks = {}            # user_id -> asyncio.Lock，休眠 / 唤醒互斥
+        self._closed = False
+
+        self.hibernations = 0
+        self.resumes = 0
+        self._resume_time = 0.0
+
+    @classmethod
+    def from_env(cls, docker_client, adocker=None) -> "GoldHibernator":
+        """从环境变量读取配置"""
+        return cls(
+            docker_client,
+            adocker,
+            name_template=os.getenv("MOLT_CONTAINER_NAME", "alice_molt_{user_id}"),
+            idle_timeout=float(os.getenv("GOLD_IDLE_MINUTES", 15)) * 60,
+            mode=os.getenv("GOLD_HIBERNATE_MODE", "off"),
+            check_interval=float(os.getenv("GOLD_IDLE_CHECK_INTERVAL", 60)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off' and self.idle_timeout > 0
+
+    def container_name(self, user_id: int) -> str:
+        return self.name_template.format(user_id=user_id)
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def seed(self, workers: list):
+        """
+        启动时登记已经存在的容器（molt_manager.list_active_workers() 的结果）
+
+        上次运行留下的 paused 容器直接记为休眠，其余从现在开始计算空闲时间。
+        """
+        now = time.monotonic()
+        for user_id, status in workers:
+            if status == 'paused':
+                self._hibernated[user_id] = 'pause'
+            else:
+                self._last_active.setdefault(user_id, now)
+
+    # ==================== Requests ====================
+
+    @asynccontextmanager
+    async def active(self, user_id: int):
+        """包住一次 Gold 请求：确保容器醒着，期间不会被休眠"""
+        self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+        self._last_active[user_id] = time.monotonic()
+        try:
+            await self.ensure_awake(user_id)
+            yield
+        finally:
+            self._inflight[user_id] -= 1
+            if not self._inflight[user_id]:
+                del self._inflight[user_id]
+            self._last_active[user_id] = time.monotonic()
+
+    async def ensure_awake(self, user_id: int) -> bool:
+        """休眠中的容器恢复运行；返回是否做了恢复"""
+        lock = self._lock(user_id)
+        # 正在休眠的容器也要等休眠完成后再唤醒
+        if user_id not in self._hibernated and not lock.locked():
+            return False
+
+        async with lock:
+            mode = self._hibernated.get(user_id)
+            if mode is None:
+                return False
+
+            start = time.monotonic()
+            name = self.container_name(user_id)
+            try:
+                await self._resume(name, mode)
+            except Exception as e:
+                # 容器可能已被删除：交给 MoltManager 重新创建
+                logger.warning(f"Failed to resume Gold container {name} ({mode}): {e}")
+            del self._hibernated[user_id]
+
+            elapsed = time.monotonic() - start
+            self.resumes += 1
+            self._resume_time += elapsed
+            logger.info(f"Resumed Gold container {name} ({mode}) in {elapsed * 1000:.0f}ms")
+            return True
+
+    # ==================== Hibernation ====================
+
+    async def hibernate(self, user_id: int) -> bool:
+        """让空闲的容器休眠；有请求在进行或已经休眠时返回 False"""
+        async with self._lock(user_id):
+            if user_id in self._hibernated or self._inflight.get(user_id):
+                return False
+
+            name = self.container_name(user_id)
+            try:
+                await self._suspend(name, self.mode)
+            except Exception as e:
+                logger.warning(f"Failed to hibernate Gold container {name} ({self.mode}): {e}")
+                # 容器不在了就不再跟踪
+                self._last_active.pop(user_id, None)
+                return False
+
+            self._hibernated[user_id] = self.mode
+            self._last_active.pop(user_id, None)
+            self.hibernations += 1
+            logger.info(f"Hibernated idle Gold container {name} ({self.mode})")
+            return True
+
+    def idle_users(self) -> list:
+        now = time.monotonic()
+        return [
+            user_id for user_id, last in self._last_active.items()
+            if now - last >= self.idle_timeout
+            and not self._inflight.get(user_id)
+            and user_id not in self._hibernated
+        ]
+
+    async def reap(self) -> int:
+        """休眠所有空闲超时的容器，返回休眠的数量"""
+        if not self.enabled:
+            return 0
+        count = 0
+        for user_id in self.idle_users():
+            if await self.hibernate(user_id):
+                count += 1
+        return count
+
+    async def run(self):
+        """后台循环：定期休眠空闲容器"""
+        while not self._closed:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Gold hibernation error: {e}")
+
+    def close(self):
+        self._closed = True
+
+    # ==================== Docker ====================
+
+    async def _suspend(self, name: str, mode: str):
+        if self.adocker is not None:
+            if mode == 'pause':
+                await self.adocker.pause(name)
+            elif mode == 'checkpoint':
+                await self.adocker.checkpoint(name, CHECKPOINT_NAME, exit=True)
+            else:
+                await self.adocker.stop(name)
+            return
+
+        def suspend():
+            container = self.docker_client.containers.get(name)
+            if mode == 'pause':
+                container.pause()
+            else:
+                container.stop()
+
+        await asyncio.to_thread(suspend)
+
+    async def _resume(self, name: str, mode: str):
+        if self.adocker is not None:
+            if mode == 'pause':
+                await self.adocker.unpause(name)
+            elif mode == 'checkpoint':
+                try:
+                    await self.adocker.start(name, checkpoint=CHECKPOINT_NAME)
+                except Exception as e:
+                    # 检查点恢复失败时冷启动，至少容器能用
+                    logger.warning(f"Checkpoint restore failed for {name}, starting fresh: {e}")
+                    await self.adocker.start(name)
+                try:
+                    await self.adocker.delete_checkpoint(name, CHECKPOINT_NAME)
+                except Exception:
+                    pass
+            else:
+                await self.adocker.start(name)
+            return
+
+        def resume():
+            container = self.docker_client.containers.get(name)
+            if mode == 'pause':
+                container.unpause()
+            else:
+                container.start()
+
+        await asyncio.to_thread(resume)
+
+    # ==================== Stats ====================
+
+    def annotate(self, workers: list) -> list:
+        """
+        在 list_active_workers() 的结果上标出休眠中的容器
+
+        stop / checkpoint 休眠的容器已经停止，MoltManager 可能不再列出，这里补上。
+        """
+        listed = []
+        seen = set()
+        for user_id, status in workers:
+            seen.add(user_id)
+            mode = self._hibernated.get(user_id)
+            listed.append((user_id, f"hibernated ({mode})" if mode else status))
+        for user_id, mode in self._hibernated.items():
+            if user_id not in seen:
+                listed.append((user_id, f"hibernated ({mode})"))
+        return listed
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode if self.enabled else 'off',
+            'hibernated': len(self._hibernated),
+            'tracked': len(self._last_active),
+            'hibernations': self.hibernations,
+            'resumes': self.resumes,
+            'avg_resume_ms': self._resume_time / self.resumes * 1000 if self.resumes else 0.0,
+        }
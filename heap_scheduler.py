@@ -0,0 +1,237 @@
+"""
+Heap Scheduler - 按 next_run 排序的最小堆调度器
+
+固定间隔轮询（check_interval=60）每次都要扫一遍所有任务，到期的任务最多还要等
+一个周期。这里把任务按 next_run 放进最小堆，只睡到堆顶任务到期；新建的任务比堆顶
+更早时（add_task）立即唤醒重新计算。
+
+启动时从数据库（get_active_tasks）重建堆，之后随任务的创建 / 删除增减，并每隔
+resync_interval 和数据库重新对齐一次。
+
+每种任务类型注册一个处理函数 handler(bot, task)，返回下一次运行时间
+（None 表示不再运行，任务从数据库删除）。没有注册的类型不归这里管。
+
+SCHEDULER_MODE=heap 开启（需要数据库支持 get_active_tasks），默认 poll 沿用原调度器。
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+class HeapScheduler:
+    """
+    最小堆调度器
+
+    - adb: AsyncDatabase
+    - bot: telegram Bot，传给处理函数；可以在启动前再设置
+    - resync_interval: 和数据库重新对齐的间隔（秒）
+    - max_concurrency: 同时执行的任务数上限
+    - retry_delay: 处理函数出错后多久重试（秒）
+    """
+
+    def __init__(self, adb, bot=None, resync_interval: float = 600, max_concurrency: int = 4,
+                 retry_delay: float = 300, mode: str = "heap"):
+        self.adb = adb
+        self.bot = bot
+        self.resync_interval = resync_interval
+        self.max_concurrency = max_concurrency
+        self.retry_delay = retry_delay
+        self.mode = mode
+
+        self.handlers = {}      # task_type -> handler(bot, task)
+        self._heap = []         # [(next_run, seq, task_id)]，过期条目惰性删除
+        self._tasks = {}        # task_id -> [task, next_run]；执行中 next_run 为 None
+        self._seq = itertools.count()
+        self._running = set()
+        self._slots = None
+        self._wakeup = None
+        self._loaded_at = None
+        self._closed = False
+
+        self.executed = 0
+        self.failed = 0
+        self.wakeups = 0
+
+    @classmethod
+    def from_env(cls, adb, bot=None) -> "HeapScheduler":
+        """从环境变量读取配置"""
+        return cls(
+            adb,
+            bot,
+            resync_interval=float(os.getenv("SCHEDULER_RESYNC_INTERVAL", 600)),
+            max_concurrency=int(os.getenv("SCHEDULER_MAX_CONCURRENCY", 4)),
+            mode=os.getenv("SCHEDULER_MODE", "poll"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "heap" and self.adb.supports('get_active_tasks')
+
+    def register(self, task_type: str, handler):
+        """注册一种任务类型的处理函数"""
+        self.handlers[task_type] = handler
+
+    # ==================== Heap ====================
+
+    def _push(self, task_id, next_run: datetime):
+        entry = self._tasks[task_id]
+        entry[1] = next_run
+        heapq.heappush(self._heap, (next_run, next(self._seq), task_id))
+
+    def _head(self):
+        """堆顶的有效条目（顺便丢掉过期的）"""
+        while self._heap:
+            next_run, _, task_id = self._heap[0]
+            entry = self._tasks.get(task_id)
+            if entry is not None and entry[1] == next_run:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def load(self):
+        """从数据库重建堆（执行中的任务保留）"""
+        now = datetime.now()
+        tasks = [
+            task for task in await self.adb.get_active_tasks()
+            if task.get('task_type') in self.handlers
+        ]
+
+        running = {task_id: self._tasks[task_id] for task_id in self._running if task_id in self._tasks}
+        self._tasks = dict(running)
+        self._heap = []
+        for task in tasks:
+            if task['id'] in running:
+                continue
+            next_run = _parse_time(task.get('next_run')) or now
+            self._tasks[task['id']] = [task, next_run]
+            self._heap.append((next_run, next(self._seq), task['id']))
+        heapq.heapify(self._heap)
+
+        self._loaded_at = time.monotonic()
+        logger.info(f"Scheduler loaded {len(self._tasks)} tasks")
+
+    def add_task(self, task: dict):
+        """新建了任务；比当前堆顶更早时唤醒调度循环"""
+        if not self.enabled or task.get('task_type') not in self.handlers:
+            return
+        next_run = _parse_time(task.get('next_run')) or datetime.now()
+        head = self._head()
+        self._tasks[task['id']] = [task, None]
+        self._push(task['id'], next_run)
+        if head is None or next_run < head[0]:
+            self._wake()
+
+    def remove_tasks(self, task_ids):
+        """任务被删除（堆里的条目惰性删除）"""
+        if not self.enabled:
+            return
+        for task_id in task_ids:
+            self._tasks.pop(task_id, None)
+
+    # ==================== Execution ====================
+
+    async def _execute(self, task_id):
+        task = self._tasks[task_id][0]
+        try:
+            async with self._slots:
+                next_run = await self.handlers[task['task_type']](self.bot, task)
+            self.executed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Scheduled task #{task_id} ({task['task_type']}) failed: {e}")
+            next_run = datetime.now() + timedelta(seconds=self.retry_delay)
+        finally:
+            self._running.discard(task_id)
+
+        # 执行期间任务被删除了
+        if task_id not in self._tasks:
+            return
+
+        try:
+            if next_run is None:
+                self._tasks.pop(task_id, None)
+                await self.adb.delete_task(task_id)
+                return
+
+            self._push(task_id, next_run)
+            self._wake()
+            if self.adb.supports('update_task_next_run'):
+                await self.adb.update_task_next_run(task_id, next_run)
+        except Exception as e:
+            logger.error(f"Failed to reschedule task #{task_id}: {e}")
+
+    def _dispatch_due(self, now: datetime) -> int:
+        count = 0
+        while True:
+            head = self._head()
+            if head is None or head[0] > now:
+                return count
+            heapq.heappop(self._heap)
+            task_id = head[2]
+            self._tasks[task_id][1] = None
+            self._running.add(task_id)
+            asyncio.ensure_future(self._execute(task_id))
+            count += 1
+
+    async def run(self):
+        """调度循环：睡到最早的任务到期（或被 add_task 唤醒）"""
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self.load()
+
+        while not self._closed:
+            if time.monotonic() - self._loaded_at >= self.resync_interval:
+                try:
+                    await self.load()
+                except Exception as e:
+                    logger.error(f"Scheduler resync error: {e}")
+                    self._loaded_at = time.monotonic()
+
+            self._dispatch_due(datetime.now())
+
+            timeout = self._loaded_at + self.resync_interval - time.monotonic()
+            head = self._head()
+            if head is not None:
+                timeout = min(timeout, (head[0] - datetime.now()).total_seconds())
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+                self.wakeups += 1
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def close(self):
+        self._closed = True
+        self._wake()
+
+    def stats(self) -> dict:
+        head = self._head()
+        return {
+            'tasks': len(self._tasks),
+            'running': len(self._running),
+            'next_run': head[0] if head is not None else None,
+            'executed': self.executed,
+            'failed': self.failed,
+            'wakeups': self.wakeups,
+        }
@@ -0,0 +1,173 @@
+"""
+Intent Router - 一次扫描完成意图识别、Worker 路由和浏览器权限判断
+
+所有关键词编译成一个正则：关键词按前缀合并成 trie 形式的分支，正则引擎可以按
+首字符集合快速跳过不可能匹配的位置。每次匹配后从下一个字符继续找，这样不同类别的
+关键词互相重叠时也都能找到；每个关键词映射到它自身以及所有被它包含的关键词的类别，
+所以同一位置只需要取最长的匹配。
+
+关键词可以从 JSON 文件（ROUTING_KEYWORDS_FILE）加载，文件修改后自动重新编译：
+
+    {
+        "intent": {"help": ["帮助", ...], "status": [...], "tasks": [...]},
+        "browser": ["访问", ...],
+        "worker": ["监控", ...]
+    }
+
+intent 按书写顺序决定优先级；没有配置 worker 关键词时 Route.worker 为 None，
+调用方退回到 ConversationHandler.needs_worker。
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYWORDS = {
+    'intent': {
+        'help': ['菜单', '帮助', 'help', '怎么用', '不会用', '教我', '命令', '功能'],
+        'status': ['等级', 'status', '级别', '权限', '我是啥等级', '状态', '我的等级'],
+        'tasks': ['任务', 'tasks', '监控列表', '我的任务', '哪些任务'],
+    },
+    'browser': ['访问', '打开网页', '浏览', '搜索一下', '帮我搜', '查一下', 'google', 'search'],
+    'worker': [],
+}
+
+BROWSER = 'browser'
+WORKER = 'worker'
+
+
+class Route(NamedTuple):
+    """一条消息的分类结果"""
+    intent: str | None      # help / status / tasks
+    browser: bool           # 是否涉及浏览器功能（Gold 专属）
+    worker: bool | None     # 是否需要 Worker；None 表示没有配置 worker 关键词
+
+
+def _trie_pattern(words: list) -> str:
+    """把关键词编译成按前缀合并的正则分支，同一位置优先匹配最长的关键词"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # 当前前缀本身也是关键词：后缀可选（贪婪，优先更长的）
+            return '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+class _Compiled:
+    """编译好的关键词表"""
+
+    def __init__(self, config: dict):
+        intents = config.get('intent') or {}
+        self.intent_order = list(intents)
+
+        categories = {}     # keyword -> set(category)
+        for command, words in intents.items():
+            for word in filter(None, words):
+                categories.setdefault(word.lower(), set()).add(command)
+        for category in (BROWSER, WORKER):
+            for word in filter(None, config.get(category) or ()):
+                categories.setdefault(word.lower(), set()).add(category)
+
+        self.has_worker = any(WORKER in cats for cats in categories.values())
+
+        # 关键词匹配到时，被它包含的关键词也一定出现
+        self.categories = {
+            word: frozenset().union(*(cats for other, cats in categories.items() if other in word))
+            for word in categories
+        }
+        self.pattern = re.compile(_trie_pattern(list(categories))) if categories else None
+
+
+class IntentRouter:
+    """
+    关键词路由器
+
+    - path: 关键词 JSON 文件；None 时使用 DEFAULT_KEYWORDS
+    - reload_interval: 检查文件是否修改的最小间隔（秒）
+    """
+
+    def __init__(self, path: str = None, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+
+        self._mtime = None
+        self._checked_at = 0.0
+        self._compiled = _Compiled(DEFAULT_KEYWORDS)
+        if path:
+            self.reload()
+
+    @classmethod
+    def from_env(cls) -> "IntentRouter":
+        """从环境变量读取配置"""
+        return cls(
+            path=os.getenv("ROUTING_KEYWORDS_FILE") or None,
+            reload_interval=float(os.getenv("ROUTING_RELOAD_INTERVAL", 5)),
+        )
+
+    def reload(self) -> bool:
+        """重新读取关键词文件；文件无效时保留当前配置"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Failed to stat routing keywords file {self.path}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        # 无论成功与否都记下 mtime，坏文件只报一次错，直到再次修改
+        self._mtime = mtime
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                config = json.load(f)
+            compiled = _Compiled({**DEFAULT_KEYWORDS, **config})
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Failed to load routing keywords from {self.path}: {e}")
+            return False
+
+        self._compiled = compiled
+        logger.info(f"Loaded {len(compiled.categories)} routing keywords from {self.path}")
+        return True
+
+    def _maybe_reload(self):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            self.reload()
+
+    def classify(self, text: str) -> Route:
+        """一次扫描得到意图、浏览器和 Worker 判断"""
+        self._maybe_reload()
+        compiled = self._compiled
+
+        found = set()
+        if compiled.pattern is not None:
+            lower = text.lower()
+            search = compiled.pattern.search
+            lookup = compiled.categories
+            match = search(lower)
+            while match is not None:
+                found |= lookup[match.group()]
+                match = search(lower, match.start() + 1)
+
+        intent = next((command for command in compiled.intent_order if command in found), None)
+        worker = (WORKER in found) if compiled.has_worker else None
+        return Route(intent, BROWSER in found, worker)
@@ -0,0 +1,252 @@
+"""
+LLM Client - Anthropic Messages API 的异步客户端
+
+整个进程共用一个 httpx.AsyncClient（装了 h2 时走 HTTP/2，多个请求复用一条连接），
+带请求超时、并发上限，以及对 429 / 5xx / 网络错误的指数退避重试（full jitter）。
+
+依赖 httpx（可选）；没装时 available() 返回 False，调用方退回到同步实现。
+"""
+
+import os
+import json
+import random
+import asyncio
+import logging
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+# 可以重试的状态码（529 = overloaded）
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class LLMError(Exception):
+    """LLM 请求失败（重试后仍然失败）"""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+def available() -> bool:
+    return httpx is not None
+
+
+async def _sse_events(lines):
+    """把 server-sent events 的行解析成 (event, data)"""
+    event, data = None, []
+    async for line in lines:
+        if not line:
+            if data:
+                try:
+                    yield event, json.loads("\n".join(data))
+                except ValueError:
+                    logger.warning(f"Ignoring malformed SSE data for event {event}")
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+class AsyncLLMClient:
+    """
+    带连接池的异步 LLM 客户端
+
+    - max_concurrency: 同时进行的请求数上限，超出的排队
+    - timeout: 单次请求超时（秒）；连接超时固定为 10 秒
+    - max_retries: 失败后最多重试几次
+    - backoff / max_backoff: 退避的基数和上限（秒）
+    """
+
+    def __init__(self, api_key: str, base_url: str = "https://api.anthropic.com",
+                 model: str = "claude-sonnet-4-5-20250929", max_tokens: int = 1024,
+                 max_concurrency: int = 16, timeout: float = 60, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 8.0):
+        if httpx is None:
+            raise RuntimeError("AsyncLLMClient requires httpx (pip install 'httpx[http2]')")
+
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            http2=HTTP2,
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            headers={
+                "x-api-key": api_key,
+                "anthropic-version": ANTHROPIC_VERSION,
+                "content-type": "application/json",
+            },
+        )
+        self._slots = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "AsyncLLMClient":
+        """从环境变量读取配置"""
+        return cls(
+            api_key=os.getenv("ANTHROPIC_API_KEY", ""),
+            base_url=os.getenv("ANTHROPIC_BASE_URL") or "https://api.anthropic.com",
+            model=os.getenv("CHAT_MODEL") or os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929"),
+            max_tokens=int(os.getenv("CHAT_MAX_TOKENS", 1024)),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 16)),
+            timeout=float(os.getenv("LLM_TIMEOUT", 60)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)),
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # 懒创建，保证绑定到运行中的事件循环
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def _delay(self, attempt: int, retry_after: str = None) -> float:
+        """第 attempt 次重试前等待的秒数：full jitter，服务端给了 retry-after 时不短于它"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_backoff * 4))
+            except ValueError:
+                pass
+        return delay
+
+    def _body(self, system: str, messages: list, max_tokens: int = None, **options) -> dict:
+        body = {
+            "model": self.model,
+            "max_tokens": max_tokens or self.max_tokens,
+            "messages": messages,
+        }
+        if system:
+            body["system"] = system
+        body.update(options)
+        return body
+
+    async def complete(self, system: str, messages: list, max_tokens: int = None, **options) -> str:
+        """
+        发送一次 Messages 请求，返回拼接后的文本
+
+        Raises:
+            LLMError: 不可重试的错误，或重试次数用完
+        """
+        body = self._body(system, messages, max_tokens, **options)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                self.requests += 1
+                retry_after = None
+                try:
+                    response = await self._client.post("/v1/messages", json=body)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    error = LLMError(f"{type(e).__name__}: {e}")
+                else:
+                    if response.status_code == 200:
+                        data = response.json()
+                        return "".join(
+                            block.get("text", "") for block in data.get("content", ())
+                            if block.get("type") == "text"
+                        )
+                    error = LLMError(
+                        f"HTTP {response.status_code}: {response.text[:200]}",
+                        status=response.status_code,
+                    )
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                    retry_after = response.headers.get("retry-after")
+
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    delay = self._delay(attempt, retry_after)
+                    logger.warning(f"LLM request failed ({error}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        self.failures += 1
+        raise error
+
+    async def stream(self, system: str, messages: list, max_tokens: int = None, **options):
+        """
+        流式请求，逐段产出文本
+
+        只在还没产出任何文本时重试；产出过文本后出错直接抛 LLMError。
+
+        Raises:
+            LLMError: 不可重试的错误，或重试次数用完
+        """
+        body = self._body(system, messages, max_tokens, stream=True, **options)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                self.requests += 1
+                retry_after = None
+                produced = False
+                try:
+                    async with self._client.stream("POST", "/v1/messages", json=body) as response:
+                        if response.status_code == 200:
+                            async for event, data in _sse_events(response.aiter_lines()):
+                                if event == "content_block_delta":
+                                    delta = data.get("delta", {})
+                                    if delta.get("type") == "text_delta" and delta.get("text"):
+                                        produced = True
+                                        yield delta["text"]
+                                elif event == "error":
+                                    raise LLMError(f"stream error: {data.get('error', data)}")
+                                elif event == "message_stop":
+                                    break
+                            return
+
+                        await response.aread()
+                        error = LLMError(
+                            f"HTTP {response.status_code}: {response.text[:200]}",
+                            status=response.status_code,
+                        )
+                        if response.status_code not in RETRY_STATUSES:
+                            break
+                        retry_after = response.headers.get("retry-after")
+                except (httpx.TimeoutException, httpx.TransportError, LLMError) as e:
+                    error = e if isinstance(e, LLMError) else LLMError(f"{type(e).__name__}: {e}")
+                    if produced:
+                        self.failures += 1
+                        raise error
+
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    delay = self._delay(attempt, retry_after)
+                    logger.warning(f"LLM stream failed ({error}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        self.failures += 1
+        raise error
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'http2': HTTP2,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -5,10 +5,13 @@ Alice Bot - Telegram AI Assistant (Free for everyone)
 
 import os
 import re
-import json
 import logging
+import codecs
 import asyncio
+import threading
+import uuid
 import docker
+import async_docker
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from telegram import Update
@@ -21,9 +24,31 @@ from telegram.ext import (
 )
 
 from database import get_db
+from async_database import AsyncDatabase
 from scheduler import init_scheduler
 from molt_manager import MoltManager
 from conversation_handler import ConversationHandler
+from async_conversation_handler import AsyncConversationHandler
+from worker_executor import WorkerExecutor, WorkerQueueFull, tier_limits_from_env
+from resource_profiles import ContainerLimiter, tier_resources_from_env
+from admission import HostAdmission
+from worker_pool import WorkerPool
+from worker_transport import WorkerTransport, encode_payload
+from singleflight import SingleFlight, normalize_prompt
+from reply_cache import ReplyCache
+from intent_router import IntentRouter, Route
+from molt_mux import MoltMux, MoltBusy, MoltUnavailable
+from gold_hibernation import GoldHibernator
+from price_feed import PriceFeed
+from price_alerts import PriceAlertService, SchedulerDBView, PRICE_MONITOR
+from alert_state import COOLING, DONE
+from price_stream import PriceIngest, price_stream_from_env
+from heap_scheduler import HeapScheduler
+from reply_stream import StreamingReply
+from markers import MARKER_TAGS, has_markers, parse_markers
+from memory_buffer import MemoryBuffer
+from context_cache import ContextCache
+from user_profile import ProfileCache
 
 # Load environment variables
 load_dotenv()
@@ -40,377 +65,688 @@ logger = logging.getLogger(__name__)
 # Docker client
 docker_client = docker.from_env()
 
+# 异步 Docker 客户端（Worker 冷启动用；DOCKER_MODE=sync 时全部走 docker-py）
+# DOCKER_HOST 为 ssh:// 或需要 TLS 时 from_env 返回 None，同样走 docker-py
+# 每个运行中的 Worker 占一条日志长连接，连接数默认按 Worker 并发上限之和的两倍再留余量
+DOCKER_MODE = os.getenv("DOCKER_MODE", "async")
+adocker = async_docker.AsyncDockerClient.from_env(
+    min_connections=2 * sum(tier_limits_from_env().values()) + 8
+) if DOCKER_MODE == "async" else None
+
 # Database
 db = get_db()
 
+# 异步数据库接口（handler 里都用它）
+# get_db() 是和调度器 / MoltManager 共用的单例，AsyncDatabase 会退回在事件循环里直接调用；
+# 换成每次返回新连接的 factory 后才启用连接池 + 线程池
+adb = AsyncDatabase.from_env(get_db)
+
+# 用户资料缓存（等级 + 昵称）
+profile_cache = ProfileCache.from_env(adb)
+
+# 上下文记忆条数
+MEMORY_CONTEXT_LIMIT = 20
+
+# 活跃用户的上下文缓存（LRU）
+context_cache = ContextCache.from_env(window=MEMORY_CONTEXT_LIMIT)
+
+# 对话记忆写缓冲（批量落库）
+memory_buffer = MemoryBuffer.from_env(adb, cache=context_cache)
+
 # Molt Manager for Gold users
 molt_manager = MoltManager(db, docker_client)
 
+# Gold 容器的多路复用 socket（MOLT_SOCKET_TEMPLATE 为空时全部走 molt_manager）
+molt_mux = MoltMux.from_env()
+
+# 每个等级的容器资源上限（WORKER_MEM_LIMIT_* / WORKER_CPUS_* / WORKER_PIDS_LIMIT_*）
+TIER_RESOURCES = tier_resources_from_env()
+
+# 空闲 Gold 容器休眠（GOLD_HIBERNATE_MODE=pause|checkpoint|stop|off，默认 off）
+gold_hibernator = GoldHibernator.from_env(docker_client, adocker)
+
+# Gold 容器的资源上限（GOLD_APPLY_RESOURCES=1 开启，每个用户第一次请求后设置一次）
+gold_limiter = ContainerLimiter.from_env(docker_client, adocker, TIER_RESOURCES['gold'])
+
 # Alice Conversation Handler (lightweight, no container needed)
-alice_chat = ConversationHandler()
+alice_chat = AsyncConversationHandler.from_env(ConversationHandler())
+
+# 无记忆闲聊（Bronze）的回复缓存
+reply_cache = ReplyCache.from_env()
+
+# price_monitor 任务共用的价格缓存（PRICE_SOURCE=http|stub）
+price_feed = PriceFeed.from_env()
+
+# 价格监控集中检查（阈值索引）；bot 在 main() 里设置，开启时调度器看不到 price_monitor 任务
+price_alerts = PriceAlertService.from_env(adb, price_feed)
+
+# 推送行情（PRICE_STREAM=binance|replay:<path>）：写进价格缓存并逐笔检查价格监控，未配置时为 None
+_price_stream = price_stream_from_env()
+price_ingest = PriceIngest(_price_stream, price_feed, price_alerts) if _price_stream is not None else None
+
+# 按 next_run 的最小堆调度（SCHEDULER_MODE=heap）；处理函数和 bot 在 main() 里设置
+task_scheduler = HeapScheduler.from_env(adb)
+
+# 闲聊流式回复：先发第一段，再按节流编辑（对话处理器不能流式生成时不生效）
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "1") == "1"
 
 # Worker image name
 WORKER_IMAGE = "alice-worker"
 
-# ==================== Helper Functions ====================
+# Worker 单次执行超时（秒）
+WORKER_TIMEOUT = 120
+
+# 流式输出：边执行边编辑占位消息
+WORKER_STREAMING = os.getenv("WORKER_STREAMING", "1") == "1"
 
-def ensure_user_exists(user_id: int, username: str = None):
-    """确保用户存在于数据库"""
-    if not db.get_user(user_id):
-        db.create_user(user_id, username, 'bronze')
+# Worker 容器环境变量
+WORKER_ENV = {
+    "ANTHROPIC_API_KEY": ANTHROPIC_KEY,
+    "ANTHROPIC_BASE_URL": os.getenv("ANTHROPIC_BASE_URL", ""),
+    "CLAUDE_MODEL": os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929"),
+}
+
+# 冷启动容器的 payload 传递方式（WORKER_TRANSPORT=stdin|file|argv）
+worker_transport = WorkerTransport.from_env()
+
+# Worker 执行器（阻塞的容器调用放到线程池，按等级限流）
+# 宿主机 CPU / 内存不够时，新的 Worker 任务排队或拒绝
+# （Gold 容器常驻，不需要为它预留内存）
+host_admission = HostAdmission.from_env(
+    {tier: profile.mem_limit for tier, profile in TIER_RESOURCES.items() if tier != 'gold'}
+)
+worker_executor = WorkerExecutor.from_env(admission=host_admission)
+
+# 同时处理的 Telegram 更新数：默认是所有等级的 Worker 并发上限之和，再留同样多给排队中的任务和命令
+TG_CONCURRENT_UPDATES = int(os.getenv("TG_CONCURRENT_UPDATES", 0)) or 2 * sum(worker_executor.tier_limits.values())
 
+# 预热容器池（WORKER_POOL_SIZE=0 时关闭，全部走冷启动）
+# 池容器 Bronze / Silver 共用，按 Silver 的资源上限创建
+worker_pool = WorkerPool.from_env(
+    docker_client, WORKER_IMAGE, WORKER_ENV, resources=TIER_RESOURCES['silver'].run_kwargs()
+)
 
-def run_worker_container(prompt: str, memory: list = None, user_id: int = None) -> str:
+# 空闲容器回收间隔（秒）
+WORKER_POOL_REAP_INTERVAL = 60
+
+# 排队已满时的回复
+WORKER_BUSY_MESSAGE = "⏳ 现在排队的人太多了，请稍后再试"
+
+# Bronze 无记忆的相同 prompt 合并执行，结果短时间缓存（BRONZE_COALESCE_TTL 秒）
+bronze_flight = SingleFlight.from_env("BRONZE_COALESCE")
+
+# ==================== Helper Functions ====================
+
+def run_worker_container(prompt: str, memory: list = None, user_id: int = None,
+                         tier: str = 'bronze') -> str:
     """运行 Worker 容器执行任务"""
-    container_name = f"alice_worker_{user_id}" if user_id else f"alice_worker_{datetime.now().timestamp()}"
+    return "".join(stream_worker_container(prompt, memory, user_id, tier)).strip()
 
-    try:
-        # 清理同名旧容器
+
+def stream_worker_container(prompt: str, memory: list = None, user_id: int = None,
+                            tier: str = 'bronze'):
+    """运行 Worker 容器执行任务，逐段产出输出（优先使用预热容器池）"""
+    if worker_pool.enabled:
+        produced = False
         try:
-            old_container = docker_client.containers.get(container_name)
-            old_container.remove(force=True)
-        except docker.errors.NotFound:
-            pass
-
-        # 构建命令 - 直接调用 python worker.py
-        cmd = ["python", "worker.py", "--prompt", prompt]
-        if memory:
-            cmd.extend(["--memory", json.dumps(memory)])
-
-        # 运行容器
-        container = docker_client.containers.run(
-            WORKER_IMAGE,
-            command=cmd,
-            entrypoint="",  # 覆盖 Dockerfile 的 ENTRYPOINT
-            name=container_name,
-            detach=True,
-            environment={
-                "ANTHROPIC_API_KEY": ANTHROPIC_KEY,
-                "ANTHROPIC_BASE_URL": os.getenv("ANTHROPIC_BASE_URL", ""),
-                "CLAUDE_MODEL": os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929"),
-            }
-        )
+            for chunk in worker_pool.stream(prompt, memory):
+                produced = True
+                yield chunk
+            return
+        except Exception as e:
+            if produced:
+                logger.error(f"Worker pool error: {e}")
+                yield f"\n\nError: {str(e)}"
+                return
+            logger.error(f"Worker pool error, falling back to cold start: {e}")
+
+    yield from stream_cold_worker_container(prompt, memory, user_id, tier)
+
+
+def _kill_container(container, timed_out: threading.Event):
+    """超时后强制停止容器（日志流会随之结束）"""
+    timed_out.set()
+    try:
+        container.kill()
+    except Exception:
+        pass
+
+
+def tier_resources(tier: str):
+    """该等级的资源上限（未知等级按 Bronze）"""
+    return TIER_RESOURCES.get(tier) or TIER_RESOURCES['bronze']
+
+
+def worker_container_name(user_id: int = None) -> str:
+    """每次冷启动一个新名字：同一用户的多条消息 / 定时任务可能同时在跑，不能共用容器名"""
+    return f"alice_worker_{user_id or 'anon'}_{uuid.uuid4().hex[:12]}"
+
+
+def worker_run_options(prompt: str, memory: list, container_name: str) -> tuple[dict, bytes]:
+    """冷启动容器的参数和 payload（argv 模式下 payload 为 None）"""
+    # 构建命令 - 直接调用 python worker.py，payload 走 stdin / tmpfs 文件
+    options = dict(
+        command=worker_transport.command(prompt, memory),
+        entrypoint="",  # 覆盖 Dockerfile 的 ENTRYPOINT
+        name=container_name,
+        environment=WORKER_ENV,
+    )
+    payload = None if worker_transport.mode == 'argv' else encode_payload(prompt, memory)
+    return options, payload
+
+
+def stream_cold_worker_container(prompt: str, memory: list = None, user_id: int = None,
+                                 tier: str = 'bronze'):
+    """冷启动一个 Worker 容器执行任务，跟随日志流逐段产出输出"""
+    container_name = worker_container_name(user_id)
 
-        # 等待完成
-        result = container.wait(timeout=120)
-        logs = container.logs().decode("utf-8")
+    try:
+        options, payload = worker_run_options(prompt, memory, container_name)
+        options.update(tier_resources(tier).run_kwargs())
+
+        container = None
+        payload_file = None
+        try:
+            # 运行容器
+            if worker_transport.mode == 'stdin':
+                container = docker_client.containers.create(
+                    WORKER_IMAGE, stdin_open=True, stdin_once=True, **options
+                )
+                worker_transport.start_with_stdin(container, payload)
+            else:
+                if worker_transport.mode == 'file':
+                    payload_file, options['volumes'] = worker_transport.write_file(payload)
+                container = docker_client.containers.run(WORKER_IMAGE, detach=True, **options)
 
-        # 清理容器
-        container.remove()
+            # 等待完成（超时强制停止）
+            timed_out = threading.Event()
+            timer = threading.Timer(WORKER_TIMEOUT, _kill_container, args=(container, timed_out))
+            timer.start()
 
-        return logs.strip()
+            try:
+                # 跟随日志流直到容器退出；多字节字符可能被拆在两个 chunk 里
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                for chunk in container.logs(stream=True, follow=True):
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+            finally:
+                timer.cancel()
+        finally:
+            # 清理容器和 payload 文件
+            if container is not None:
+                container.remove(force=True)
+            if payload_file:
+                worker_transport.remove_file(payload_file)
+
+        if timed_out.is_set():
+            yield f"\n\nError: Worker timed out after {WORKER_TIMEOUT}s"
 
     except docker.errors.ImageNotFound:
-        return "Error: Worker image not found. Please build it first with: docker build -f Dockerfile.worker -t alice-worker ."
+        yield "Error: Worker image not found. Please build it first with: docker build -f Dockerfile.worker -t alice-worker ."
     except Exception as e:
         logger.error(f"Worker container error: {e}")
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
 
-def parse_task_from_response(response: str, user_id: int) -> tuple[str, bool]:
-    """
-    解析 Worker 返回中的 [TASK_CREATE] 标记
+async def _kill_container_async(container_id: str, timed_out: asyncio.Event):
+    """超时后强制停止容器（日志流会随之结束）"""
+    timed_out.set()
+    try:
+        await adocker.kill(container_id)
+    except Exception:
+        pass
 
-    Returns:
-        (cleaned_response, task_created)
-    """
-    # 匹配 [TASK_CREATE]...[/TASK_CREATE]
-    pattern = r'\[TASK_CREATE\]\s*(\{.*?\})\s*\[/TASK_CREATE\]'
-    match = re.search(pattern, response, re.DOTALL)
 
-    if not match:
-        return response, False
+async def astream_cold_worker_container(prompt: str, memory: list = None, user_id: int = None,
+                                        tier: str = 'bronze'):
+    """冷启动一个 Worker 容器（异步 Docker API），跟随日志流逐段产出输出"""
+    container_name = worker_container_name(user_id)
 
-    # 提取并解析 JSON
     try:
-        task_json = match.group(1)
-        task_data = json.loads(task_json)
-
-        task_type = task_data.get('type')
-        config = task_data.get('config', {})
-
-        if task_type and config:
-            # 设置下次运行时间
-            if task_type == 'price_monitor':
-                next_run = datetime.now() + timedelta(minutes=1)
-            elif task_type == 'scheduled_report':
-                interval = config.get('interval', 60)
-                next_run = datetime.now() + timedelta(minutes=interval)
+        options, payload = worker_run_options(prompt, memory, container_name)
+        options['host_config'] = tier_resources(tier).host_config()
+
+        container_id = None
+        payload_file = None
+        timed_out = asyncio.Event()
+        try:
+            # 运行容器
+            if worker_transport.mode == 'stdin':
+                container_id = await adocker.create(
+                    WORKER_IMAGE, stdin_open=True, stdin_once=True, **options
+                )
+                await adocker.start_with_stdin(container_id, payload)
             else:
-                next_run = datetime.now() + timedelta(minutes=5)
-
-            # 创建任务
-            task_id = db.create_task(user_id, task_type, config, next_run)
-            logger.info(f"Created task #{task_id} for user {user_id}: {task_type}")
-
-            # 移除标记
-            cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-
-            # 清理 AI 可能说的错误信息
-            wrong_phrases = [
-                "只能在主动询问时生效",
-                "建议同时在交易所设置",
-                "交易所设置真实的价格提醒",
-                "记得这个监控",
-                "主动询问时",
-                "需要你主动询问",
-                "我才能告诉你",
-                "建议你在交易所",
-            ]
-            for phrase in wrong_phrases:
-                cleaned = cleaned.replace(phrase, "")
-
-            # 清理多余的空行和标点
-            cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
-            cleaned = re.sub(r'[，。！]{2,}', '。', cleaned)
-            cleaned = cleaned.strip()
-
-            # 如果回复太长或为空，生成简洁版
-            if len(cleaned) > 80 or len(cleaned) < 5:
-                if task_type == 'price_monitor':
-                    coin = config.get('coin', '?')
-                    target = config.get('target_price', 0)
-                    condition = ">" if config.get('condition') == 'above' else "<"
-                    cooldown = config.get('cooldown', 60)
-
-                    # 冷却时间描述
-                    if cooldown >= 999999:
-                        freq_text = "（仅提醒一次）"
-                    elif cooldown == 0:
-                        freq_text = "（持续监控）"
-                    else:
-                        freq_text = ""
-
-                    cleaned = f"✅ 已设置 {coin} 价格监控（{condition} ${target:,.0f}）{freq_text}"
-
-                elif task_type == 'scheduled_report':
-                    topic = config.get('topic', '定时报告')
-                    interval = config.get('interval', 60)
-                    cleaned = f"✅ 已设置定时报告：{topic}（每 {interval} 分钟）"
-
-            return cleaned, True
-
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse task JSON: {e}")
+                if worker_transport.mode == 'file':
+                    payload_file, options['volumes'] = worker_transport.write_file(payload)
+                container_id = await adocker.run(WORKER_IMAGE, **options)
+
+            # 等待完成（超时强制停止）
+            timer = asyncio.get_running_loop().call_later(
+                WORKER_TIMEOUT,
+                lambda: asyncio.ensure_future(_kill_container_async(container_id, timed_out)),
+            )
+
+            try:
+                # 跟随日志流直到容器退出；多字节字符可能被拆在两个 chunk 里
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                async for chunk in adocker.logs(container_id, follow=True):
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+            finally:
+                timer.cancel()
+        finally:
+            # 清理容器和 payload 文件
+            if container_id is not None:
+                await adocker.remove(container_id, force=True)
+            if payload_file:
+                worker_transport.remove_file(payload_file)
+
+        if timed_out.is_set():
+            yield f"\n\nError: Worker timed out after {WORKER_TIMEOUT}s"
+
+    except async_docker.ImageNotFound:
+        yield "Error: Worker image not found. Please build it first with: docker build -f Dockerfile.worker -t alice-worker ."
     except Exception as e:
-        logger.error(f"Failed to create task: {e}")
+        logger.error(f"Worker container error: {e}")
+        yield f"Error: {str(e)}"
+
+
+# AI 可能说的错误信息（任务创建后从回复中清理）
+WRONG_TASK_PHRASES = [
+    "只能在主动询问时生效",
+    "建议同时在交易所设置",
+    "交易所设置真实的价格提醒",
+    "记得这个监控",
+    "主动询问时",
+    "需要你主动询问",
+    "我才能告诉你",
+    "建议你在交易所",
+]
+
+# 标记的执行顺序：先保存偏好，再删除任务，最后创建任务
+MARKER_ORDER = {'USER_INFO': 0, 'TASK_DELETE': 1, 'TASK_CREATE': 2}
 
-    # 解析失败，只移除标记
-    cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-    return cleaned, False
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_REPEATED_PUNCT_RE = re.compile(r'[，。！]{2,}')
 
 
-def parse_task_delete(response: str, user_id: int) -> tuple[str, bool, str]:
+async def save_user_info(info_data: dict, user_id: int):
+    """保存 [USER_INFO] 中的用户偏好"""
+    if 'nickname' in info_data:
+        await adb.set_user_preference(user_id, 'nickname', info_data['nickname'])
+        logger.info(f"Saved nickname for user {user_id}: {info_data['nickname']}")
+
+    if 'timezone' in info_data:
+        await adb.set_user_preference(user_id, 'timezone', info_data['timezone'])
+        logger.info(f"Saved timezone for user {user_id}: {info_data['timezone']}")
+
+    profile_cache.invalidate(user_id)
+
+
+async def create_task_from_marker(task_data: dict, user_id: int) -> tuple[str, dict] | None:
     """
-    解析 Worker 返回中的 [TASK_DELETE] 标记
+    执行 [TASK_CREATE]
 
     Returns:
-        (cleaned_response, task_deleted, delete_message)
+        (task_type, config)，数据不完整时返回 None
     """
-    pattern = r'\[TASK_DELETE\]\s*(\{.*?\})\s*\[/TASK_DELETE\]'
-    match = re.search(pattern, response, re.DOTALL)
+    task_type = task_data.get('type')
+    config = task_data.get('config', {})
+
+    if not (task_type and config):
+        return None
+
+    # 设置下次运行时间
+    if task_type == 'price_monitor':
+        next_run = datetime.now() + timedelta(minutes=1)
+    elif task_type == 'scheduled_report':
+        interval = config.get('interval', 60)
+        next_run = datetime.now() + timedelta(minutes=interval)
+    else:
+        next_run = datetime.now() + timedelta(minutes=5)
+
+    # 创建任务
+    task_id = await adb.create_task(user_id, task_type, config, next_run)
+    task = {
+        'id': task_id, 'user_id': user_id, 'task_type': task_type,
+        'config': config, 'next_run': next_run,
+    }
+    price_alerts.add_task(task)
+    task_scheduler.add_task(task)
+    logger.info(f"Created task #{task_id} for user {user_id}: {task_type}")
+    return task_type, config
+
+
+def describe_created_task(task_type: str, config: dict) -> str | None:
+    """生成任务创建的简洁确认"""
+    if task_type == 'price_monitor':
+        coin = config.get('coin', '?')
+        target = config.get('target_price', 0)
+        condition = ">" if config.get('condition') == 'above' else "<"
+        cooldown = config.get('cooldown', 60)
+
+        # 冷却时间描述
+        if cooldown >= 999999:
+            freq_text = "（仅提醒一次）"
+        elif cooldown == 0:
+            freq_text = "（持续监控）"
+        else:
+            freq_text = ""
 
-    if not match:
-        return response, False, ""
+        return f"✅ 已设置 {coin} 价格监控（{condition} ${target:,.0f}）{freq_text}"
 
-    try:
-        delete_json = match.group(1)
-        delete_data = json.loads(delete_json)
-
-        tasks = db.get_user_tasks(user_id)
-        deleted_count = 0
-        deleted_info = []
-
-        # 删除所有任务
-        if delete_data.get('all'):
-            for task in tasks:
-                db.delete_task(task['id'])
-                deleted_count += 1
-            if deleted_count > 0:
-                delete_message = f"✅ 已删除全部 {deleted_count} 个任务"
-            else:
-                delete_message = "📭 没有任务需要删除"
-        else:
-            # 根据条件删除
-            index = delete_data.get('index')
-            task_type = delete_data.get('task_type')
-            coin = delete_data.get('coin')
-
-            for i, task in enumerate(tasks, 1):
-                should_delete = False
-                config = task['config']
-
-                # 按序号删除
-                if index and i == index:
-                    should_delete = True
-                # 按类型和币种删除
-                elif coin:
-                    if config.get('coin', '').upper() == coin.upper():
-                        if not task_type or task['task_type'] == task_type:
-                            should_delete = True
-                # 只按类型删除
-                elif task_type and task['task_type'] == task_type:
-                    should_delete = True
-
-                if should_delete:
-                    # 构建删除信息
-                    if task['task_type'] == 'price_monitor':
-                        task_coin = config.get('coin', '?')
-                        price = config.get('target_price', 0)
-                        condition = '<' if config.get('condition') == 'below' else '>'
-                        deleted_info.append(f"{task_coin} {condition} ${price:,.0f}")
-                    else:
-                        deleted_info.append(config.get('topic', task['task_type']))
-
-                    db.delete_task(task['id'])
-                    deleted_count += 1
-
-            if deleted_count > 0:
-                delete_message = f"✅ 已删除: {', '.join(deleted_info)}"
-            else:
-                delete_message = "❌ 未找到匹配的任务"
+    elif task_type == 'scheduled_report':
+        topic = config.get('topic', '定时报告')
+        interval = config.get('interval', 60)
+        return f"✅ 已设置定时报告：{topic}（每 {interval} 分钟）"
 
-        logger.info(f"Deleted {deleted_count} tasks for user {user_id}")
+    return None
 
-        # 移除标记
-        cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-        return cleaned, deleted_count > 0, delete_message
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse delete JSON: {e}")
-    except Exception as e:
-        logger.error(f"Failed to delete task: {e}")
+def tidy_task_reply(cleaned: str, created: list[tuple[str, dict]]) -> str:
+    """任务创建后清理回复；太长或为空时换成简洁确认"""
+    for phrase in WRONG_TASK_PHRASES:
+        cleaned = cleaned.replace(phrase, "")
 
-    cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-    return cleaned, False, ""
+    # 清理多余的空行和标点
+    cleaned = _BLANK_LINES_RE.sub('\n\n', cleaned)
+    cleaned = _REPEATED_PUNCT_RE.sub('。', cleaned)
+    cleaned = cleaned.strip()
 
+    # 如果回复太长或为空，生成简洁版
+    if len(cleaned) > 80 or len(cleaned) < 5:
+        summaries = [describe_created_task(task_type, config) for task_type, config in created]
+        summaries = [summary for summary in summaries if summary]
+        if summaries:
+            cleaned = "\n".join(summaries)
 
-def parse_user_info(response: str, user_id: int) -> str:
+    return cleaned
+
+
+def task_filter(delete_data: dict):
     """
-    解析 Worker 返回中的 [USER_INFO] 标记并保存用户偏好
+    根据 [TASK_DELETE] 的条件生成删除判断 predicate(index, task)
+
+    {"all": true} 返回 None（删除全部）
+    """
+    if delete_data.get('all'):
+        return None
+
+    index = delete_data.get('index')
+    task_type = delete_data.get('task_type')
+    coin = delete_data.get('coin')
+
+    def predicate(i: int, task: dict) -> bool:
+        config = task['config']
+
+        # 按序号删除
+        if index and i == index:
+            return True
+        # 按类型和币种删除
+        elif coin:
+            if config.get('coin', '').upper() == coin.upper():
+                return not task_type or task['task_type'] == task_type
+        # 只按类型删除
+        elif task_type and task['task_type'] == task_type:
+            return True
+        return False
+
+    return predicate
+
+
+def describe_deleted_task(task: dict) -> str:
+    """生成被删除任务的简短描述"""
+    config = task['config']
+    if task['task_type'] == 'price_monitor':
+        task_coin = config.get('coin', '?')
+        price = config.get('target_price', 0)
+        condition = '<' if config.get('condition') == 'below' else '>'
+        return f"{task_coin} {condition} ${price:,.0f}"
+    return config.get('topic', task['task_type'])
+
+
+async def delete_tasks_from_marker(delete_data: dict, user_id: int) -> tuple[int, str]:
+    """
+    执行 [TASK_DELETE]（一次批量删除）
 
     Returns:
-        cleaned_response
+        (deleted_count, delete_message)
     """
-    pattern = r'\[USER_INFO\]\s*(\{.*?\})\s*\[/USER_INFO\]'
-    match = re.search(pattern, response, re.DOTALL)
+    delete_all = bool(delete_data.get('all'))
+    deleted = await adb.delete_tasks(user_id, task_filter(delete_data))
+    deleted_ids = [task['id'] for task in deleted]
+    price_alerts.remove_tasks(deleted_ids)
+    task_scheduler.remove_tasks(deleted_ids)
+    deleted_count = len(deleted)
+
+    if delete_all:
+        if deleted_count > 0:
+            delete_message = f"✅ 已删除全部 {deleted_count} 个任务"
+        else:
+            delete_message = "📭 没有任务需要删除"
+    elif deleted_count > 0:
+        delete_message = f"✅ 已删除: {', '.join(describe_deleted_task(task) for task in deleted)}"
+    else:
+        delete_message = "❌ 未找到匹配的任务"
 
-    if not match:
-        return response
+    logger.info(f"Deleted {deleted_count} tasks for user {user_id}")
+    return deleted_count, delete_message
 
-    try:
-        info_json = match.group(1)
-        info_data = json.loads(info_json)
 
-        if 'nickname' in info_data:
-            db.set_user_preference(user_id, 'nickname', info_data['nickname'])
-            logger.info(f"Saved nickname for user {user_id}: {info_data['nickname']}")
+async def apply_markers(response: str, user_id: int, kinds: tuple = MARKER_TAGS) -> tuple[str, bool, str]:
+    """
+    解析回复中的标记（一次扫描）并执行对应操作
 
-        if 'timezone' in info_data:
-            db.set_user_preference(user_id, 'timezone', info_data['timezone'])
-            logger.info(f"Saved timezone for user {user_id}: {info_data['timezone']}")
+    kinds 限定要处理的标记种类，其余标记原样保留。
 
-        # 清理标记
-        cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-        return cleaned
+    Returns:
+        (cleaned_response, task_created, delete_message)
+    """
+    cleaned, actions = parse_markers(response, kinds)
+    if not actions:
+        return cleaned, False, ""
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse user info JSON: {e}")
-    except Exception as e:
-        logger.error(f"Failed to save user info: {e}")
+    created = []
+    delete_messages = []
 
-    # 解析失败，只移除标记
-    cleaned = re.sub(pattern, '', response, flags=re.DOTALL).strip()
-    return cleaned
+    for action in sorted(actions, key=lambda a: MARKER_ORDER[a.kind]):
+        # JSON 解析失败，只移除标记
+        if action.data is None:
+            logger.error(f"Failed to parse {action.kind} JSON: {action.raw[:100]}")
+            continue
+
+        try:
+            if action.kind == 'USER_INFO':
+                await save_user_info(action.data, user_id)
+            elif action.kind == 'TASK_DELETE':
+                deleted_count, delete_message = await delete_tasks_from_marker(action.data, user_id)
+                if deleted_count > 0:
+                    delete_messages.append(delete_message)
+            elif action.kind == 'TASK_CREATE':
+                task = await create_task_from_marker(action.data, user_id)
+                if task:
+                    created.append(task)
+        except Exception as e:
+            logger.error(f"Failed to apply {action.kind} marker: {e}")
+
+    if created:
+        cleaned = tidy_task_reply(cleaned, created)
+
+    return cleaned, bool(created), "\n".join(delete_messages)
 
 
 # ==================== Message Handlers by Tier ====================
 
-async def handle_bronze_user(update: Update, prompt: str) -> tuple[str, bool, str]:
+async def run_worker(tier: str, reply: StreamingReply, prompt: str,
+                     memory: list = None, user_id: int = None) -> str:
+    """在执行器中运行 Worker；开启流式时边执行边编辑占位消息（reply 为 None 时不展示）"""
+    streaming = WORKER_STREAMING and reply is not None
+
+    if adocker is not None and not worker_pool.enabled:
+        # 异步 Docker API：不占线程，只占该等级的槽位
+        chunks = []
+        async with worker_executor.slot(tier):
+            async for chunk in astream_cold_worker_container(
+                prompt, memory=memory, user_id=user_id, tier=tier
+            ):
+                chunks.append(chunk)
+                if streaming:
+                    await reply.feed(chunk)
+        return "".join(chunks).strip()
+
+    if not streaming:
+        return await worker_executor.run(
+            tier, run_worker_container, prompt, memory, user_id, tier
+        )
+
+    chunks = []
+    async for chunk in worker_executor.stream(
+        tier, stream_worker_container, prompt, memory, user_id, tier
+    ):
+        chunks.append(chunk)
+        await reply.feed(chunk)
+    return "".join(chunks).strip()
+
+
+def worker_result_cacheable(result: str) -> bool:
+    """出错 / 超时的结果不缓存"""
+    return bool(result) and "Error:" not in result
+
+
+def worker_result_shareable(result: str) -> bool:
+    """带标记的结果不共享给其他用户：apply_markers 会给每个用户重复创建任务 / 保存偏好"""
+    return not has_markers(result)
+
+
+async def handle_bronze_user(update: Update, prompt: str, reply: StreamingReply) -> tuple[str, bool, str]:
     """Bronze 用户处理：无记忆，按需容器"""
     user_id = update.effective_user.id
 
-    await update.message.reply_text("🔄 Processing...")
-
-    result = run_worker_container(prompt, memory=None, user_id=user_id)
+    await reply.start("🔄 Processing...")
 
-    # 解析用户信息（Bronze 也可以保存偏好）
-    cleaned = parse_user_info(result, user_id)
+    # 没有记忆时结果只取决于 prompt：相同的问题共享一次执行
+    try:
+        result = await bronze_flight.run(
+            normalize_prompt(prompt), run_worker, 'bronze', reply, prompt,
+            memory=None, user_id=user_id, cacheable=worker_result_cacheable,
+            shareable=worker_result_shareable,
+        )
+    except WorkerQueueFull:
+        return WORKER_BUSY_MESSAGE, False, ""
 
-    # Bronze 用户不支持任务，但仍然移除标记
-    cleaned, _, _ = parse_task_delete(cleaned, user_id)
-    cleaned, _ = parse_task_from_response(cleaned, user_id)
-    return cleaned, False, ""  # Bronze 不创建/删除任务
+    # 解析标记（Bronze 也可以保存偏好）
+    cleaned, _, _ = await apply_markers(result, user_id)
+    return cleaned, False, ""  # Bronze 不提示任务创建/删除
 
 
-async def handle_silver_user(update: Update, prompt: str) -> tuple[str, bool, str]:
+async def handle_silver_user(update: Update, prompt: str, reply: StreamingReply,
+                             route: Route = None) -> tuple[str, bool, str]:
     """Silver 用户处理：有记忆，按需容器，支持任务"""
     user_id = update.effective_user.id
 
     # 检查是否试图使用浏览器功能（Gold 专属）
-    browser_keywords = ['访问', '打开网页', '浏览', '搜索一下', '帮我搜', '查一下', 'google', 'search']
-    if any(kw in prompt.lower() for kw in browser_keywords):
+    if route is None:
+        route = intent_router.classify(prompt)
+    if route.browser:
         return "🥇 浏览器功能是 Gold 专属！使用 /upgrade gold 升级", False, ""
 
-    await update.message.reply_text("🔄 Processing (with memory)...")
+    await reply.start("🔄 Processing (with memory)...")
 
     # 加载记忆
-    memory = db.get_memories_for_context(user_id, limit=20)
+    memory = await memory_buffer.get_memories_for_context(user_id, limit=MEMORY_CONTEXT_LIMIT)
 
     # 保存用户消息到记忆
-    db.add_memory(user_id, "user", prompt)
+    memory_buffer.add(user_id, "user", prompt)
 
     # 调用 Worker
-    result = run_worker_container(prompt, memory=memory, user_id=user_id)
-
-    # 解析用户信息
-    cleaned = parse_user_info(result, user_id)
-
-    # 先检查删除任务
-    cleaned, task_deleted, delete_message = parse_task_delete(cleaned, user_id)
+    try:
+        result = await run_worker('silver', reply, prompt, memory=memory, user_id=user_id)
+    except WorkerQueueFull:
+        return WORKER_BUSY_MESSAGE, False, ""
 
-    # 再检查创建任务
-    cleaned, task_created = parse_task_from_response(cleaned, user_id)
+    # 解析标记：用户信息、删除任务、创建任务
+    cleaned, task_created, delete_message = await apply_markers(result, user_id)
 
     # 保存助手回复到记忆（保存清理后的版本）
     if not cleaned.startswith("Error"):
-        db.add_memory(user_id, "assistant", cleaned)
+        memory_buffer.add(user_id, "assistant", cleaned)
 
     # 返回：清理后的回复、是否创建任务、删除消息
-    return cleaned, task_created, delete_message if task_deleted else ""
+    return cleaned, task_created, delete_message
+
+
+async def run_gold_worker(reply: StreamingReply, user_id: int, prompt: str, memory: list = None) -> str:
+    """
+    调用用户的持久 Gold 容器
 
+    容器暴露了多路复用 socket 时直接异步请求（同一容器可以同时处理多个请求）；
+    否则 / 连接失败时退回到线程池里的 molt_manager.send_message。
+    休眠中的容器先唤醒。
+    """
+    try:
+        async with gold_hibernator.active(user_id):
+            return await send_gold_request(reply, user_id, prompt, memory)
+    finally:
+        # 容器可能是这次请求里才创建的
+        await gold_limiter.ensure(user_id)
 
-async def handle_gold_user(update: Update, prompt: str) -> tuple[str, bool, str]:
+
+async def send_gold_request(reply: StreamingReply, user_id: int, prompt: str, memory: list = None) -> str:
+    """把请求发给用户的 Gold 容器：优先走常驻 socket（流式），不可用时退回 MoltManager"""
+    if molt_mux.available(user_id):
+        chunks = []
+        try:
+            async for chunk in molt_mux.stream(user_id, prompt, memory):
+                chunks.append(chunk)
+                if WORKER_STREAMING:
+                    await reply.feed(chunk)
+            return "".join(chunks).strip()
+        except MoltUnavailable as e:
+            if chunks:
+                raise
+            logger.warning(f"Molt socket unavailable for user {user_id}, falling back: {e}")
+
+    return await worker_executor.run(
+        'gold', molt_manager.send_message, user_id, prompt, memory
+    )
+
+
+async def handle_gold_user(update: Update, prompt: str, reply: StreamingReply) -> tuple[str, bool, str]:
     """Gold 用户处理：持久化容器"""
     user_id = update.effective_user.id
 
-    await update.message.reply_text("🔄 Processing (Gold worker)...")
+    await reply.start("🔄 Processing (Gold worker)...")
 
     try:
         # 加载记忆
-        memory = db.get_memories_for_context(user_id, limit=20)
+        memory = await memory_buffer.get_memories_for_context(user_id, limit=MEMORY_CONTEXT_LIMIT)
 
         # 保存用户消息到记忆
-        db.add_memory(user_id, "user", prompt)
+        memory_buffer.add(user_id, "user", prompt)
 
         # 调用持久 Worker
-        result = molt_manager.send_message(user_id, prompt, memory)
-
-        # 解析用户信息
-        cleaned = parse_user_info(result, user_id)
+        result = await run_gold_worker(reply, user_id, prompt, memory)
 
-        # 先检查删除任务
-        cleaned, task_deleted, delete_message = parse_task_delete(cleaned, user_id)
-
-        # 再检查创建任务
-        cleaned, task_created = parse_task_from_response(cleaned, user_id)
+        # 解析标记：用户信息、删除任务、创建任务
+        cleaned, task_created, delete_message = await apply_markers(result, user_id)
 
         # 保存助手回复到记忆
         if not cleaned.startswith("Error"):
-            db.add_memory(user_id, "assistant", cleaned)
+            memory_buffer.add(user_id, "assistant", cleaned)
 
-        return cleaned, task_created, delete_message if task_deleted else ""
+        return cleaned, task_created, delete_message
 
+    except (WorkerQueueFull, MoltBusy):
+        return WORKER_BUSY_MESSAGE, False, ""
     except Exception as e:
         logger.error(f"Gold user error: {e}")
         return "❌ 处理出错，请稍后重试", False, ""
@@ -423,7 +759,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    user = db.get_or_create_user(user_id, username)
+    user = await adb.get_or_create_user(user_id, username)
 
     # 检查是否首次使用（created_at 在 10 秒内）
     created_at = user['created_at']
@@ -451,7 +787,7 @@ or /help to see what I do
 
 let's hang 💎"""
     else:
-        stored_name = db.get_user_preference(user_id, 'nickname')
+        stored_name = await adb.get_user_preference(user_id, 'nickname')
         name = stored_name if stored_name else user_name
 
         message = f"""hey {name}! welcome back ☀️
@@ -469,10 +805,10 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    ensure_user_exists(user_id, username)
+    await profile_cache.get(user_id, username)
 
-    memory_count = db.get_memory_count(user_id)
-    tasks = db.get_user_tasks(user_id)
+    memory_count = await memory_buffer.get_memory_count(user_id)
+    tasks = await adb.get_user_tasks(user_id)
 
     status_msg = f"📊 your status\n\n"
     status_msg += f"👤 user: @{username or user_id}\n"
@@ -492,7 +828,7 @@ async def cmd_upgrade(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    ensure_user_exists(user_id, username)
+    await profile_cache.get(user_id, username)
 
     if not context.args:
         await update.message.reply_text("Usage: /upgrade [bronze|silver|gold]")
@@ -503,7 +839,8 @@ async def cmd_upgrade(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Invalid tier. Use: bronze, silver, or gold")
         return
 
-    db.update_user_tier(user_id, new_tier)
+    await adb.update_user_tier(user_id, new_tier)
+    profile_cache.invalidate(user_id)
 
     tier_emoji = {"bronze": "🥉", "silver": "🥈", "gold": "🥇"}.get(new_tier, "")
     await update.message.reply_text(f"✅ Upgraded to {tier_emoji} {new_tier.upper()}!")
@@ -514,14 +851,13 @@ async def cmd_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    ensure_user_exists(user_id, username)
-    tier = db.get_user_tier(user_id)
+    tier = (await profile_cache.get(user_id, username)).tier
 
     if tier == 'bronze':
         await update.message.reply_text("❌ Memory feature requires Silver or Gold tier.")
         return
 
-    memories = db.get_memories(user_id, limit=10)
+    memories = await memory_buffer.get_memories(user_id, limit=10)
 
     if not memories:
         await update.message.reply_text("📭 No memories yet. Start chatting to build your memory!")
@@ -541,8 +877,7 @@ async def cmd_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    ensure_user_exists(user_id, username)
-    tier = db.get_user_tier(user_id)
+    tier = (await profile_cache.get(user_id, username)).tier
 
     if tier == 'bronze':
         await update.message.reply_text("❌ Tasks feature requires Silver or Gold tier.")
@@ -553,9 +888,11 @@ async def cmd_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if context.args[0].lower() in ['delete', 'del', 'remove', 'rm', '删除', '取消']:
             try:
                 task_id = int(context.args[1])
-                task = db.get_task(task_id)
+                task = await adb.get_task(task_id)
                 if task and task['user_id'] == user_id:
-                    db.delete_task(task_id)
+                    await adb.delete_task(task_id)
+                    price_alerts.remove_tasks([task_id])
+                    task_scheduler.remove_tasks([task_id])
                     await update.message.reply_text(f"✅ Task #{task_id} deleted!")
                 else:
                     await update.message.reply_text(f"❌ Task #{task_id} not found or not yours.")
@@ -564,7 +901,7 @@ async def cmd_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
     # 显示任务列表
-    tasks = db.get_user_tasks(user_id)
+    tasks = await adb.get_user_tasks(user_id)
 
     if not tasks:
         await update.message.reply_text(
@@ -599,7 +936,14 @@ async def cmd_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
             tasks_msg += f"{idx}. 🪙 {coin} 价格监控\n"
             tasks_msg += f"   条件：{condition} ${target:,.0f}\n"
             tasks_msg += f"   频率：{frequency}\n"
-            tasks_msg += f"   状态：监控中 🟢\n\n"
+
+            state, until = price_alerts.task_state(task['id'])
+            if state == COOLING and until is not None:
+                tasks_msg += f"   状态：冷却中，{until:%H:%M} 恢复 🟡\n\n"
+            elif state == DONE:
+                tasks_msg += f"   状态：已提醒 ✅\n\n"
+            else:
+                tasks_msg += f"   状态：监控中 🟢\n\n"
 
         elif task['task_type'] == 'scheduled_report':
             topic = config.get('topic', 'N/A')
@@ -617,6 +961,34 @@ async def cmd_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(tasks_msg)
 
 
+def format_flight_stats(title: str, stats: dict) -> str:
+    return (
+        f"🔁 {title}：\n\n"
+        f"缓存：{stats['cached']}，执行中：{stats['inflight']}\n"
+        f"命中缓存：{stats['hits']}，合并：{stats['shared']}，执行：{stats['misses']}\n"
+        f"节省：{stats['saved_rate']:.1%}"
+    )
+
+
+def format_price_stats(stats: dict) -> str:
+    return (
+        "💹 价格缓存：\n\n"
+        f"币种：{stats['symbols']}，命中：{stats['hits']}\n"
+        f"请求：{stats['fetches']}，失败：{stats['errors']}"
+    )
+
+
+def format_alert_stats(stats: dict) -> str:
+    states = stats['states']
+    return (
+        "🔔 价格监控：\n\n"
+        f"索引任务：{stats['alerts']}，待命：{states['armed']}，冷却中：{states['cooling']}\n"
+        f"检查周期：{stats['ticks']}，推送行情：{stats['pushes']}\n"
+        f"穿越：{stats['checked']}，提醒：{stats['fired']}，重新待命：{stats['rearmed']}\n"
+        f"待写回：{stats['pending']}，写回：{stats['checkpoints']} 次，删除一次性任务：{stats['deleted']}"
+    )
+
+
 async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """管理员命令"""
     user_id = update.effective_user.id
@@ -628,7 +1000,54 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if not context.args:
-        await update.message.reply_text("用法：/admin gold list")
+        await update.message.reply_text("用法：/admin gold list | /admin cache | /admin workers")
+        return
+
+    if context.args[0] == "workers":
+        message = "⚙️ Worker：\n\n"
+        for tier, stats in worker_executor.stats().items():
+            profile = tier_resources(tier)
+            message += (
+                f"{tier}: 运行 {stats['running']}/{stats['limit']}，排队 {stats['pending']}"
+                f"（{profile.mem_limit / 1024 ** 2:.0f}MB，{profile.cpus:g} CPU，{profile.pids_limit} pids）\n"
+            )
+
+        stats = host_admission.stats()
+        if stats['enabled']:
+            message += (
+                f"\n宿主机：CPU {stats['cpu']:.0%}，"
+                f"可用内存 {stats['mem_available'] / 1024 ** 3:.1f}/{stats['mem_total'] / 1024 ** 3:.1f}GB，"
+                f"预留 {stats['reserved'] / 1024 ** 2:.0f}MB\n"
+                f"准入：放行 {stats['admitted']}，等待过 {stats['delayed']}，拒绝 {stats['rejected']}，"
+                f"等待中 {stats['waiting']}"
+            )
+        else:
+            message += "\n宿主机准入控制：关闭"
+
+        if task_scheduler.enabled:
+            stats = task_scheduler.stats()
+            next_run = stats['next_run'].strftime('%H:%M:%S') if stats['next_run'] else "-"
+            message += (
+                f"\n\n调度：任务 {stats['tasks']}，执行中 {stats['running']}，下一个 {next_run}\n"
+                f"已执行 {stats['executed']}，失败 {stats['failed']}"
+            )
+
+        await update.message.reply_text(message)
+        return
+
+    if context.args[0] == "cache":
+        stats = context_cache.stats()
+        await update.message.reply_text(
+            "🧠 上下文缓存：\n\n"
+            f"用户数：{stats['users']}\n"
+            f"大小：{stats['bytes'] / 1024:.0f} KB\n"
+            f"命中率：{stats['hit_rate']:.1%}（{stats['hits']} / {stats['hits'] + stats['misses']}）\n"
+            f"淘汰：{stats['evictions']}\n\n"
+            + format_flight_stats("Bronze 合并", bronze_flight.stats()) + "\n\n"
+            + format_flight_stats("闲聊回复缓存", reply_cache.stats()) + "\n\n"
+            + format_price_stats(price_feed.stats()) + "\n\n"
+            + format_alert_stats(price_alerts.stats())
+        )
         return
 
     if context.args[0] == "gold":
@@ -637,7 +1056,9 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         if context.args[1] == "list":
-            workers = molt_manager.list_active_workers()
+            workers = gold_hibernator.annotate(
+                await asyncio.to_thread(molt_manager.list_active_workers)
+            )
             if not workers:
                 await update.message.reply_text("📭 无运行中的 Gold 容器")
                 return
@@ -646,6 +1067,16 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
             for uid, status in workers:
                 message += f"User {uid}: {status}\n"
 
+            stats = gold_hibernator.stats()
+            message += (
+                f"\n常驻：{len(workers) - stats['hibernated']}，休眠：{stats['hibernated']}"
+                f"（{stats['mode']}，平均唤醒 {stats['avg_resume_ms']:.0f}ms）"
+            )
+
+            if molt_mux.enabled:
+                stats = molt_mux.stats()
+                message += f"\n多路复用连接：{stats['connections']}，进行中：{stats['inflight']}"
+
             await update.message.reply_text(message)
 
 
@@ -668,24 +1099,45 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ==================== Natural Language Intent ====================
 
-INTENT_KEYWORDS = {
-    'help': ['菜单', '帮助', 'help', '怎么用', '不会用', '教我', '命令', '功能'],
-    'status': ['等级', 'status', '级别', '权限', '我是啥等级', '状态', '我的等级'],
-    'tasks': ['任务', 'tasks', '监控列表', '我的任务', '哪些任务'],
-}
+# 意图 / 浏览器 / Worker 关键词路由（ROUTING_KEYWORDS_FILE 可热更新）
+intent_router = IntentRouter.from_env()
 
 
 def detect_intent(text: str) -> str | None:
     """检测自然语言意图，返回命令名或 None"""
-    lower = text.lower()
-    for command, keywords in INTENT_KEYWORDS.items():
-        if any(kw in lower for kw in keywords):
-            return command
-    return None
+    return intent_router.classify(text).intent
 
 
 # ==================== Main Message Handler ====================
 
+async def chat_reply(reply: StreamingReply, prompt: str, memory: list = None,
+                     user_name: str = None, tier: str = 'bronze') -> str:
+    """生成闲聊回复；开启流式且对话处理器能流式生成时边生成边编辑 reply，返回完整文本（含标记）"""
+    if not CHAT_STREAMING or not alice_chat.can_stream:
+        if memory is None:
+            # 无记忆时回复只取决于 prompt，常见问题直接命中缓存
+            return await reply_cache.get_reply(alice_chat.generate_reply, prompt, tier, user_name)
+        return await alice_chat.generate_reply(
+            text=prompt,
+            memory=memory,
+            user_name=user_name,
+            user_tier=tier
+        )
+
+    if memory is None:
+        # 缓存 + 合并同时在问的相同问题，只有发起生成的那条消息流式编辑
+        return await reply_cache.stream_reply(
+            lambda: alice_chat.stream_reply(prompt, None, user_name, tier),
+            reply.feed, prompt, tier, user_name,
+        )
+
+    chunks = []
+    async for chunk in alice_chat.stream_reply(prompt, memory, user_name, tier):
+        chunks.append(chunk)
+        await reply.feed(chunk)
+    return "".join(chunks)
+
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """处理普通消息"""
     user_id = update.effective_user.id
@@ -695,9 +1147,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not prompt or len(prompt) < 2:
         return
 
+    # 一次扫描得到意图、浏览器和 Worker 判断
+    route = intent_router.classify(prompt)
+
     # 自然语言快捷命令（短消息才检测，长消息交给 AI）
     if len(prompt) <= 20:
-        intent = detect_intent(prompt)
+        intent = route.intent
         if intent == 'help':
             await cmd_help(update, context)
             return
@@ -708,22 +1163,25 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await cmd_tasks(update, context)
             return
 
-    ensure_user_exists(user_id, username)
-    tier = db.get_user_tier(user_id)
+    profile = await profile_cache.get(user_id, username)
+    tier = profile.tier
 
     logger.info(f"Message from {username} (tier: {tier}): {prompt[:50]}...")
 
     # 判断是否需要 Worker 容器（复杂任务：监控、搜索、浏览等）
-    if alice_chat.needs_worker(prompt):
+    # 没有配置 worker 关键词时沿用 ConversationHandler 的判断
+    needs_worker = route.worker if route.worker is not None else alice_chat.needs_worker(prompt)
+    if needs_worker:
         # 复杂任务走 Worker 容器
+        reply = StreamingReply(update.message)
         if tier == 'bronze':
-            result, task_created, delete_message = await handle_bronze_user(update, prompt)
+            result, task_created, delete_message = await handle_bronze_user(update, prompt, reply)
         elif tier == 'silver':
-            result, task_created, delete_message = await handle_silver_user(update, prompt)
+            result, task_created, delete_message = await handle_silver_user(update, prompt, reply, route)
         elif tier == 'gold':
-            result, task_created, delete_message = await handle_gold_user(update, prompt)
+            result, task_created, delete_message = await handle_gold_user(update, prompt, reply)
         else:
-            result, task_created, delete_message = await handle_bronze_user(update, prompt)
+            result, task_created, delete_message = await handle_bronze_user(update, prompt, reply)
 
         # 截断过长的回复
         if len(result) > 4000:
@@ -739,40 +1197,69 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if delete_message:
             result += f"\n\n{delete_message}"
 
-        await update.message.reply_text(result)
+        if WORKER_STREAMING:
+            # 用最终结果替换占位消息
+            await reply.finish(result)
+        else:
+            await update.message.reply_text(result)
     else:
         # 普通对话走 Alice 轻量对话（无需容器）
-        user_name = db.get_user_preference(user_id, 'nickname')
+        user_name = profile.nickname
 
         # Silver+ 用户有记忆
         memory = None
         if tier in ['silver', 'gold', 'diamond']:
-            memory = db.get_memories_for_context(user_id, limit=20)
-            db.add_memory(user_id, "user", prompt)
+            memory = await memory_buffer.get_memories_for_context(user_id, limit=MEMORY_CONTEXT_LIMIT)
+            memory_buffer.add(user_id, "user", prompt)
 
-        result = alice_chat.generate_reply(
-            text=prompt,
-            memory=memory,
-            user_name=user_name,
-            user_tier=tier
-        )
+        reply = StreamingReply(update.message)
+        result = await chat_reply(reply, prompt, memory, user_name, tier)
 
         # 解析用户信息标记（昵称、时区）
-        result = parse_user_info(result, user_id)
+        result, _, _ = await apply_markers(result, user_id, kinds=('USER_INFO',))
 
         # Silver+ 保存助手回复
         if tier in ['silver', 'gold', 'diamond'] and not result.startswith("oof"):
-            db.add_memory(user_id, "assistant", result)
+            memory_buffer.add(user_id, "assistant", result)
 
         # 截断过长的回复
         if len(result) > 4000:
             result = result[:4000] + "\n\n..."
 
-        await update.message.reply_text(result)
+        # 流式时替换已发出的消息，否则直接回复
+        await reply.finish(result)
 
 
 # ==================== Main ====================
 
+async def run_scheduled_report(bot, task: dict) -> datetime:
+    """定时报告：Worker 生成后发给用户，返回下一次运行时间"""
+    config = task['config']
+    topic = config.get('topic', '定时报告')
+    interval = config.get('interval', 60)
+
+    try:
+        # 不用 user_id 命名容器，避免和用户正在进行的对话冲突
+        result = await run_worker('silver', None, config.get('prompt') or topic)
+    except WorkerQueueFull:
+        logger.warning(f"Worker queue full, postponing report #{task['id']}")
+        return datetime.now() + timedelta(minutes=5)
+
+    cleaned, _ = parse_markers(result)
+    await bot.send_message(chat_id=task['user_id'], text=f"📊 {topic}\n\n{cleaned}"[:4000])
+    return datetime.now() + timedelta(minutes=interval)
+
+
+async def reap_worker_pool():
+    """定期回收空闲超时的池容器"""
+    while True:
+        await asyncio.sleep(WORKER_POOL_REAP_INTERVAL)
+        try:
+            await asyncio.to_thread(worker_pool.reap_idle)
+        except Exception as e:
+            logger.error(f"Worker pool reap error: {e}")
+
+
 def main():
     if not TG_TOKEN:
         print("ERROR: TELEGRAM_TOKEN not found in .env")
@@ -786,8 +1273,8 @@ def main():
     logger.info("Initializing database...")
     db.get_stats()
 
-    # 创建 Bot
-    app = ApplicationBuilder().token(TG_TOKEN).build()
+    # 创建 Bot；并发处理更新，一个用户等 Worker 时不挡住其他人的消息
+    app = ApplicationBuilder().token(TG_TOKEN).concurrent_updates(TG_CONCURRENT_UPDATES).build()
 
     # 注册命令处理器
     app.add_handler(CommandHandler("start", cmd_start))
@@ -801,8 +1288,18 @@ def main():
     # 注册消息处理器
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message))
 
-    # 初始化并启动调度器
-    scheduler = init_scheduler(db, app.bot, check_interval=60)
+    price_alerts.bot = app.bot
+    task_scheduler.bot = app.bot
+    task_scheduler.register('scheduled_report', run_scheduled_report)
+
+    # 初始化并启动调度器；交给 PriceAlertService / HeapScheduler 的任务类型对它隐藏
+    hidden_types = set()
+    if price_alerts.enabled:
+        hidden_types.add(PRICE_MONITOR)
+    if task_scheduler.enabled:
+        hidden_types.update(task_scheduler.handlers)
+    scheduler_db = SchedulerDBView(db, hidden_types) if hidden_types else db
+    scheduler = init_scheduler(scheduler_db, app.bot, check_interval=60)
 
     async def post_init(application):
         """Bot 启动后执行"""
@@ -810,7 +1307,61 @@ def main():
         scheduler.start(loop)
         logger.info("Scheduler started")
 
+        application.create_task(memory_buffer.run())
+
+        if price_alerts.enabled:
+            application.create_task(price_alerts.run())
+            logger.info(f"Price alerts started (interval={price_alerts.interval:.0f}s)")
+
+            if price_ingest is not None:
+                application.create_task(price_ingest.run())
+                logger.info(f"Price stream started ({type(price_ingest.stream).__name__})")
+
+        if task_scheduler.enabled:
+            application.create_task(task_scheduler.run())
+            logger.info(f"Heap scheduler started ({', '.join(task_scheduler.handlers)})")
+
+        if worker_pool.enabled:
+            await asyncio.to_thread(worker_pool.start)
+            application.create_task(reap_worker_pool())
+            logger.info(f"Worker pool started (size={worker_pool.size})")
+
+        if gold_hibernator.enabled:
+            workers = await asyncio.to_thread(molt_manager.list_active_workers)
+            gold_hibernator.seed(workers)
+            application.create_task(gold_hibernator.run())
+            logger.info(
+                f"Gold hibernation started (mode={gold_hibernator.mode}, "
+                f"idle={gold_hibernator.idle_timeout:.0f}s)"
+            )
+
+    async def post_shutdown(application):
+        """Bot 停止时执行"""
+        await memory_buffer.close()
+        # 价格监控最后一次写回状态，要在关闭数据库之前
+        if price_ingest is not None:
+            await price_ingest.close()
+        await price_alerts.close()
+        adb.close()
+
+        worker_executor.shutdown(wait=False)
+        logger.info("Worker executor stopped")
+
+        await asyncio.to_thread(worker_pool.shutdown)
+        logger.info("Worker pool stopped")
+
+        if adocker is not None:
+            await adocker.close()
+
+        await alice_chat.close()
+        await molt_mux.close()
+        gold_hibernator.close()
+
+        task_scheduler.close()
+        await price_feed.close()
+
     app.post_init = post_init
+    app.post_shutdown = post_shutdown
 
     logger.info("Alice Bot starting...")
     print("=" * 50)
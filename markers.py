@@ -0,0 +1,66 @@
+"""
+Markers - 单次扫描解析 Worker / Alice 回复中的结构化标记
+
+支持的标记（可以重复出现）：
+    [TASK_CREATE]{...}[/TASK_CREATE]
+    [TASK_DELETE]{...}[/TASK_DELETE]
+    [USER_INFO]{...}[/USER_INFO]
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import NamedTuple
+
+MARKER_TAGS = ('TASK_CREATE', 'TASK_DELETE', 'USER_INFO')
+_MARKER_OPEN = tuple(f"[{tag}]" for tag in MARKER_TAGS)
+
+
+class MarkerAction(NamedTuple):
+    """回复中的一个标记块"""
+    kind: str         # TASK_CREATE / TASK_DELETE / USER_INFO
+    data: dict        # 解析后的 JSON；解析失败时为 None
+    raw: str          # 标记内的原始 JSON 文本
+
+
+def has_markers(text: str) -> bool:
+    """回复里是否有标记（带副作用，不能把结果共享给其他用户）"""
+    return any(tag in text for tag in _MARKER_OPEN)
+
+
+@lru_cache(maxsize=None)
+def marker_pattern(kinds: tuple = MARKER_TAGS) -> re.Pattern:
+    """返回匹配给定几种标记的预编译正则"""
+    return re.compile(
+        r'\[(' + '|'.join(kinds) + r')\]\s*(\{.*?\})\s*\[/\1\]', re.DOTALL
+    )
+
+
+def parse_markers(response: str, kinds: tuple = MARKER_TAGS) -> tuple[str, list[MarkerAction]]:
+    """
+    一次扫描取出所有标记块
+
+    Returns:
+        (cleaned_response, actions) - actions 按出现顺序排列；
+        没有标记时原样返回 response
+    """
+    parts = []
+    actions = []
+    pos = 0
+
+    for match in marker_pattern(kinds).finditer(response):
+        parts.append(response[pos:match.start()])
+        pos = match.end()
+
+        raw = match.group(2)
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            data = None
+        actions.append(MarkerAction(match.group(1), data, raw))
+
+    if not actions:
+        return response, actions
+
+    parts.append(response[pos:])
+    return "".join(parts).strip(), actions
@@ -0,0 +1,184 @@
+"""
+Memory Buffer - 对话记忆的写缓冲（write-behind）
+
+add() 只把记忆放进内存队列，后台按数量 / 时间阈值合并成一次批量写入。
+读取时会把还没落库的记忆拼在数据库结果后面，保证同一用户读到自己刚写的内容。
+配置了 ContextCache 时，上下文先查缓存，新记忆同步追加到缓存。
+
+db 为 AsyncDatabase；所有方法都在事件循环线程里调用。
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBuffer:
+    """
+    跨用户合并 add_memory 的写缓冲
+
+    - max_pending: 积压到多少条立即刷盘
+    - flush_interval: 最多间隔多少秒刷一次盘
+    - max_backlog: 写入失败时最多保留多少条，超出的丢掉最旧的
+    - max_backoff: 连续写入失败后重试间隔的上限（秒）
+    """
+
+    def __init__(self, db, max_pending: int = 200, flush_interval: float = 2.0,
+                 cache=None, max_backlog: int = 10000, max_backoff: float = 60):
+        self.db = db
+        self.cache = cache
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.max_backoff = max_backoff
+
+        self._failures = 0      # 连续写入失败次数
+        self._retry_at = 0.0    # 失败后下次重试的时间（monotonic）
+        self.dropped = 0
+
+        self._pending = []      # 等待写入的 (user_id, role, content)
+        self._inflight = []     # 正在写入的批次
+        # 写入和"读库 + 拼接未落库记忆"互斥，避免同一条记忆读到两次
+        self._flush_lock = None
+
+        self._wakeup = None
+        self._closed = False
+
+    @classmethod
+    def from_env(cls, db, cache=None) -> "MemoryBuffer":
+        """从环境变量读取配置"""
+        return cls(
+            db,
+            max_pending=int(os.getenv("MEMORY_FLUSH_SIZE", 200)),
+            flush_interval=float(os.getenv("MEMORY_FLUSH_INTERVAL", 2.0)),
+            cache=cache,
+            max_backlog=int(os.getenv("MEMORY_MAX_BACKLOG", 10000)),
+        )
+
+    def _lock(self) -> asyncio.Lock:
+        # 懒创建，保证绑定到运行中的事件循环
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    # ==================== Write ====================
+
+    def add(self, user_id: int, role: str, content: str):
+        """缓冲一条记忆"""
+        self._pending.append((user_id, role, content))
+        if self.cache is not None:
+            self.cache.append(user_id, role, content)
+
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """把缓冲的记忆批量写入数据库，返回写入条数"""
+        async with self._lock():
+            batch = self._pending
+            self._pending = []
+            self._inflight = batch
+
+            if not batch:
+                return 0
+
+            try:
+                await self.db.add_memories(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} memories: {e}")
+                # 放回队列，退避后重试；数据库一直不可用时只保留最新的 max_backlog 条
+                self._pending = batch + self._pending
+                overflow = len(self._pending) - self.max_backlog
+                if overflow > 0:
+                    del self._pending[:overflow]
+                    self.dropped += overflow
+                    logger.error(f"Memory backlog full, dropped {overflow} oldest memories")
+                self._failures += 1
+                backoff = min(self.max_backoff, self.flush_interval * 2 ** self._failures)
+                self._retry_at = time.monotonic() + backoff
+                return 0
+            finally:
+                self._inflight = []
+
+        self._failures = 0
+        return len(batch)
+
+    # ==================== Read ====================
+
+    def _unflushed(self, user_id: int) -> list:
+        return [
+            {'role': role, 'content': content}
+            for uid, role, content in self._inflight + self._pending
+            if uid == user_id
+        ]
+
+    def _has_unflushed(self, user_id: int) -> bool:
+        return any(uid == user_id for uid, _, _ in self._inflight + self._pending)
+
+    async def get_memories_for_context(self, user_id: int, limit: int = 20) -> list:
+        """读取上下文记忆（包含未落库的部分）"""
+        if self.cache is not None:
+            cached = self.cache.get(user_id, limit)
+            if cached is not None:
+                return cached
+        elif not self._has_unflushed(user_id):
+            return await self.db.get_memories_for_context(user_id, limit=limit)
+
+        async with self._lock():
+            rows = await self.db.get_memories_for_context(user_id, limit=limit)
+            # 拼接和写缓存之间没有 await，add() 插不进来，不会漏掉新记忆
+            window = (list(rows) + self._unflushed(user_id))[-limit:]
+            if self.cache is not None:
+                self.cache.put(user_id, window, limit)
+        return window
+
+    async def get_memories(self, user_id: int, limit: int = 10) -> list:
+        """读取最近的记忆（包含未落库的部分）"""
+        if not self._has_unflushed(user_id):
+            return await self.db.get_memories(user_id, limit=limit)
+
+        async with self._lock():
+            rows = await self.db.get_memories(user_id, limit=limit)
+            return (list(rows) + self._unflushed(user_id))[-limit:]
+
+    async def get_memory_count(self, user_id: int) -> int:
+        """记忆条数（包含未落库的部分）"""
+        if not self._has_unflushed(user_id):
+            return await self.db.get_memory_count(user_id)
+
+        async with self._lock():
+            return await self.db.get_memory_count(user_id) + len(self._unflushed(user_id))
+
+    # ==================== Background Flush ====================
+
+    async def run(self):
+        """后台刷盘循环：到时间或积压满了就写一次"""
+        self._wakeup = asyncio.Event()
+
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if time.monotonic() < self._retry_at:
+                # 上次写入失败，还在退避
+                continue
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Memory flush error: {e}")
+
+    async def close(self):
+        """停止后台循环并写入剩余记忆"""
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+        count = await self.flush()
+        if count:
+            logger.info(f"Flushed {count} memories on shutdown")
@@ -0,0 +1,264 @@
+"""
+Molt Mux - 与常驻 Gold 容器之间的多路复用请求协议
+
+每个 Gold 容器在宿主机上暴露一个 Unix socket（MOLT_SOCKET_TEMPLATE，例如
+/var/run/alice/molt_{user_id}.sock），一条连接上可以同时跑多个请求。
+
+帧格式：4 字节大端长度 + UTF-8 JSON
+
+    -> {"id": 1, "type": "request", "prompt": "...", "memory": [...]}
+    -> {"id": 1, "type": "cancel"}
+    <- {"id": 1, "type": "chunk", "text": "..."}     # 可选，流式片段
+    <- {"id": 1, "type": "result", "text": "..."}    # 结束；text 为 chunk 之后剩余的部分
+    <- {"id": 1, "type": "error", "error": "..."}
+
+每条连接同时进行的请求数有上限（max_inflight），排队的请求数也有上限（max_pending），
+满了抛 MoltBusy。调用方取消（或放弃迭代）时向容器发送 cancel。
+"""
+
+import os
+import json
+import struct
+import asyncio
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+
+# 单帧最大字节数
+MAX_FRAME = 16 * 1024 * 1024
+
+# 连接断开时发给等待者的标记
+_CLOSED = object()
+
+
+class MoltError(Exception):
+    """容器返回了错误"""
+    pass
+
+
+class MoltUnavailable(Exception):
+    """连不上容器，或连接在请求过程中断开"""
+    pass
+
+
+class MoltBusy(Exception):
+    """该容器排队的请求已满"""
+    pass
+
+
+def encode_frame(message: dict) -> bytes:
+    body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+    if len(body) > MAX_FRAME:
+        raise ValueError(f"frame too large ({len(body)} bytes)")
+    return _LENGTH.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if length > MAX_FRAME:
+        raise MoltUnavailable(f"frame too large ({length} bytes)")
+    return json.loads(await reader.readexactly(length))
+
+
+class MoltConnection:
+    """到一个 Gold 容器的多路复用连接"""
+
+    def __init__(self, path: str, max_inflight: int = 4, max_pending: int = 16):
+        self.path = path
+        self.max_inflight = max_inflight
+        self.max_pending = max_pending
+
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._ids = itertools.count(1)
+        self._streams = {}          # request id -> asyncio.Queue
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._waiting = 0
+        self.closed = False
+
+    async def open(self, timeout: float = 5.0):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(self.path), timeout
+        )
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    @property
+    def inflight(self) -> int:
+        return len(self._streams)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = await read_frame(self._reader)
+                queue = self._streams.get(message.get('id'))
+                # 已取消的请求可能还会收到响应，直接丢掉
+                if queue is not None:
+                    queue.put_nowait(message)
+        except (asyncio.IncompleteReadError, ConnectionError, MoltUnavailable, ValueError) as e:
+            logger.warning(f"Molt connection {self.path} closed: {e}")
+        finally:
+            self.closed = True
+            for queue in self._streams.values():
+                queue.put_nowait(_CLOSED)
+            self._writer.close()
+
+    def _send(self, message: dict):
+        if self.closed:
+            raise MoltUnavailable(f"connection to {self.path} is closed")
+        self._writer.write(encode_frame(message))
+
+    async def stream(self, prompt: str, memory: list = None):
+        """
+        发送一个请求，逐段产出结果
+
+        Raises:
+            MoltBusy: 排队已满
+            MoltUnavailable: 连接断开
+            MoltError: 容器返回错误
+        """
+        if self._waiting >= self.max_pending:
+            raise MoltBusy(self.path)
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        request_id = next(self._ids)
+        queue = asyncio.Queue()
+        self._streams[request_id] = queue
+        finished = False
+        try:
+            self._send({'id': request_id, 'type': 'request', 'prompt': prompt, 'memory': memory or []})
+            await self._writer.drain()
+
+            while True:
+                message = await queue.get()
+                if message is _CLOSED:
+                    finished = True
+                    raise MoltUnavailable(f"connection to {self.path} closed during request")
+
+                kind = message.get('type')
+                if kind == 'chunk':
+                    if message.get('text'):
+                        yield message['text']
+                elif kind == 'result':
+                    finished = True
+                    if message.get('text'):
+                        yield message['text']
+                    return
+                elif kind == 'error':
+                    finished = True
+                    raise MoltError(message.get('error') or 'unknown error')
+        finally:
+            self._streams.pop(request_id, None)
+            self._slots.release()
+            # 调用方取消 / 中途放弃：通知容器停止这个请求
+            if not finished and not self.closed:
+                try:
+                    self._send({'id': request_id, 'type': 'cancel'})
+                except Exception:
+                    pass
+
+    async def request(self, prompt: str, memory: list = None) -> str:
+        """发送一个请求，返回完整结果"""
+        return "".join([chunk async for chunk in self.stream(prompt, memory)])
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+
+
+class MoltMux:
+    """
+    按用户管理到 Gold 容器的连接
+
+    - socket_template: socket 路径模板（含 {user_id}）；为空时关闭
+    - max_inflight / max_pending: 每个容器同时进行 / 排队的请求数上限
+    """
+
+    def __init__(self, socket_template: str = "", max_inflight: int = 4, max_pending: int = 16):
+        self.socket_template = socket_template
+        self.max_inflight = max_inflight
+        self.max_pending = max_pending
+
+        self._connections = {}      # user_id -> MoltConnection
+        self._connecting = {}       # user_id -> 正在建立的连接
+
+    @classmethod
+    def from_env(cls) -> "MoltMux":
+        """从环境变量读取配置"""
+        return cls(
+            socket_template=os.getenv("MOLT_SOCKET_TEMPLATE", ""),
+            max_inflight=int(os.getenv("MOLT_MAX_INFLIGHT", 4)),
+            max_pending=int(os.getenv("MOLT_MAX_PENDING", 16)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.socket_template)
+
+    def socket_path(self, user_id: int) -> str:
+        return self.socket_template.format(user_id=user_id)
+
+    def available(self, user_id: int) -> bool:
+        """该用户的容器是否暴露了多路复用 socket"""
+        return self.enabled and os.path.exists(self.socket_path(user_id))
+
+    async def connection(self, user_id: int) -> MoltConnection:
+        """获取（必要时建立）到用户容器的连接"""
+        conn = self._connections.get(user_id)
+        if conn is not None and not conn.closed:
+            return conn
+
+        # 同一用户的并发建连合并成一次
+        connecting = self._connecting.get(user_id)
+        if connecting is not None:
+            return await asyncio.shield(connecting)
+
+        async def connect():
+            conn = MoltConnection(self.socket_path(user_id), self.max_inflight, self.max_pending)
+            try:
+                await conn.open()
+            except (OSError, asyncio.TimeoutError) as e:
+                raise MoltUnavailable(f"cannot connect to {conn.path}: {e}") from e
+            self._connections[user_id] = conn
+            return conn
+
+        connecting = asyncio.ensure_future(connect())
+        self._connecting[user_id] = connecting
+        try:
+            return await asyncio.shield(connecting)
+        finally:
+            self._connecting.pop(user_id, None)
+
+    async def stream(self, user_id: int, prompt: str, memory: list = None):
+        """向用户的 Gold 容器发送请求，逐段产出结果"""
+        conn = await self.connection(user_id)
+        async for chunk in conn.stream(prompt, memory):
+            yield chunk
+
+    async def request(self, user_id: int, prompt: str, memory: list = None) -> str:
+        conn = await self.connection(user_id)
+        return await conn.request(prompt, memory)
+
+    def stats(self) -> dict:
+        live = [conn for conn in self._connections.values() if not conn.closed]
+        return {
+            'connections': len(live),
+            'inflight': sum(conn.inflight for conn in live),
+        }
+
+    async def close(self):
+        for conn in list(self._connections.values()):
+            await conn.close()
+        self._connections.clear()
@@ -0,0 +1,354 @@
+"""
+Price Alerts - 集中检查所有 price_monitor 任务
+
+price_monitor 任务保存在内存里的阈值索引（AlertIndex）中。每个周期按币种通过
+PriceFeed 查一次价格，用二分找出阈值被穿越的任务，给用户发提醒；没触发的任务不用逐个比较。
+
+索引在启动时从数据库加载，之后随 [TASK_CREATE] / [TASK_DELETE] 增删
+（add_task / remove_tasks），并每隔 resync_interval 和数据库重新对齐一次，
+兜住其它途径的修改。
+
+任务 config：{"coin": "BTC", "target_price": 90000, "condition": "below", "cooldown": 60}
+- cooldown 为分钟数，触发后这段时间内不再提醒
+- cooldown 为 0 表示持续监控（每个周期都提醒；推送行情下两次提醒至少间隔 min_repeat）
+- cooldown >= 999999 表示只提醒一次，触发后删除任务
+
+除了按周期检查（tick），还可以由推送行情（price_stream）逐笔调用 on_price，
+穿越阈值后一秒内就能提醒。
+
+冷却由内存里的状态机（AlertStateMachine：armed → fired → cooling → armed）负责，
+触发时先离开 armed 再发送，同一任务不会被连续的行情重复触发；提醒时不写数据库，
+冷却结束时间和已提醒的一次性任务每隔 checkpoint_interval 批量写回 / 删除。
+
+默认关闭，price_monitor 仍由原调度器处理。PRICE_ALERTS=shared 开启（需要真实行情源，
+数据库支持 SchedulerDBView.LIST_METHODS），之后调度器拿到的是 SchedulerDBView，
+看不到 price_monitor 任务，避免重复提醒。
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+
+from alert_index import AlertIndex
+from alert_state import AlertStateMachine, DONE
+
+logger = logging.getLogger(__name__)
+
+PRICE_MONITOR = 'price_monitor'
+
+
+def is_price_task(task: dict) -> bool:
+    return task.get('task_type') == PRICE_MONITOR
+
+
+def task_coin(task: dict) -> str:
+    return str(task['config'].get('coin', '')).upper()
+
+
+def alert_triggered(config: dict, price: float) -> bool:
+    """价格是否满足任务的触发条件"""
+    target = config.get('target_price')
+    if target is None:
+        return False
+    if config.get('condition') == 'above':
+        return price > target
+    return price < target
+
+
+def format_alert(config: dict, price: float) -> str:
+    coin = str(config.get('coin', '?')).upper()
+    target = config.get('target_price', 0)
+    action = "涨破" if config.get('condition') == 'above' else "跌破"
+    return f"🔔 {coin} 已{action} ${target:,.0f}\n当前价格：${price:,.2f}"
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _task_type(row):
+    try:
+        return row['task_type']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class SchedulerDBView:
+    """
+    传给 init_scheduler 的数据库代理
+
+    调度器列出任务用的方法（LIST_METHODS）返回的结果去掉 task_types 里的任务
+    （默认 price_monitor，由 PriceAlertService 负责），list / tuple / 生成器 / 游标都会展开成 list；
+    其它调用原样转发。数据库缺少其中任何一个方法时直接报错，不让任务被重复执行或漏掉。
+    """
+
+    LIST_METHODS = ('get_active_tasks', 'get_user_tasks')
+
+    def __init__(self, db, task_types=(PRICE_MONITOR,)):
+        missing = [name for name in self.LIST_METHODS if not callable(getattr(db, name, None))]
+        if missing:
+            raise TypeError(f"SchedulerDBView needs database methods {missing}")
+        self._db = db
+        self._task_types = frozenset(task_types)
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if name not in self.LIST_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if result is None or isinstance(result, (str, bytes, Mapping)) or not isinstance(result, Iterable):
+                return result
+            return [row for row in result if _task_type(row) not in self._task_types]
+
+        return call
+
+
+class PriceAlertService:
+    """
+    price_monitor 任务的检查循环
+
+    - adb: AsyncDatabase
+    - feed: PriceFeed
+    - bot: telegram Bot（send_message）；可以在启动前再设置
+    - interval: 检查间隔（秒）
+    - max_sends: 同时发送的提醒数上限
+    - resync_interval: 和数据库重新对齐索引的间隔（秒）
+    - min_repeat: cooldown 为 0 的任务两次提醒的最小间隔（秒）
+    - checkpoint_interval: 把状态写回数据库的间隔（秒）
+    """
+
+    def __init__(self, adb, feed, bot=None, interval: float = 60, max_sends: int = 20,
+                 mode: str = "shared", resync_interval: float = 600, min_repeat: float = 30,
+                 checkpoint_interval: float = 60):
+        self.adb = adb
+        self.feed = feed
+        self.bot = bot
+        self.interval = interval
+        self.max_sends = max_sends
+        self.mode = mode
+        self.resync_interval = resync_interval
+        self.checkpoint_interval = checkpoint_interval
+
+        self.index = AlertIndex()
+        self.states = AlertStateMachine(min_repeat)
+        self._loaded_at = None
+        self._checkpointed_at = None
+        self._sends = None
+        self._sending = set()   # on_price 在后台发送的提醒
+        self._wakeup = None
+        self._closed = False
+
+        self.ticks = 0
+        self.pushes = 0
+        self.checked = 0
+        self.fired = 0
+        self.checkpoints = 0
+        self.deleted = 0
+
+    @classmethod
+    def from_env(cls, adb, feed, bot=None) -> "PriceAlertService":
+        """从环境变量读取配置"""
+        return cls(
+            adb,
+            feed,
+            bot,
+            interval=float(os.getenv("PRICE_ALERT_INTERVAL", 60)),
+            max_sends=int(os.getenv("PRICE_ALERT_MAX_SENDS", 20)),
+            mode=os.getenv("PRICE_ALERTS", "off"),
+            resync_interval=float(os.getenv("PRICE_ALERT_RESYNC_INTERVAL", 600)),
+            min_repeat=float(os.getenv("PRICE_ALERT_MIN_REPEAT", 30)),
+            checkpoint_interval=float(os.getenv("PRICE_ALERT_CHECKPOINT_INTERVAL", 60)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """shared 模式、接了真实行情源且数据库能列出所有任务；否则 price_monitor 仍由调度器处理"""
+        return (
+            self.mode == "shared"
+            and self.feed.live
+            and all(self.adb.supports(name) for name in SchedulerDBView.LIST_METHODS)
+        )
+
+    # ==================== Index ====================
+
+    def _track(self, task: dict, now: datetime):
+        self.index.add(task)
+        # next_run 还没到（新建任务等一分钟 / 冷却中）时从 cooling 开始
+        self.states.track(task['id'], _as_datetime(task.get('next_run')), now)
+
+    async def load(self):
+        """从数据库重建索引"""
+        now = datetime.now()
+        tasks = [task for task in await self.adb.get_active_tasks() if is_price_task(task)]
+        # 状态以内存为准（数据库里的 next_run 可能还没写回）
+        self.states.sync({task['id']: _as_datetime(task.get('next_run')) for task in tasks}, now)
+        # 已提醒、等待删除的一次性任务不再进索引
+        self.index.rebuild([task for task in tasks if self.states.state(task['id'], now) != DONE])
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(self.index)} price alerts")
+
+    def add_task(self, task: dict):
+        """新建了 price_monitor 任务（task 为完整的任务行）；没开启时由调度器负责，这里不跟踪"""
+        if self.enabled and is_price_task(task):
+            self._track(task, datetime.now())
+
+    def remove_tasks(self, task_ids):
+        """任务被删除"""
+        if not self.enabled:
+            return
+        for task_id in task_ids:
+            self.index.remove(task_id)
+            self.states.drop(task_id)
+
+    def task_state(self, task_id) -> tuple:
+        """(状态, 冷却结束时间)；没有跟踪的任务状态为 None"""
+        return self.states.state(task_id, datetime.now()), self.states.cooling_until(task_id)
+
+    # ==================== Checking ====================
+
+    async def tick(self) -> int:
+        """检查一次所有价格监控，返回触发的数量"""
+        self.ticks += 1
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.resync_interval:
+            # 先写回，数据库里不会再有已经提醒过的一次性任务
+            await self.checkpoint()
+            await self.load()
+
+        coins = self.index.coins()
+        if not coins:
+            return 0
+
+        # 每个币种只查一次价格，只取出阈值被穿越的任务
+        prices = await self.feed.get_prices(coins)
+        now = datetime.now()
+        fired = []
+        for coin, price in prices.items():
+            fired.extend(self._trigger(coin, price, now))
+
+        if fired:
+            await asyncio.gather(*(self._fire(task, price) for task, price in fired))
+        return len(fired)
+
+    async def on_price(self, coin: str, price: float) -> int:
+        """推送行情：立即检查该币种，提醒在后台发送；返回触发的数量"""
+        if self._loaded_at is None:
+            return 0
+        self.pushes += 1
+
+        fired = self._trigger(coin, price, datetime.now())
+        for task, price in fired:
+            sending = asyncio.ensure_future(self._fire(task, price))
+            self._sending.add(sending)
+            sending.add_done_callback(self._sending.discard)
+        return len(fired)
+
+    def _trigger(self, coin: str, price: float, now: datetime) -> list:
+        """找出被穿越且处于 armed 的任务，转为 fired，返回 [(task, price)]"""
+        fired = []
+        for task in self.index.crossed(coin, price):
+            self.checked += 1
+            if self.states.fire(task['id'], task['config'].get('cooldown', 60), now):
+                fired.append((task, price))
+        return fired
+
+    async def _fire(self, task: dict, price: float):
+        """发送提醒，转为 cooling / done；数据库由 checkpoint 批量写回"""
+        if self._sends is None:
+            self._sends = asyncio.Semaphore(self.max_sends)
+
+        ok = True
+        async with self._sends:
+            try:
+                await self.bot.send_message(chat_id=task['user_id'], text=format_alert(task['config'], price))
+            except Exception as e:
+                ok = False
+                logger.error(f"Failed to send price alert #{task['id']} to {task['user_id']}: {e}")
+
+        if ok:
+            self.fired += 1
+        if self.states.sent(task['id'], ok, datetime.now()) == DONE:
+            self.index.remove(task['id'])
+
+    # ==================== Checkpoint ====================
+
+    async def checkpoint(self) -> int:
+        """把攒下的冷却结束时间和已提醒的一次性任务一次写回数据库，返回写回的任务数"""
+        self._checkpointed_at = time.monotonic()
+        next_runs, done = self.states.take_checkpoint()
+        if not next_runs and not done:
+            return 0
+
+        try:
+            await self.adb.checkpoint_tasks(next_runs, done)
+        except Exception as e:
+            logger.error(f"Price alert checkpoint error: {e}")
+            self.states.restore_checkpoint(next_runs, done)
+            return 0
+
+        self.states.committed(done)
+        self.checkpoints += 1
+        self.deleted += len(done)
+        return len(next_runs) + len(done)
+
+    # ==================== Loop ====================
+
+    async def run(self):
+        """后台检查循环"""
+        self._wakeup = asyncio.Event()
+        self._checkpointed_at = time.monotonic()
+
+        # 启动时立即加载索引，推送行情（on_price）不用等第一个检查周期
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Price alert load error: {e}")
+
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closed:
+                break
+
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Price alert check error: {e}")
+
+            if time.monotonic() - self._checkpointed_at >= self.checkpoint_interval:
+                await self.checkpoint()
+
+    async def close(self):
+        """停止检查，等正在发送的提醒发完，最后写回一次"""
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        await self.checkpoint()
+
+    def stats(self) -> dict:
+        return {
+            'alerts': len(self.index),
+            'ticks': self.ticks,
+            'pushes': self.pushes,
+            'checked': self.checked,
+            'fired': self.fired,
+            'states': self.states.counts(datetime.now()),
+            'rearmed': self.states.rearmed,
+            'pending': self.states.pending(),
+            'checkpoints': self.checkpoints,
+            'deleted': self.deleted,
+        }
@@ -0,0 +1,244 @@
+"""
+Price Feed - 所有 price_monitor 任务共用的价格缓存
+
+成千上万个 BTC 监控任务不应该各自去查一次价格。PriceFeed 按币种缓存价格（TTL），
+一次 get_prices() 里缺失 / 过期的币种合并成一次批量请求；同一币种正在请求时，
+其它调用方等同一个结果，不会重复请求。
+
+价格来源可替换：
+- HttpPriceSource: Binance 兼容的 /api/v3/ticker/price 接口（依赖 httpx，可选）
+- StubPriceSource: 本地固定价格，测试和基准测试用
+
+PRICE_SOURCE=http|stub 选择来源。
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class PriceError(Exception):
+    """价格来源请求失败"""
+    pass
+
+
+class PriceSource:
+    """价格来源接口"""
+
+    async def fetch(self, symbols: list) -> dict:
+        """查询一批币种（大写，如 BTC）的价格，返回 {symbol: price}；查不到的币种不返回"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class StubPriceSource(PriceSource):
+    """
+    本地价格来源：价格由调用方设置
+
+    - prices: 初始价格 {symbol: price}
+    - latency: 每次请求模拟的延迟（秒）
+    """
+
+    def __init__(self, prices: dict = None, latency: float = 0.0):
+        self.prices = {symbol.upper(): price for symbol, price in (prices or {}).items()}
+        self.latency = latency
+        self.requests = 0
+        self.symbols_requested = 0
+
+    def set(self, symbol: str, price: float):
+        self.prices[symbol.upper()] = price
+
+    async def fetch(self, symbols: list) -> dict:
+        self.requests += 1
+        self.symbols_requested += len(symbols)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+class HttpPriceSource(PriceSource):
+    """
+    Binance 兼容的行情接口：GET {url}?symbols=["BTCUSDT","ETHUSDT"]
+
+    - url: ticker/price 接口地址
+    - quote: 计价币种，拼在币种后面（BTC -> BTCUSDT）
+    - timeout: 请求超时（秒）
+    """
+
+    def __init__(self, url: str = "https://api.binance.com/api/v3/ticker/price",
+                 quote: str = "USDT", timeout: float = 10):
+        if httpx is None:
+            raise RuntimeError("HttpPriceSource requires httpx (pip install httpx)")
+        self.url = url
+        self.quote = quote
+        self.timeout = timeout
+        self._client = None
+        # 接口不认识的币种（整批请求会 400），之后不再请求
+        self._unknown = set()
+
+    def _http(self) -> "httpx.AsyncClient":
+        # 懒创建，保证绑定到运行中的事件循环
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def _get(self, pairs: list) -> list:
+        params = {'symbols': json.dumps(pairs, separators=(',', ':'))}
+        response = await self._http().get(self.url, params=params)
+        if response.status_code == 400:
+            return None
+        if response.status_code != 200:
+            raise PriceError(f"price API returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def fetch(self, symbols: list) -> dict:
+        pairs = {f"{symbol}{self.quote}": symbol for symbol in symbols if symbol not in self._unknown}
+        if not pairs:
+            return {}
+
+        try:
+            rows = await self._get(list(pairs))
+            if rows is None:
+                # 有不认识的币种：逐个查，找出是哪个
+                rows = []
+                for pair, symbol in pairs.items():
+                    single = await self._get([pair])
+                    if single is None:
+                        logger.warning(f"Unknown price symbol {symbol}")
+                        self._unknown.add(symbol)
+                    else:
+                        rows.extend(single)
+        except httpx.HTTPError as e:
+            raise PriceError(f"price API request failed: {e}") from e
+
+        return {pairs[row['symbol']]: float(row['price']) for row in rows if row.get('symbol') in pairs}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class PriceFeed:
+    """
+    带 TTL 的共享价格缓存
+
+    - source: PriceSource
+    - ttl: 价格缓存秒数（一个调度周期内的所有任务共用一次查询）
+    """
+
+    def __init__(self, source: PriceSource, ttl: float = 30):
+        self.source = source
+        self.ttl = ttl
+
+        self._prices = {}       # symbol -> (price, 查询时间)
+        self._inflight = {}     # symbol -> 正在进行的批量请求
+
+        self.hits = 0
+        self.fetches = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "PriceFeed":
+        """从环境变量读取配置"""
+        if os.getenv("PRICE_SOURCE", "http") == "stub":
+            source = StubPriceSource()
+        elif httpx is None:
+            logger.warning("httpx not installed, price feed has no live source; price alerts stay on the scheduler")
+            source = StubPriceSource()
+        else:
+            source = HttpPriceSource(
+                url=os.getenv("PRICE_API_URL", "https://api.binance.com/api/v3/ticker/price"),
+                quote=os.getenv("PRICE_QUOTE", "USDT"),
+            )
+        return cls(source, ttl=float(os.getenv("PRICE_CACHE_TTL", 30)))
+
+    @property
+    def live(self) -> bool:
+        """是否接了真实的行情源（StubPriceSource 只用于测试）"""
+        return not isinstance(self.source, StubPriceSource)
+
+    def cached(self, symbol: str) -> float | None:
+        """缓存里未过期的价格"""
+        entry = self._prices.get(symbol.upper())
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def put(self, symbol: str, price: float):
+        """直接写入一个价格（例如推送行情）"""
+        self._prices[symbol.upper()] = (price, time.monotonic())
+
+    async def get_prices(self, symbols) -> dict:
+        """
+        查询一批币种的价格，返回 {symbol: price}
+
+        缓存命中的直接返回；其余的合并成一次请求，正在请求中的币种等待已有的请求。
+        请求失败时返回缓存里的旧价格（如果有），否则不包含该币种。
+        """
+        result = {}
+        waiting = {}
+        missing = []
+        for symbol in {symbol.upper() for symbol in symbols}:
+            price = self.cached(symbol)
+            if price is not None:
+                self.hits += 1
+                result[symbol] = price
+            elif symbol in self._inflight:
+                waiting[symbol] = self._inflight[symbol]
+            else:
+                missing.append(symbol)
+
+        if missing:
+            request = asyncio.ensure_future(self._fetch(missing))
+            for symbol in missing:
+                self._inflight[symbol] = request
+                waiting[symbol] = request
+
+        for symbol, request in waiting.items():
+            prices = await asyncio.shield(request)
+            if symbol in prices:
+                result[symbol] = prices[symbol]
+        return result
+
+    async def get_price(self, symbol: str) -> float | None:
+        return (await self.get_prices([symbol])).get(symbol.upper())
+
+    async def _fetch(self, symbols: list) -> dict:
+        self.fetches += 1
+        try:
+            prices = await self.source.fetch(symbols)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to fetch prices for {', '.join(symbols)}: {e}")
+            prices = {symbol: self._prices[symbol][0] for symbol in symbols if symbol in self._prices}
+        else:
+            now = time.monotonic()
+            for symbol, price in prices.items():
+                self._prices[symbol] = (price, now)
+        finally:
+            for symbol in symbols:
+                self._inflight.pop(symbol, None)
+        return prices
+
+    def stats(self) -> dict:
+        return {
+            'symbols': len(self._prices),
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'errors': self.errors,
+        }
+
+    async def close(self):
+        await self.source.close()
@@ -0,0 +1,247 @@
+"""
+Price Stream - 推送行情接入
+
+按周期检查（PriceAlertService.tick）最多晚一个周期才能发现价格穿越，
+快速的插针可能在两次检查之间就结束了。这里接入推送行情，每笔行情写进 PriceFeed
+的缓存并立即交给 PriceAlertService.on_price 检查，提醒延迟降到一秒以内。
+
+行情来源可替换（PRICE_STREAM）：
+- binance: Binance 全市场 miniTicker WebSocket（每秒一次，依赖 websockets，可选）
+- replay:<path>: 本地回放 CSV（offset_seconds,symbol,price），测试和基准测试用
+- 空 / off: 关闭，只按周期检查
+
+行情比检查快时按币种合并，检查每个币种这段时间里的最低和最高价（只留最新价会漏掉一笔的插针）；
+连接断开后指数退避重连。
+"""
+
+import os
+import csv
+import json
+import random
+import asyncio
+import logging
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStream:
+    """
+    推送行情来源接口
+
+    - finite: ticks() 正常结束表示行情放完了（回放），不再重连；否则视为断线，退避后重连
+    """
+
+    finite = False
+
+    async def ticks(self):
+        """逐笔产出 (symbol, price)，symbol 为大写币种（如 BTC）；连接断开时抛异常或结束"""
+        raise NotImplementedError
+        yield
+
+    async def close(self):
+        pass
+
+
+class ReplayPriceStream(PriceStream):
+    """
+    回放一组行情
+
+    - ticks: [(offset_seconds, symbol, price), ...]，按时间顺序
+    - speed: 回放速度倍数（0 表示不等待）
+    - loop: 放完后从头再来
+    """
+
+    def __init__(self, ticks: list, speed: float = 1.0, loop: bool = False):
+        self._ticks = list(ticks)
+        self.speed = speed
+        self.loop = loop
+        self.finite = not loop
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "ReplayPriceStream":
+        rows = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith('#'):
+                    continue
+                try:
+                    rows.append((float(row[0]), row[1].strip().upper(), float(row[2])))
+                except (ValueError, IndexError):
+                    # 表头或坏行
+                    continue
+        return cls(rows, **kwargs)
+
+    async def ticks(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            for offset, symbol, price in self._ticks:
+                if self.speed:
+                    delay = start + offset / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                yield symbol, price
+            if not self.loop:
+                return
+
+
+class BinancePriceStream(PriceStream):
+    """
+    Binance 全市场 miniTicker（!miniTicker@arr），只保留以 quote 计价的交易对
+
+    - url: WebSocket 地址
+    - quote: 计价币种（BTCUSDT -> BTC）
+    """
+
+    def __init__(self, url: str = "wss://stream.binance.com:9443/ws/!miniTicker@arr",
+                 quote: str = "USDT"):
+        if websockets is None:
+            raise RuntimeError("BinancePriceStream requires websockets (pip install websockets)")
+        self.url = url
+        self.quote = quote
+        self._connection = None
+
+    async def ticks(self):
+        async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 22) as connection:
+            self._connection = connection
+            try:
+                async for message in connection:
+                    try:
+                        rows = json.loads(message)
+                    except ValueError:
+                        continue
+                    for row in rows if isinstance(rows, list) else (rows,):
+                        pair = row.get('s', '')
+                        if pair.endswith(self.quote) and 'c' in row:
+                            yield pair[:-len(self.quote)], float(row['c'])
+            finally:
+                self._connection = None
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+
+
+def price_stream_from_env() -> PriceStream | None:
+    """按 PRICE_STREAM 创建行情来源；关闭或依赖缺失时返回 None"""
+    spec = os.getenv("PRICE_STREAM", "")
+    if not spec or spec == "off":
+        return None
+    if spec.startswith("replay:"):
+        return ReplayPriceStream.from_csv(
+            spec[len("replay:"):],
+            speed=float(os.getenv("PRICE_STREAM_REPLAY_SPEED", 1)),
+            loop=os.getenv("PRICE_STREAM_REPLAY_LOOP", "0") == "1",
+        )
+    if spec == "binance":
+        if websockets is None:
+            logger.warning("websockets not installed, price stream disabled")
+            return None
+        return BinancePriceStream(
+            url=os.getenv("PRICE_STREAM_URL", "wss://stream.binance.com:9443/ws/!miniTicker@arr"),
+            quote=os.getenv("PRICE_QUOTE", "USDT"),
+        )
+    logger.warning(f"Unknown PRICE_STREAM {spec!r}, price stream disabled")
+    return None
+
+
+class PriceIngest:
+    """
+    把推送行情接到价格缓存和提醒检查上
+
+    - stream: PriceStream
+    - feed: PriceFeed（行情写进缓存，按周期检查时不用再请求接口）
+    - alerts: PriceAlertService（on_price）
+    - max_backoff: 重连退避上限（秒）
+    """
+
+    def __init__(self, stream: PriceStream, feed, alerts, max_backoff: float = 60):
+        self.stream = stream
+        self.feed = feed
+        self.alerts = alerts
+        self.max_backoff = max_backoff
+
+        self._pending = {}      # symbol -> (最低价, 最高价)，还没检查的行情
+        self._ready = None
+        self._closed = False
+        self._finished = False
+
+        self.received = 0
+        self.evaluated = 0
+        self.reconnects = 0
+
+    async def _receive(self):
+        """读行情；断开后重连"""
+        failures = 0
+        while not self._closed:
+            try:
+                async for symbol, price in self.stream.ticks():
+                    if self._closed:
+                        return
+                    failures = 0
+                    self.received += 1
+                    self.feed.put(symbol, price)
+                    pending = self._pending.get(symbol)
+                    if pending is None:
+                        self._pending[symbol] = (price, price)
+                    else:
+                        self._pending[symbol] = (min(pending[0], price), max(pending[1], price))
+                    self._ready.set()
+                if self.stream.finite:
+                    # 行情放完了
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Price stream error: {e}")
+
+            if self._closed:
+                return
+            failures += 1
+            self.reconnects += 1
+            delay = min(self.max_backoff, 2 ** failures) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+
+    async def _evaluate(self):
+        """检查合并后的行情；行情结束后检查完剩下的再退出"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            pending, self._pending = self._pending, {}
+            for symbol, (low, high) in pending.items():
+                self.evaluated += 1
+                try:
+                    await self.alerts.on_price(symbol, low)
+                    if high != low:
+                        await self.alerts.on_price(symbol, high)
+                except Exception as e:
+                    logger.error(f"Price alert evaluation error for {symbol}: {e}")
+            if self._finished and not self._pending:
+                return
+
+    async def run(self):
+        """后台运行，直到 close() 或回放结束"""
+        self._ready = asyncio.Event()
+        evaluator = asyncio.ensure_future(self._evaluate())
+        try:
+            await self._receive()
+        finally:
+            self._finished = True
+            self._ready.set()
+            await evaluator
+
+    async def close(self):
+        self._closed = True
+        await self.stream.close()
+
+    def stats(self) -> dict:
+        return {
+            'received': self.received,
+            'evaluated': self.evaluated,
+            'reconnects': self.reconnects,
+        }
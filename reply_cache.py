@@ -0,0 +1,123 @@
+"""
+Reply Cache - 无记忆闲聊回复（generate_reply(memory=None)）的缓存
+
+没有记忆时回复只取决于 prompt、等级和是否有昵称，常见的问候 / FAQ 直接命中缓存，
+省掉一次 LLM 调用。缓存里保存的是模板：回复中的昵称替换成占位符，
+命中后再填入当前用户的昵称。
+
+带标记（[USER_INFO] 等）的回复和 "oof" 开头的错误回复不缓存。
+"""
+
+import os
+import re
+import inspect
+
+from markers import MARKER_TAGS
+from singleflight import SingleFlight, normalize_prompt
+
+# 模板里的昵称占位符
+NICKNAME_SLOT = "\x00nickname\x00"
+
+# 太短的昵称（单字母等）替换起来容易误伤，回复里出现时不缓存
+MIN_TEMPLATE_NICKNAME = 2
+
+_MARKER_OPEN = tuple(f"[{tag}]" for tag in MARKER_TAGS)
+
+_LANGUAGE_RES = (
+    ('ja', re.compile(r'[぀-ヿ]')),
+    ('ko', re.compile(r'[가-힯]')),
+    ('zh', re.compile(r'[一-鿿]')),
+)
+
+
+def detect_language(text: str) -> str:
+    """按字符粗略判断语言（zh / ja / ko / en）"""
+    for language, pattern in _LANGUAGE_RES:
+        if pattern.search(text):
+            return language
+    return 'en'
+
+
+class ReplyCache:
+    """
+    generate_reply 的 TTL + LRU 缓存，相同问题的并发调用合并成一次
+
+    - ttl: 缓存秒数
+    - max_size: 最多缓存多少条回复
+    """
+
+    def __init__(self, ttl: float = 600, max_size: int = 5000):
+        self._flight = SingleFlight(ttl=ttl, max_size=max_size)
+
+    @classmethod
+    def from_env(cls) -> "ReplyCache":
+        """从环境变量读取配置"""
+        return cls(
+            ttl=float(os.getenv("REPLY_CACHE_TTL", 600)),
+            max_size=int(os.getenv("REPLY_CACHE_MAX_SIZE", 5000)),
+        )
+
+    @staticmethod
+    def key(text: str, tier: str, user_name: str = None) -> tuple:
+        return normalize_prompt(text), tier, detect_language(text), bool(user_name)
+
+    async def get_reply(self, generate, text: str, tier: str, user_name: str = None) -> str:
+        """
+        无记忆时的回复：命中缓存直接返回，否则调用 generate
+
+        generate 为 generate_reply（同步函数或协程函数都可以）。
+        """
+        template, _ = await self._flight.run(
+            self.key(text, tier, user_name),
+            self._generate, generate, text, tier, user_name,
+            cacheable=self._cacheable,
+        )
+        return template.replace(NICKNAME_SLOT, user_name or "")
+
+    async def stream_reply(self, stream, feed, text: str, tier: str, user_name: str = None) -> str:
+        """
+        无记忆时的流式回复：命中缓存直接返回，否则调用 stream() 逐段生成
+
+        相同问题同时只生成一次：发起生成的调用方每段都交给 feed(chunk)，
+        其他调用方等生成完直接拿完整回复。
+        """
+        async def generate():
+            chunks = []
+            async for chunk in stream():
+                chunks.append(chunk)
+                await feed(chunk)
+            return self._template("".join(chunks), user_name)
+
+        template, _ = await self._flight.run(
+            self.key(text, tier, user_name), generate, cacheable=self._cacheable,
+        )
+        return template.replace(NICKNAME_SLOT, user_name or "")
+
+    @classmethod
+    async def _generate(cls, generate, text: str, tier: str, user_name: str = None) -> tuple:
+        """返回 (模板, 能否缓存)"""
+        result = generate(text=text, memory=None, user_name=user_name, user_tier=tier)
+        if inspect.isawaitable(result):
+            result = await result
+        return cls._template(result, user_name)
+
+    @staticmethod
+    def _template(result: str, user_name: str = None) -> tuple:
+        if not user_name or user_name not in result:
+            return result, True
+        if len(user_name) < MIN_TEMPLATE_NICKNAME:
+            return result, False
+        return result.replace(user_name, NICKNAME_SLOT), True
+
+    @staticmethod
+    def _cacheable(entry: tuple) -> bool:
+        template, safe = entry
+        return (
+            safe
+            and bool(template.strip())
+            and not template.startswith("oof")
+            and not any(tag in template for tag in _MARKER_OPEN)
+        )
+
+    def stats(self) -> dict:
+        return self._flight.stats()
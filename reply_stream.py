@@ -0,0 +1,128 @@
+"""
+Reply Stream - 把 Worker / 闲聊的流式输出增量编辑到 Telegram 消息
+
+- 编辑频率受 Telegram 限制（同一会话大约每秒 1 次），这里按最小间隔节流
+- [TASK_CREATE] / [TASK_DELETE] / [USER_INFO] 标记不展示给用户：
+  完整的标记块直接去掉，未闭合的标记（可能被拆在两个 chunk 里）先扣住不显示
+"""
+
+import os
+import re
+import time
+import logging
+
+from markers import MARKER_TAGS
+
+logger = logging.getLogger(__name__)
+
+# 两次编辑之间的最小间隔（秒）
+DEFAULT_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.5))
+
+# 流式展示时的最大长度（Telegram 单条消息上限 4096）
+MAX_PREVIEW_LENGTH = 4000
+
+_OPEN_TAGS = tuple(f"[{tag}]" for tag in MARKER_TAGS)
+_MAX_TAG_LENGTH = max(len(tag) for tag in _OPEN_TAGS)
+
+_COMPLETE_BLOCK_RE = re.compile(
+    r'\[(' + '|'.join(MARKER_TAGS) + r')\].*?\[/\1\]', re.DOTALL
+)
+_OPEN_TAG_RE = re.compile(r'\[(?:' + '|'.join(MARKER_TAGS) + r')\]')
+
+
+def visible_text(buffer: str) -> str:
+    """
+    返回当前可以展示给用户的部分
+
+    去掉完整的标记块；从第一个未闭合的标记开始截断；
+    末尾如果是某个标记的前缀（如 "[TASK_"），也先不展示。
+    """
+    text = _COMPLETE_BLOCK_RE.sub('', buffer)
+
+    match = _OPEN_TAG_RE.search(text)
+    if match:
+        text = text[:match.start()]
+
+    cut = text.rfind('[', max(0, len(text) - _MAX_TAG_LENGTH))
+    if cut != -1:
+        tail = text[cut:]
+        if any(tag.startswith(tail) for tag in _OPEN_TAGS):
+            text = text[:cut]
+
+    return text.strip()
+
+
+class StreamingReply:
+    """
+    一条可以被逐步编辑的回复
+
+    start() 发送占位消息；feed() 追加输出并按节流编辑；
+    finish() 用最终文本收尾（没有占位消息时直接回复）。
+    不调用 start() 时，feed() 在第一段可展示的内容到达时立即发出第一条消息。
+    """
+
+    def __init__(self, message, edit_interval: float = None):
+        self.message = message
+        self.edit_interval = DEFAULT_EDIT_INTERVAL if edit_interval is None else edit_interval
+        self.placeholder = None
+
+        self._buffer = []
+        self._shown = ""
+        self._last_edit = 0.0
+        self._blocked_until = 0.0
+
+    async def start(self, text: str):
+        """发送占位消息"""
+        self.placeholder = await self.message.reply_text(text)
+        self._shown = text
+        self._last_edit = time.monotonic()
+
+    async def feed(self, chunk: str):
+        """追加一段输出，到了节流时间就编辑一次"""
+        self._buffer.append(chunk)
+
+        now = time.monotonic()
+        if self.placeholder is not None and (
+            now - self._last_edit < self.edit_interval or now < self._blocked_until
+        ):
+            return
+
+        preview = visible_text("".join(self._buffer))
+        if len(preview) > MAX_PREVIEW_LENGTH:
+            preview = preview[:MAX_PREVIEW_LENGTH] + "..."
+        if not preview:
+            return
+
+        if self.placeholder is None:
+            await self.start(preview + " ▌")
+        else:
+            await self._edit(preview + " ▌")
+
+    async def finish(self, text: str):
+        """用最终文本替换占位消息"""
+        if self.placeholder is None:
+            await self.message.reply_text(text)
+            return
+
+        if text != self._shown and not await self._edit(text):
+            # 编辑失败（比如被限流）时退回到发新消息
+            await self.message.reply_text(text)
+
+    async def _edit(self, text: str) -> bool:
+        if self.placeholder is None or text == self._shown:
+            return True
+
+        self._last_edit = time.monotonic()
+        try:
+            await self.placeholder.edit_text(text)
+        except Exception as e:
+            # RetryAfter 带有 retry_after，按要求暂停编辑
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after:
+                seconds = getattr(retry_after, 'total_seconds', lambda: retry_after)()
+                self._blocked_until = time.monotonic() + float(seconds)
+            logger.warning(f"Failed to edit streaming reply: {e}")
+            return False
+
+        self._shown = text
+        return True
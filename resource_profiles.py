@@ -0,0 +1,158 @@
+"""
+Resource Profiles - 每个等级的容器资源上限
+
+没有限制时一个重任务就能吃光宿主机的内存 / CPU / 进程数。每个等级一份配置，
+冷启动容器、预热池容器和 Gold 常驻容器都按它设置 cgroup 上限：
+
+    WORKER_MEM_LIMIT_SILVER=1g      # 内存（不允许额外使用 swap）
+    WORKER_CPUS_SILVER=1.5          # CPU 核数
+    WORKER_PIDS_LIMIT_SILVER=256    # 进程 / 线程数
+
+值为 0 表示不限制。
+
+Gold 常驻容器由 MoltManager 创建，创建参数不经过这里。GOLD_APPLY_RESOURCES=1 时
+ContainerLimiter 在每个用户（本进程里）第一次 Gold 请求结束后用 docker update 补上限制；
+默认关闭：给已经在跑的容器收紧内存上限，超出的进程会被 OOM kill。
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+_UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_bytes(value) -> int:
+    """把 512m / 2g / 1048576 这样的值转成字节数"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([bkmg]?)b?\s*', str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid memory size {value!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+class ResourceProfile(NamedTuple):
+    """一个等级的资源上限；0 表示不限制"""
+    mem_limit: int      # 字节
+    cpus: float         # 核数
+    pids_limit: int
+
+    def run_kwargs(self) -> dict:
+        """docker-py containers.run / create 的参数"""
+        kwargs = {}
+        if self.mem_limit:
+            kwargs['mem_limit'] = self.mem_limit
+            kwargs['memswap_limit'] = self.mem_limit
+        if self.cpus:
+            kwargs['nano_cpus'] = int(self.cpus * 1e9)
+        if self.pids_limit:
+            kwargs['pids_limit'] = self.pids_limit
+        return kwargs
+
+    def host_config(self) -> dict:
+        """Engine API 的 HostConfig（创建容器和 /update 都用这个格式）"""
+        config = {}
+        if self.mem_limit:
+            config['Memory'] = self.mem_limit
+            config['MemorySwap'] = self.mem_limit
+        if self.cpus:
+            config['NanoCpus'] = int(self.cpus * 1e9)
+        if self.pids_limit:
+            config['PidsLimit'] = self.pids_limit
+        return config
+
+    def update_kwargs(self) -> dict:
+        """docker-py container.update 的参数（不支持 nano_cpus / pids_limit，用 CFS 配额代替 CPU）"""
+        kwargs = {}
+        if self.mem_limit:
+            kwargs['mem_limit'] = self.mem_limit
+            kwargs['memswap_limit'] = self.mem_limit
+        if self.cpus:
+            kwargs['cpu_period'] = 100000
+            kwargs['cpu_quota'] = int(self.cpus * 100000)
+        return kwargs
+
+
+DEFAULT_TIER_RESOURCES = {
+    'bronze': ResourceProfile(mem_limit=512 * 1024 ** 2, cpus=0.5, pids_limit=128),
+    'silver': ResourceProfile(mem_limit=1024 ** 3, cpus=1.0, pids_limit=256),
+    'gold': ResourceProfile(mem_limit=2 * 1024 ** 3, cpus=2.0, pids_limit=512),
+}
+
+
+def tier_resources_from_env() -> dict:
+    """按环境变量覆盖默认的等级资源配置"""
+    profiles = {}
+    for tier, default in DEFAULT_TIER_RESOURCES.items():
+        suffix = tier.upper()
+        profiles[tier] = ResourceProfile(
+            mem_limit=parse_bytes(os.getenv(f"WORKER_MEM_LIMIT_{suffix}", default.mem_limit)),
+            cpus=float(os.getenv(f"WORKER_CPUS_{suffix}", default.cpus)),
+            pids_limit=int(os.getenv(f"WORKER_PIDS_LIMIT_{suffix}", default.pids_limit)),
+        )
+    return profiles
+
+
+def _not_found(error: Exception) -> bool:
+    """docker-py 的 NotFound / async_docker.NotFound"""
+    return getattr(error, 'status_code', None) == 404 or getattr(error, 'status', None) == 404
+
+
+class ContainerLimiter:
+    """
+    给别处创建的容器（Gold 常驻容器）补上资源上限，每个用户只做一次
+
+    - docker_client: docker-py 客户端（没有异步客户端时在线程里调用）
+    - adocker: AsyncDockerClient；为 None 时走 docker_client
+    - profile: ResourceProfile
+    - name_template: 容器名模板（含 {user_id}）
+    - enabled: False 时 ensure() 什么都不做
+    """
+
+    def __init__(self, docker_client, adocker=None, profile: ResourceProfile = None,
+                 name_template: str = "alice_molt_{user_id}", enabled: bool = False):
+        self.docker_client = docker_client
+        self.adocker = adocker
+        self.profile = profile
+        self.name_template = name_template
+        self.enabled = enabled and profile is not None
+
+        self._limited = set()       # 已经设置过资源上限（或找不到容器，不再重试）的用户
+
+    @classmethod
+    def from_env(cls, docker_client, adocker=None, profile: ResourceProfile = None) -> "ContainerLimiter":
+        """从环境变量读取配置（GOLD_APPLY_RESOURCES=1 开启）"""
+        return cls(
+            docker_client,
+            adocker,
+            profile,
+            name_template=os.getenv("MOLT_CONTAINER_NAME", "alice_molt_{user_id}"),
+            enabled=os.getenv("GOLD_APPLY_RESOURCES", "0") == "1",
+        )
+
+    async def ensure(self, user_id: int) -> bool:
+        """用户的容器还没设置过资源上限时设置一次；返回这次是否设置成功"""
+        if not self.enabled or user_id in self._limited:
+            return False
+
+        name = self.name_template.format(user_id=user_id)
+        try:
+            if self.adocker is not None:
+                await self.adocker.update(name, self.profile.host_config())
+            else:
+                await asyncio.to_thread(
+                    lambda: self.docker_client.containers.get(name).update(**self.profile.update_kwargs())
+                )
+        except Exception as e:
+            logger.warning(f"Failed to set resource limits on container {name}: {e}")
+            if _not_found(e):
+                # 容器名和 MoltManager 不一致，每次请求重试只会多一次 Docker 调用
+                self._limited.add(user_id)
+            return False
+        self._limited.add(user_id)
+        return True
@@ -0,0 +1,120 @@
+"""
+Single Flight - 相同请求合并成一次执行，结果短时间缓存
+
+很多 Bronze 用户发的是几乎一样的问题（"BTC price now?"、"今天 BTC 怎么样"），
+没有记忆时结果只取决于 prompt。同一个 key 的并发请求共享一次执行，
+执行完成后的 ttl 秒内直接返回缓存结果。
+"""
+
+import os
+import re
+import time
+import asyncio
+import unicodedata
+from collections import OrderedDict
+
+_SPACES_RE = re.compile(r'\s+')
+# 首尾的标点（含全角）和语气符号
+_EDGE_PUNCT_RE = re.compile(r'^[\s.,!?;:~…。，！？；：～、]+|[\s.,!?;:~…。，！？；：～、]+$')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """归一化 prompt 作为合并的 key：全角转半角、忽略大小写、合并空白、去掉首尾标点"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = _SPACES_RE.sub(' ', text)
+    return _EDGE_PUNCT_RE.sub('', text)
+
+
+class SingleFlight:
+    """
+    按 key 合并并发执行 + TTL 结果缓存
+
+    - ttl: 结果缓存秒数（0 表示只合并进行中的请求）
+    - max_size: 最多缓存多少个结果
+    """
+
+    def __init__(self, ttl: float = 30, max_size: int = 1000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._results = OrderedDict()   # key -> (完成时间, 结果)
+        self._inflight = {}             # key -> Future
+
+        self.hits = 0       # 命中缓存
+        self.shared = 0     # 搭上了进行中的执行
+        self.misses = 0     # 真正执行
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "SingleFlight":
+        """从环境变量读取配置（{prefix}_TTL / {prefix}_MAX_SIZE）"""
+        return cls(
+            ttl=float(os.getenv(f"{prefix}_TTL", 30)),
+            max_size=int(os.getenv(f"{prefix}_MAX_SIZE", 1000)),
+        )
+
+    def _cached(self, key: str):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, result):
+        if self.ttl <= 0:
+            return
+        self._results[key] = (time.monotonic(), result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    async def run(self, key: str, func, *args, cacheable=None, shareable=None, **kwargs):
+        """
+        执行 await func(*args, **kwargs)，同一个 key 同时只执行一次
+
+        cacheable(result) 返回 False 的结果不进缓存（仍然会返回给正在等待的调用方）。
+        shareable(result) 返回 False 的结果只属于发起执行的调用方，也不进缓存；
+        正在等待的调用方各自再执行一次。
+        发起执行的调用方被取消时，执行会继续，其他等待者照常拿到结果。
+        """
+        entry = self._cached(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            result = await asyncio.shield(inflight)
+            if shareable is None or shareable(result):
+                self.shared += 1
+                return result
+            self.misses += 1
+            return await func(*args, **kwargs)
+
+        self.misses += 1
+        future = asyncio.ensure_future(func(*args, **kwargs))
+        self._inflight[key] = future
+
+        def done(f):
+            self._inflight.pop(key, None)
+            if f.cancelled() or f.exception() is not None:
+                return
+            result = f.result()
+            if (cacheable is None or cacheable(result)) and (shareable is None or shareable(result)):
+                self._store(key, result)
+
+        future.add_done_callback(done)
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        total = self.hits + self.shared + self.misses
+        return {
+            'cached': len(self._results),
+            'inflight': len(self._inflight),
+            'hits': self.hits,
+            'shared': self.shared,
+            'misses': self.misses,
+            'saved_rate': (self.hits + self.shared) / total if total else 0.0,
+        }
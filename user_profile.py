@@ -0,0 +1,120 @@
+"""
+User Profile - 用户资料（等级 + 偏好）的合并加载与 TTL 缓存
+
+一条普通消息原本要查 get_user、get_user_tier、get_user_preference 三次，
+这些数据很少变化，这里合并成一个 UserProfile 并缓存。
+修改等级或偏好后需要调用 invalidate()。
+
+db 为 AsyncDatabase。
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class UserProfile:
+    """用户资料快照"""
+
+    __slots__ = ('user_id', 'username', 'tier', 'nickname', 'timezone', 'loaded_at')
+
+    def __init__(self, user_id: int, username: str = None, tier: str = 'bronze',
+                 nickname: str = None, timezone: str = None):
+        self.user_id = user_id
+        self.username = username
+        self.tier = tier
+        self.nickname = nickname
+        self.timezone = timezone
+        self.loaded_at = time.monotonic()
+
+    def __repr__(self):
+        return f"UserProfile(user_id={self.user_id}, tier={self.tier!r}, nickname={self.nickname!r})"
+
+
+class ProfileCache:
+    """
+    UserProfile 的 TTL + LRU 缓存
+
+    - ttl: 缓存有效期（秒）
+    - max_size: 最多缓存多少个用户
+    """
+
+    def __init__(self, db, ttl: float = 300, max_size: int = 50000):
+        self.db = db
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._profiles = OrderedDict()
+        self._loading = {}      # user_id -> 正在进行的加载
+        self._epoch = 0         # 每次 invalidate 加一
+
+    @classmethod
+    def from_env(cls, db) -> "ProfileCache":
+        """从环境变量读取配置"""
+        return cls(
+            db,
+            ttl=float(os.getenv("PROFILE_CACHE_TTL", 300)),
+            max_size=int(os.getenv("PROFILE_CACHE_MAX_SIZE", 50000)),
+        )
+
+    async def get(self, user_id: int, username: str = None) -> UserProfile:
+        """获取用户资料；用户不存在时创建为 bronze"""
+        profile = self._profiles.get(user_id)
+        if profile is not None and time.monotonic() - profile.loaded_at < self.ttl:
+            self._profiles.move_to_end(user_id)
+            return profile
+
+        # 同一用户的并发加载合并成一次（也避免重复 create_user）
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        epoch = self._epoch
+        loading = asyncio.ensure_future(self._load(user_id, username))
+        self._loading[user_id] = loading
+        try:
+            profile = await asyncio.shield(loading)
+        finally:
+            self._loading.pop(user_id, None)
+
+        # 加载期间被 invalidate 过，结果可能已过期，不缓存
+        if epoch == self._epoch:
+            self._profiles[user_id] = profile
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+        return profile
+
+    def invalidate(self, user_id: int):
+        """等级或偏好变化后丢弃缓存"""
+        self._profiles.pop(user_id, None)
+        self._epoch += 1
+
+    async def _load(self, user_id: int, username: str = None) -> UserProfile:
+        # 数据库提供合并查询时一次取回用户和偏好
+        if self.db.supports('get_user_profile'):
+            row = await self.db.get_user_profile(user_id)
+            if row:
+                return UserProfile(
+                    user_id,
+                    username=row.get('username') or username,
+                    tier=row.get('tier') or 'bronze',
+                    nickname=row.get('nickname'),
+                    timezone=row.get('timezone'),
+                )
+        else:
+            row = await self.db.get_user(user_id)
+            if row:
+                tier = row.get('tier') or await self.db.get_user_tier(user_id)
+                return UserProfile(
+                    user_id,
+                    username=row.get('username') or username,
+                    tier=tier,
+                    nickname=await self.db.get_user_preference(user_id, 'nickname'),
+                )
+
+        # 新用户
+        await self.db.create_user(user_id, username, 'bronze')
+        return UserProfile(user_id, username=username, tier='bronze')
@@ -0,0 +1,228 @@
+"""
+Worker Executor - 在线程池中运行阻塞的 Worker 任务，避免卡住事件循环
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 默认每个等级的并发上限和排队上限
+DEFAULT_TIER_LIMITS = {
+    'bronze': 4,
+    'silver': 8,
+    'gold': 8,
+}
+DEFAULT_QUEUE_SIZE = 100
+
+# iterate_in_thread() 的结束标记
+_STREAM_END = object()
+
+
+def tier_limits_from_env() -> dict:
+    """各等级的并发上限（WORKER_LIMIT_<TIER>）"""
+    return {
+        tier: int(os.getenv(f"WORKER_LIMIT_{tier.upper()}", limit))
+        for tier, limit in DEFAULT_TIER_LIMITS.items()
+    }
+
+
+async def iterate_in_thread(pool, gen_func, /, *args, on_done=None, **kwargs):
+    """
+    在线程池 pool 里迭代同步生成器 gen_func(*args, **kwargs)，逐个产出结果
+
+    调用方停止迭代后后台线程在下一个结果处停下；on_done() 在后台线程真正结束时调用。
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def emit(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def produce():
+        try:
+            gen = gen_func(*args, **kwargs)
+            try:
+                for item in gen:
+                    if stop.is_set():
+                        break
+                    emit(item)
+            finally:
+                gen.close()
+        except Exception as e:
+            emit(_STREAM_END, e)
+        else:
+            emit(_STREAM_END)
+
+    try:
+        future = loop.run_in_executor(pool, produce)
+    except BaseException:
+        if on_done is not None:
+            on_done()
+        raise
+    if on_done is not None:
+        future.add_done_callback(lambda _: on_done())
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _STREAM_END:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class WorkerQueueFull(Exception):
+    """某个等级的排队已满"""
+
+
+class WorkerExecutor:
+    """
+    有界 Worker 执行器
+
+    - 所有阻塞调用（docker wait / MoltManager）都在线程池里执行，协程用 slot() 限流
+    - 每个等级独立的并发上限（asyncio.Semaphore），超出的任务排队等待
+    - 每个等级的排队长度有上限，满了直接拒绝
+    - 可选的 admission（HostAdmission）：拿到槽位后再等宿主机有足够的 CPU / 内存
+    """
+
+    def __init__(self, max_workers: int = None, tier_limits: dict = None, queue_size: int = None,
+                 admission=None):
+        self.tier_limits = dict(tier_limits or DEFAULT_TIER_LIMITS)
+        self.queue_size = queue_size if queue_size is not None else DEFAULT_QUEUE_SIZE
+        self.max_workers = max_workers or sum(self.tier_limits.values())
+        self.admission = admission
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="alice_worker"
+        )
+        self._semaphores = {}
+        self._pending = {tier: 0 for tier in self.tier_limits}
+        self._running = {tier: 0 for tier in self.tier_limits}
+
+    @classmethod
+    def from_env(cls, admission=None) -> "WorkerExecutor":
+        """从环境变量读取配置"""
+        max_workers = os.getenv("WORKER_MAX_THREADS")
+        return cls(
+            max_workers=int(max_workers) if max_workers else None,
+            tier_limits=tier_limits_from_env(),
+            queue_size=int(os.getenv("WORKER_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+            admission=admission,
+        )
+
+    def _tier_key(self, tier: str) -> str:
+        return tier if tier in self.tier_limits else 'bronze'
+
+    def _semaphore(self, tier: str) -> asyncio.Semaphore:
+        # 懒创建，保证绑定到运行中的事件循环
+        if tier not in self._semaphores:
+            self._semaphores[tier] = asyncio.Semaphore(self.tier_limits[tier])
+        return self._semaphores[tier]
+
+    async def _acquire(self, tier: str) -> tuple:
+        """排队等待该等级的执行槽位（和宿主机资源），返回 (规范化后的等级, 资源预留凭证)"""
+        tier = self._tier_key(tier)
+
+        if self._pending[tier] >= self.queue_size:
+            logger.warning(f"Worker queue full for tier {tier} ({self._pending[tier]} pending)")
+            raise WorkerQueueFull(tier)
+
+        self._pending[tier] += 1
+        try:
+            await self._semaphore(tier).acquire()
+        finally:
+            # 无论拿到信号量还是排队时被取消，都退出排队
+            self._pending[tier] -= 1
+
+        ticket = None
+        if self.admission is not None:
+            try:
+                ticket = await self.admission.admit(tier)
+            except BaseException:
+                self._semaphore(tier).release()
+                raise
+
+        self._running[tier] += 1
+        return tier, ticket
+
+    def _release(self, tier: str, ticket=None):
+        self._running[tier] -= 1
+        self._semaphore(tier).release()
+        if self.admission is not None:
+            self.admission.release(ticket)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tier: str):
+        """
+        占用该等级的一个执行槽位，供本身就是协程的 worker 使用（不占线程）
+
+        Raises:
+            WorkerQueueFull: 该等级排队已满（或宿主机资源不足）
+        """
+        tier, ticket = await self._acquire(tier)
+        try:
+            yield
+        finally:
+            self._release(tier, ticket)
+
+    async def run(self, tier: str, func, *args, **kwargs):
+        """
+        在线程池中执行 func(*args, **kwargs)，按等级限流
+
+        Raises:
+            WorkerQueueFull: 该等级排队已满（或宿主机资源不足）
+        """
+        tier, ticket = await self._acquire(tier)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool, lambda: func(*args, **kwargs)
+            )
+        finally:
+            self._release(tier, ticket)
+
+    async def stream(self, tier: str, gen_func, *args, **kwargs):
+        """
+        在线程池中迭代同步生成器 gen_func(*args, **kwargs)，逐个产出结果
+
+        槽位一直占用到后台线程真正结束（而不是调用方停止迭代）。
+
+        Raises:
+            WorkerQueueFull: 该等级排队已满（或宿主机资源不足）
+        """
+        tier, ticket = await self._acquire(tier)
+        items = iterate_in_thread(
+            self._pool, gen_func, *args, on_done=lambda: self._release(tier, ticket), **kwargs
+        )
+        async with contextlib.aclosing(items):
+            async for item in items:
+                yield item
+
+    def stats(self) -> dict:
+        """当前各等级运行中 / 排队中的任务数"""
+        return {
+            tier: {
+                'running': self._running[tier],
+                'pending': self._pending[tier],
+                'limit': self.tier_limits[tier],
+            }
+            for tier in self.tier_limits
+        }
+
+    def shutdown(self, wait: bool = True):
+        """关闭线程池"""
+        self._pool.shutdown(wait=wait)
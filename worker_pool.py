@@ -0,0 +1,297 @@
+"""
+Worker Pool - 预热的 alice-worker 容器池
+
+空闲容器常驻（sleep infinity），有请求时通过 docker exec 把 prompt 从 stdin
+交给容器内的 worker.py，省掉每次 containers.run 的冷启动。
+"""
+
+import os
+import time
+import uuid
+import codecs
+import socket
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+from docker.utils.socket import frames_iter
+
+from worker_transport import encode_payload
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "alice.pool"
+POOL_LABEL_VALUE = "worker"
+
+
+class PooledContainer:
+    """池中的一个容器及其使用统计"""
+
+    def __init__(self, container):
+        self.container = container
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class WorkerPool:
+    """
+    预热容器池
+
+    - size: 池中保持的容器数量（空闲 + 使用中）
+    - max_reuse: 单个容器最多处理多少个请求，之后销毁重建
+    - idle_ttl: 空闲超过多少秒就回收（池会自动补足）
+    - resources: 容器的资源上限（containers.run 的 mem_limit / nano_cpus / pids_limit 参数）
+    """
+
+    def __init__(self, docker_client, image: str, environment: dict = None,
+                 size: int = 2, max_reuse: int = 20, idle_ttl: int = 600,
+                 exec_timeout: int = 120, resources: dict = None):
+        self.docker_client = docker_client
+        self.image = image
+        self.environment = environment or {}
+        self.size = size
+        self.max_reuse = max_reuse
+        self.idle_ttl = idle_ttl
+        self.exec_timeout = exec_timeout
+        self.resources = resources or {}
+
+        self._idle = deque()
+        self._busy = 0
+        self._starting = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        # 创建 / 销毁容器放在后台线程，不占用请求的时间
+        self._maintenance = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alice_pool")
+
+    @classmethod
+    def from_env(cls, docker_client, image: str, environment: dict = None,
+                 resources: dict = None) -> "WorkerPool":
+        """从环境变量读取配置"""
+        return cls(
+            docker_client,
+            image,
+            environment=environment,
+            resources=resources,
+            size=int(os.getenv("WORKER_POOL_SIZE", 0)),
+            max_reuse=int(os.getenv("WORKER_POOL_MAX_REUSE", 20)),
+            idle_ttl=int(os.getenv("WORKER_POOL_IDLE_TTL", 600)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and not self._closed
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """清理上次遗留的池容器并预热"""
+        if self.size <= 0:
+            return
+
+        try:
+            stale = self.docker_client.containers.list(
+                all=True, filters={"label": f"{POOL_LABEL}={POOL_LABEL_VALUE}"}
+            )
+            for container in stale:
+                container.remove(force=True)
+            if stale:
+                logger.info(f"Removed {len(stale)} stale pool containers")
+        except Exception as e:
+            logger.error(f"Failed to clean stale pool containers: {e}")
+
+        self._schedule_refill()
+
+    def shutdown(self):
+        """销毁所有空闲容器"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+
+        for pooled in idle:
+            self._destroy(pooled)
+        self._maintenance.shutdown(wait=False)
+
+    def _create(self) -> PooledContainer:
+        container = self.docker_client.containers.run(
+            self.image,
+            command=["sleep", "infinity"],
+            entrypoint="",
+            name=f"alice_pool_{uuid.uuid4().hex[:12]}",
+            detach=True,
+            labels={POOL_LABEL: POOL_LABEL_VALUE},
+            environment=self.environment,
+            **self.resources,
+        )
+        return PooledContainer(container)
+
+    def _destroy(self, pooled: PooledContainer):
+        try:
+            pooled.container.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove pool container {pooled.container.name}: {e}")
+
+    def _discard(self, pooled: PooledContainer):
+        """后台销毁容器；池已关闭时直接销毁"""
+        if self._closed:
+            self._destroy(pooled)
+        else:
+            self._maintenance.submit(self._destroy, pooled)
+
+    def _schedule_refill(self):
+        if not self._closed:
+            self._maintenance.submit(self._refill)
+
+    def _refill(self):
+        """补足容器到 size 个（正在使用的容器用完会回到池里，也算在内）"""
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) + self._busy + self._starting >= self.size:
+                    return
+                self._starting += 1
+
+            try:
+                pooled = self._create()
+            except Exception as e:
+                logger.error(f"Failed to start pool container: {e}")
+                with self._lock:
+                    self._starting -= 1
+                return
+
+            with self._lock:
+                self._starting -= 1
+                closed = self._closed
+                if not closed:
+                    self._idle.append(pooled)
+
+            if closed:
+                self._destroy(pooled)
+                return
+
+    def reap_idle(self):
+        """回收空闲超时的容器，然后补足"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for pooled in list(self._idle):
+                if now - pooled.last_used > self.idle_ttl:
+                    self._idle.remove(pooled)
+                    expired.append(pooled)
+
+        for pooled in expired:
+            self._destroy(pooled)
+        if expired:
+            logger.info(f"Reaped {len(expired)} idle pool containers")
+            self._schedule_refill()
+
+    # ==================== Acquire / Release ====================
+
+    def acquire(self) -> PooledContainer:
+        """取一个空闲容器；池空时现场创建"""
+        now = time.monotonic()
+        expired = []
+        pooled = None
+
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.popleft()
+                if now - candidate.last_used > self.idle_ttl:
+                    expired.append(candidate)
+                    continue
+                pooled = candidate
+                break
+            self._busy += 1
+
+        for candidate in expired:
+            self._discard(candidate)
+
+        if pooled is None:
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._lock:
+                    self._busy -= 1
+                raise
+
+        self._schedule_refill()
+        return pooled
+
+    def release(self, pooled: PooledContainer, healthy: bool = True):
+        """归还容器；用满 max_reuse 次或出错的容器直接销毁"""
+        pooled.uses += 1
+        pooled.last_used = time.monotonic()
+
+        with self._lock:
+            self._busy -= 1
+            keep = (
+                healthy
+                and not self._closed
+                and pooled.uses < self.max_reuse
+                and len(self._idle) < self.size
+            )
+            if keep:
+                self._idle.append(pooled)
+
+        if not keep:
+            self._discard(pooled)
+            self._schedule_refill()
+
+    # ==================== Execution ====================
+
+    def stream(self, prompt: str, memory: list = None):
+        """
+        用池中的容器执行一次 worker，边执行边产出输出片段
+
+        payload（worker_transport 帧）通过 docker exec 的 stdin 传给 worker.py --stdin
+        """
+        payload = encode_payload(prompt, memory)
+
+        pooled = self.acquire()
+        healthy = False
+        try:
+            api = self.docker_client.api
+            exec_id = api.exec_create(
+                pooled.container.id, ["python", "worker.py", "--stdin"],
+                stdin=True, stdout=True, stderr=True
+            )['Id']
+            sock = api.exec_start(exec_id, socket=True)
+            raw = getattr(sock, '_sock', sock)
+            raw.settimeout(self.exec_timeout)
+
+            # 多字节字符可能被拆在两个 frame 里
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                raw.sendall(payload)
+                raw.shutdown(socket.SHUT_WR)
+                for _, data in frames_iter(sock, tty=False):
+                    text = decoder.decode(data)
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+            finally:
+                sock.close()
+
+            healthy = api.exec_inspect(exec_id).get('ExitCode') == 0
+        finally:
+            # 中途放弃（GeneratorExit）的容器里还有进程在跑，直接销毁
+            self.release(pooled, healthy=healthy)
+
+    def run(self, prompt: str, memory: list = None) -> str:
+        """用池中的容器执行一次 worker"""
+        return "".join(self.stream(prompt, memory)).strip()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'idle': len(self._idle),
+                'busy': self._busy,
+                'starting': self._starting,
+                'size': self.size,
+            }
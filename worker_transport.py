@@ -0,0 +1,188 @@
+"""
+Worker Transport - 把 prompt 和记忆交给容器里的 worker.py
+
+旧做法把记忆 json.dumps 成一个 argv 元素（--memory）：Linux 单个参数最长 128KB
+（MAX_ARG_STRLEN），创建容器时还要被 Docker API 的 JSON 再转义一遍，
+worker 每次都要重新解析。
+
+这里把 payload 编码成一个紧凑的帧，通过 stdin 或 tmpfs 上的只读文件交给 worker：
+
+    b"AWP1" + 格式(1 字节) + body 长度(4 字节大端) + body
+
+body 为 {"p": prompt, "m": [[role, content], ...]}。装了 msgpack 时格式为 b"m"，
+否则为 b"j"（紧凑 JSON，不转义非 ASCII）。worker 侧用 read_payload() 解码。
+
+WORKER_TRANSPORT:
+- argv:  旧行为（--prompt / --memory，默认）
+- stdin: attach 容器 stdin 写入（worker.py --stdin）
+- file:  写到 WORKER_PAYLOAD_DIR（默认 /dev/shm/alice_worker），只读挂载进容器
+         （worker.py --payload-file）；bot 本身跑在容器里时该目录需要和宿主机路径一致
+
+stdin / file 需要 worker 镜像里的 worker.py 支持对应参数，升级镜像后再开启。
+"""
+
+import os
+import json
+import struct
+import socket
+import logging
+import tempfile
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AWP1"
+FORMAT_MSGPACK = b"m"
+FORMAT_JSON = b"j"
+_HEADER = struct.Struct(">4scI")
+
+TRANSPORT_MODES = ('stdin', 'file', 'argv')
+
+# 容器内 payload 文件的挂载位置
+CONTAINER_PAYLOAD_PATH = "/run/alice/payload"
+
+
+class PayloadError(Exception):
+    """payload 帧格式错误"""
+    pass
+
+
+# ==================== Encoding ====================
+
+def encode_payload(prompt: str, memory: list = None, use_msgpack: bool = None) -> bytes:
+    """把 prompt 和记忆编码成一个帧"""
+    body = {
+        "p": prompt,
+        "m": [[row.get('role', 'user'), row.get('content', '')] for row in memory or ()],
+    }
+
+    if use_msgpack is None:
+        use_msgpack = msgpack is not None
+    if use_msgpack:
+        fmt, data = FORMAT_MSGPACK, msgpack.packb(body, use_bin_type=True)
+    else:
+        fmt, data = FORMAT_JSON, json.dumps(
+            body, ensure_ascii=False, separators=(',', ':')
+        ).encode("utf-8")
+
+    return _HEADER.pack(MAGIC, fmt, len(data)) + data
+
+
+def decode_payload(frame: bytes) -> tuple:
+    """解码一个帧，返回 (prompt, memory)；memory 还原成 [{'role', 'content'}, ...]"""
+    if len(frame) < _HEADER.size:
+        raise PayloadError("truncated header")
+
+    magic, fmt, length = _HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise PayloadError(f"bad magic {magic!r}")
+
+    data = frame[_HEADER.size:_HEADER.size + length]
+    if len(data) != length:
+        raise PayloadError(f"truncated body ({len(data)}/{length} bytes)")
+
+    if fmt == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise PayloadError("payload is msgpack but msgpack is not installed")
+        body = msgpack.unpackb(data, raw=False)
+    elif fmt == FORMAT_JSON:
+        body = json.loads(data.decode("utf-8"))
+    else:
+        raise PayloadError(f"unknown format {fmt!r}")
+
+    memory = [{'role': role, 'content': content} for role, content in body.get("m", ())]
+    return body.get("p", ""), memory
+
+
+def read_payload(stream) -> tuple:
+    """从二进制流（sys.stdin.buffer / 文件 / socket.makefile）读取一个帧"""
+    header = _read_exact(stream, _HEADER.size)
+    _, _, length = _HEADER.unpack(header)
+    return decode_payload(header + _read_exact(stream, length))
+
+
+def _read_exact(stream, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            raise PayloadError("unexpected end of stream")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+# ==================== Transport ====================
+
+class WorkerTransport:
+    """
+    冷启动容器的 payload 传递方式
+
+    - mode: stdin / file / argv
+    - payload_dir: file 模式下 payload 文件所在目录（应在 tmpfs 上）
+    """
+
+    def __init__(self, mode: str = 'argv', payload_dir: str = "/dev/shm/alice_worker"):
+        if mode not in TRANSPORT_MODES:
+            raise ValueError(f"Unknown worker transport {mode!r}, expected one of {TRANSPORT_MODES}")
+        self.mode = mode
+        self.payload_dir = payload_dir
+
+    @classmethod
+    def from_env(cls) -> "WorkerTransport":
+        """从环境变量读取配置"""
+        return cls(
+            mode=os.getenv("WORKER_TRANSPORT", "argv"),
+            payload_dir=os.getenv("WORKER_PAYLOAD_DIR", "/dev/shm/alice_worker"),
+        )
+
+    def command(self, prompt: str, memory: list = None) -> list:
+        """容器启动命令"""
+        if self.mode == 'stdin':
+            return ["python", "worker.py", "--stdin"]
+        if self.mode == 'file':
+            return ["python", "worker.py", "--payload-file", CONTAINER_PAYLOAD_PATH]
+
+        cmd = ["python", "worker.py", "--prompt", prompt]
+        if memory:
+            cmd.extend(["--memory", json.dumps(memory)])
+        return cmd
+
+    def write_file(self, payload: bytes) -> tuple:
+        """file 模式：写 payload 文件，返回 (宿主机路径, containers.run 的 volumes 参数)"""
+        os.makedirs(self.payload_dir, mode=0o700, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="payload_", dir=self.payload_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        # 容器里的用户不一定是 bot 的用户
+        os.chmod(path, 0o644)
+        return path, {path: {'bind': CONTAINER_PAYLOAD_PATH, 'mode': 'ro'}}
+
+    def remove_file(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove worker payload {path}: {e}")
+
+    @staticmethod
+    def start_with_stdin(container, payload: bytes):
+        """
+        stdin 模式：attach 容器的 stdin，启动容器并写入 payload
+
+        容器需要以 stdin_open=True, stdin_once=True 创建（containers.create），
+        断开 attach 后 worker 读到 EOF。
+        """
+        sock = container.attach_socket(params={'stdin': 1, 'stream': 1})
+        raw = getattr(sock, '_sock', sock)
+        try:
+            container.start()
+            raw.sendall(payload)
+            raw.shutdown(socket.SHUT_WR)
+        finally:
+            sock.close()